@@ -6,9 +6,12 @@ Created on Thu Jul 13 13:29:26 2017
 @author: barnhark
 """
 
-# create modern metric files 
+# create modern metric files, and store the modern references that model
+# drivers memory-map (see metric_calculator.modern_reference)
 
 from metric_calculator import  MetricCalculator
+from metric_calculator.modern_reference import (load_modern_reference,
+                                                store_modern_reference)
 
 # sew modern metrics
 modern_dem_name = '../dems/sew/modern/dem24fil_ext.txt'
@@ -20,6 +23,9 @@ mc0 = MetricCalculator(modern_dem_name,
                        chi_mask_dem_name=chi_mask_dem_name)
 mc0.calculate_metrics()
 mc0.save_metrics(modern_dem_name, filename='dem24fil_ext.metrics.txt')
+store_modern_reference(mc0, modern_dem_name, outlet_id,
+                       chi_mask_dem_name=chi_mask_dem_name)
+load_modern_reference(metric_file='dem24fil_ext.metrics.txt')
 
 
 # gully modern metrics
@@ -29,4 +35,6 @@ outlet_id = 397031
 mc0 = MetricCalculator(modern_dem_name,
                        outlet_id)
 mc0.calculate_metrics()
-mc0.save_metrics(modern_dem_name, filename='gdem3r1f.metrics.txt')
\ No newline at end of file
+mc0.save_metrics(modern_dem_name, filename='gdem3r1f.metrics.txt')
+store_modern_reference(mc0, modern_dem_name, outlet_id)
+load_modern_reference(metric_file='gdem3r1f.metrics.txt')
@@ -1,8 +1,16 @@
 from .erosion_model import _ErosionModel
 from .stochastic_erosion_model import _StochasticErosionModel
+from .ensemble_erosion_model import ErosionModelEnsemble
+from .ensemble_linear_diffuser import EnsembleLinearDiffuser
 
 from .precip_changer import PrecipChanger
+from .rain_record import RainRecord
+from .exceedance_analyzer import ExceedanceAnalyzer
+from .forcing_schedule import ForcingSchedule
+from .effective_area_calculator import EffectiveAreaCalculator
+from .erosion_threshold_tracker import ErosionThresholdTracker
 
+from .baselevel_handler import BaselevelSchedule
 from .baselevel_handler import SingleNodeBaselevelHandler
 from .baselevel_handler import CaptureNodeBaselevelHandler
 
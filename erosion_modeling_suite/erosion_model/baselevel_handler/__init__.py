@@ -1,2 +1,3 @@
+from .baselevel_schedule import BaselevelSchedule
 from .capture_node_baselevel_handler import CaptureNodeBaselevelHandler
 from .single_node_baselevel_handler import SingleNodeBaselevelHandler
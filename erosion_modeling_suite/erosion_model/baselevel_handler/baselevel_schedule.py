@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+baselevel_schedule.py: drives the elevation of one or more nodes through
+time, either at a lowering rate or along an elevation history.
+"""
+
+import numpy as np
+
+
+class BaselevelSchedule(object):
+    """
+    A BaselevelSchedule controls the elevation of a set of nodes.
+
+    The schedule is either
+
+        1. an elevation history: elevation_times and elevations give a
+           piecewise-linear elevation of the nodes through time, or
+        2. a lowering rate: rate_times and rates give a piecewise-constant
+           lowering rate, or lowering_rate gives a constant one. A negative
+           rate raises the nodes.
+
+    elevations may have shape (n_times, ) (all nodes follow one history) or
+    (n_times, n_nodes). Time outside the given history takes the first or
+    last value.
+
+    The node indices are stored once, and each step is one vectorized update
+    of all nodes. Lookup in the schedule starts from where the previous step
+    ended, so advancing through time costs nothing extra. If lower_bedrock
+    is True and a bedrock__elevation field exists, it is changed by the same
+    amount as topographic__elevation, as for the outlet of a model.
+
+    Parameters
+    ----------
+    grid : ModelGrid
+    nodes : int or array of int
+    lowering_rate : float, optional
+    rate_times, rates : array of float, optional
+    elevation_times, elevations : array of float, optional
+    lower_bedrock : bool, optional
+
+    Examples
+    --------
+    >>> from landlab import RasterModelGrid
+    >>> from erosion_model.baselevel_handler import BaselevelSchedule
+    >>> grid = RasterModelGrid((3, 4))
+    >>> z = grid.add_zeros('node', 'topographic__elevation')
+    >>> bls = BaselevelSchedule(grid, [4, 7], elevation_times=[0., 10.],
+    ...                         elevations=[0., -5.])
+    >>> bls.run_one_step(2.)
+    >>> z[[4, 7]]
+    array([-1., -1.])
+    """
+
+    def __init__(self, grid, nodes, lowering_rate=0.0, rate_times=None,
+                 rates=None, elevation_times=None, elevations=None,
+                 lower_bedrock=False):
+        """Initialize the BaselevelSchedule."""
+        if (elevation_times is None) != (elevations is None):
+            raise ValueError('elevation_times and elevations must be given '
+                             'together.')
+        if (rate_times is None) != (rates is None):
+            raise ValueError('rate_times and rates must be given together.')
+        if elevation_times is not None and rate_times is not None:
+            raise ValueError('A BaselevelSchedule takes EITHER an elevation '
+                             'history or lowering rates, but not both.')
+
+        self.grid = grid
+        self.z = grid.at_node['topographic__elevation']
+        self.nodes = np.atleast_1d(np.asarray(nodes, dtype=int))
+        self.current_time = 0.0
+        self._bedrock = None
+        self._bedrock_checked = False
+        self.lower_bedrock = lower_bedrock
+        self._cursor = 0
+
+        if elevation_times is not None:
+            self._times = np.asarray(elevation_times, dtype=float)
+            self._values = np.asarray(elevations, dtype=float)
+            self._follows_elevation = True
+        else:
+            if rate_times is None:
+                rate_times = [0.0]
+                rates = [lowering_rate]
+            self._times = np.asarray(rate_times, dtype=float)
+            self._values = np.asarray(rates, dtype=float)
+            self._follows_elevation = False
+        if np.any(np.diff(self._times) < 0.):
+            raise ValueError('BaselevelSchedule times must increase.')
+
+    @property
+    def bedrock(self):
+        """The bedrock__elevation field, or None if the grid has none or
+        lower_bedrock is False.
+
+        Looked up at the first step, as models add this field after their
+        baselevel control is set up.
+        """
+        if not self._bedrock_checked:
+            if self.lower_bedrock and 'bedrock__elevation' in self.grid.at_node:
+                self._bedrock = self.grid.at_node['bedrock__elevation']
+            self._bedrock_checked = True
+        return self._bedrock
+
+    def _find_interval(self, time):
+        """Return index i such that times[i] <= time < times[i + 1]."""
+        times = self._times
+        if time < times[self._cursor]:
+            self._cursor = 0
+        while (self._cursor < len(times) - 1
+               and times[self._cursor + 1] <= time):
+            self._cursor += 1
+        return self._cursor
+
+    def elevation_at(self, time):
+        """Return the scheduled elevation of the nodes at a time."""
+        times = self._times
+        values = self._values
+        i = self._find_interval(time)
+        if time <= times[0]:
+            return values[0]
+        if i == len(times) - 1:
+            return values[-1]
+        weight = (time - times[i]) / (times[i + 1] - times[i])
+        return values[i] + weight * (values[i + 1] - values[i])
+
+    def rate_at(self, time):
+        """Return the scheduled lowering rate at a time."""
+        return self._values[self._find_interval(time)]
+
+    def run_one_step(self, dt):
+        """Move the nodes to their scheduled elevation at the end of a time
+        step of duration dt."""
+        if self._follows_elevation:
+            change = (self.z[self.nodes]
+                      - self.elevation_at(self.current_time + dt))
+        else:
+            change = self.rate_at(self.current_time) * dt
+
+        self.z[self.nodes] -= change
+        if self.bedrock is not None:
+            self.bedrock[self.nodes] -= change
+
+        self.current_time += dt
+
+    @classmethod
+    def from_params(cls, grid, nodes, params, lowering_sign=1.0,
+                    reference_node=None, lower_bedrock=True):
+        """Create a schedule from the outlet parameters of a model.
+
+        If params has an outlet_lowering_file_path, the file gives the
+        shape of the elevation history. That history is scaled to run from
+        the current elevation of reference_node (by default the first node)
+        to modern_outlet_elevation. Otherwise, the nodes are lowered at
+        outlet_lowering_rate (default zero) times lowering_sign. By
+        default bedrock is lowered with the outlet.
+        """
+        nodes = np.atleast_1d(np.asarray(nodes, dtype=int))
+        if reference_node is None:
+            reference_node = nodes[0]
+        try:
+            file_name = params['outlet_lowering_file_path']
+        except KeyError:
+            rate = params.get('outlet_lowering_rate', 0.0)
+            return cls(grid, nodes, lowering_rate=lowering_sign * rate,
+                       lower_bedrock=lower_bedrock)
+
+        modern_outlet_elevation = params['modern_outlet_elevation']
+        postglacial_outlet_elevation = grid.at_node['topographic__elevation'][reference_node]
+
+        elev_change_df = np.loadtxt(file_name, skiprows=1, delimiter=',')
+        time = elev_change_df[:, 0]
+        elev_change = elev_change_df[:, 1]
+
+        scaling_factor = (np.abs(postglacial_outlet_elevation
+                                 - modern_outlet_elevation)
+                          / np.abs(elev_change[0] - elev_change[-1]))
+
+        outlet_elevation = ((scaling_factor * elev_change)
+                            + postglacial_outlet_elevation)
+
+        return cls(grid, nodes, elevation_times=time,
+                   elevations=outlet_elevation, lower_bedrock=lower_bedrock)
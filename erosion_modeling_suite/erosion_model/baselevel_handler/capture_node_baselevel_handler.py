@@ -12,10 +12,18 @@ Created on Wed Nov 15 10:36:07 2017
 
 from landlab import FIXED_VALUE_BOUNDARY
 
+from .baselevel_schedule import BaselevelSchedule
+
 
 class CaptureNodeBaselevelHandler():
     """CaptureNodeBaselevelHandler turns a given node into an open boundary and
-    drives its elevation."""
+    drives its elevation.
+
+    capture_node may be a single node or a list of nodes, which are all
+    lowered together. Lowering is at capture_incision_rate from
+    capture_start_time until capture_stabilize_time, and at
+    post_stabilization_incision_rate after that. Only topography is lowered;
+    bedrock__elevation, if present, is left unchanged."""
 
     def __init__(self, grid, params):
 
@@ -34,16 +42,23 @@ class CaptureNodeBaselevelHandler():
             self.post_stabilization_incision_rate = 0
 
         self.rate = params['capture_incision_rate']
-        self.current_time = 0.0
         self.grid.status_at_node[self.node] = FIXED_VALUE_BOUNDARY
 
-    def run_one_step(self, dt):
+        self.schedule = BaselevelSchedule(grid, self.node,
+                                          rate_times=[0.0, self.start, self.stop],
+                                          rates=[0.0, self.rate,
+                                                 self.post_stabilization_incision_rate],
+                                          lower_bedrock=False)
 
-        if self.current_time >= self.start and self.current_time < self.stop:
-            self.z[self.node] -= self.rate * dt
-            print('Lowered cap node by ' + str(self.rate*dt) + ' to ' + str(self.z[self.node]))
-        elif self.current_time >= self.stop:
-            self.z[self.node] -= self.post_stabilization_incision_rate * dt
-            print('Lowered cap node by ' + str(self.post_stabilization_incision_rate*dt) + ' to ' + str(self.z[self.node]))
+    @property
+    def current_time(self):
+        """Time of the handler's clock."""
+        return self.schedule.current_time
+
+    @current_time.setter
+    def current_time(self, time):
+        self.schedule.current_time = time
+
+    def run_one_step(self, dt):
 
-        self.current_time += dt
+        self.schedule.run_one_step(dt)
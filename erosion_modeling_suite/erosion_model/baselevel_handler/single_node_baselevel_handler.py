@@ -9,44 +9,39 @@ Created on Wed Nov 15 10:36:07 2017
 @author: gtucker
 """
 
-import numpy as np
-from scipy.interpolate import interp1d
+from .baselevel_schedule import BaselevelSchedule
 
 
 class SingleNodeBaselevelHandler():
     """SingleNodeBaselevelHandler controls elevation for a single open
-    boundary node, referred to here as the *outlet*."""
-    
-    def __init__(self, params):
-        
-        # Read and remember baselevel control param, if present
-        try:
-            self.outlet_lowering_rate = self.params['outlet_lowering_rate']
-        except KeyError:
-            self.outlet_lowering_rate = 0.0
-
-        # Read and remember baselevel control param, if present
-        try:
-            file_name = params['outlet_lowering_file_path']
+    boundary node, referred to here as the *outlet*.
 
-            final_outlet_elevation = params['modern_outlet_elevation']
-            starting_outlet_elevation = self.z[self.outlet_node]
+    The outlet is the node baselevel_node if given, otherwise outlet_id. It
+    is lowered at outlet_lowering_rate, or along the elevation history in
+    outlet_lowering_file_path (see BaselevelSchedule.from_params)."""
 
-            elev_change_df = np.loadtxt(file_name, skiprows=1, delimiter =',')
-            time = elev_change_df[:, 0]
-            elev_change = elev_change_df[:, 1]
+    def __init__(self, grid, params):
 
-            scaling_factor = (np.abs(starting_outlet_elevation
-                                     - final_outlet_elevation)
-                              / np.abs(elev_change[0] - elev_change[-1]))
-
-            outlet_elevation = ((scaling_factor * elev_change_df[:, 1])
-                                + starting_outlet_elevation)
+        self.grid = grid
+        self.z = grid.at_node['topographic__elevation']
+        try:
+            self.outlet_node = params['baselevel_node']
+        except KeyError:
+            self.outlet_node = params['outlet_id']
 
-            self.outlet_elevation_obj = interp1d(time, outlet_elevation)
+        self.schedule = BaselevelSchedule.from_params(grid,
+                                                      self.outlet_node,
+                                                      params)
 
-        except KeyError:
+    @property
+    def current_time(self):
+        """Time of the handler's clock."""
+        return self.schedule.current_time
 
-            self.outlet_elevation_obj = None
+    @current_time.setter
+    def current_time(self, time):
+        self.schedule.current_time = time
 
+    def run_one_step(self, dt):
 
+        self.schedule.run_one_step(dt)
@@ -13,9 +13,9 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 FastscapeEroder, LinearDiffuser, SinkFiller)
-import numpy as np
 
 
 class Basic(_ErosionModel):
@@ -55,10 +55,10 @@ class Basic(_ErosionModel):
         sink_filler = SinkFiller(self.grid, apply_slope=True, fill_slope=1e-3)
         sink_filler.run_one_step()
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = FastscapeEroder(self.grid,
@@ -70,35 +70,44 @@ class Basic(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
 
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
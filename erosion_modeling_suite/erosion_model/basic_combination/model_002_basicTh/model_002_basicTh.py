@@ -13,10 +13,10 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
-import numpy as np
 
 
 class BasicTh(_ErosionModel):
@@ -55,10 +55,10 @@ class BasicTh(_ErosionModel):
         else:
             raise ValueError('A value for K_sp or K_ss  must be provided.')
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -71,6 +71,12 @@ class BasicTh(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -79,14 +85,14 @@ class BasicTh(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
         # Do some soil creep
@@ -14,10 +14,11 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
-import numpy as np
 
 
 class BasicDd(_ErosionModel):
@@ -57,14 +58,20 @@ class BasicDd(_ErosionModel):
         else:
             raise ValueError('A value for K_sp or K_ss  must be provided.')
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.threshold_value
+        # Get the parameter for rate of threshold increase with erosion depth
+        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.threshold_value,
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
 
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -73,32 +80,20 @@ class BasicDd(_ErosionModel):
                                                        K_sp=self.K,
                                                        threshold_sp=self.threshold)
 
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
-
         # Instantiate a LinearDiffuser component
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def update_erosion_threshold_values(self):
         """Updates the erosion threshold at each node based on cumulative
         erosion so far."""
-
-        # Set the erosion threshold.
-        #
-        # Note that a minus sign is used because cum ero depth is negative for
-        # erosion, positive for deposition.
-        # The second line handles the case where there is growth, in which case
-        # we want the threshold to stay at its initial value rather than
-        # getting smaller.
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                      - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.threshold_value
-                             - (self.thresh_change_per_depth
-                                * cum_ero))
-        self.threshold[self.threshold < self.threshold_value] = \
-            self.threshold_value
+        self.threshold_tracker.run_one_step()
 
     def run_one_step(self, dt):
         """
@@ -108,8 +103,8 @@ class BasicDd(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Calculate the new threshold values given cumulative erosion
         self.update_erosion_threshold_values()
@@ -118,7 +113,7 @@ class BasicDd(_ErosionModel):
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
         # Do some soil creep
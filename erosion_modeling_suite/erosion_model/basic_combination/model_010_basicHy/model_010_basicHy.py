@@ -10,9 +10,9 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 @author: Katherine Barnhart
 5 April 2017
 """
-import numpy as np
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 ErosionDeposition, LinearDiffuser)
 class BasicHy(_ErosionModel):
     """
@@ -53,10 +53,10 @@ class BasicHy(_ErosionModel):
         # Normalized settling velocity (dimensionless)
         v_sc = self.get_parameter_from_exponent('v_sc')
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         #make area_field and/or discharge_field depending on discharge_method
 #        area_field = self.grid.at_node['drainage_area']
@@ -85,6 +85,13 @@ class BasicHy(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      settling_velocity=v_sc)
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -93,14 +100,14 @@ class BasicHy(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt,
                                  flooded_nodes=flooded,
                                  dynamic_dt=True,
@@ -11,9 +11,10 @@ LinearDiffuser, and HybridAlluvium
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 LinearDiffuser, ErosionDeposition)
-import numpy as np
 
 class BasicDdHy(_ErosionModel):
     """
@@ -41,14 +42,20 @@ class BasicDdHy(_ErosionModel):
         self.sp_crit = (self._length_factor  # L/T
                 * self.get_parameter_from_exponent('erosion__threshold'))
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.sp_crit  #starting value
+        # Get the parameter for rate of threshold increase with erosion depth
+        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.sp_crit,
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
 
         # Handle solver option
         try:
@@ -70,13 +77,17 @@ class BasicDdHy(_ErosionModel):
                             area_field='drainage_area',
                             solver=solver)
 
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
-
         # Instantiate a LinearDiffuser component
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity=linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      settling_velocity=v_s)
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -85,22 +96,17 @@ class BasicDdHy(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Calculate cumulative erosion and update threshold
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                     - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.sp_crit
-                             - (self.thresh_change_per_depth * cum_ero))
-        self.threshold[self.threshold < self.sp_crit] = self.sp_crit
+        self.threshold_tracker.run_one_step()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
         # Do some soil creep
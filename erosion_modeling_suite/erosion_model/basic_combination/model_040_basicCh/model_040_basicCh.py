@@ -13,9 +13,9 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 FastscapeEroder, TaylorNonLinearDiffuser)
-import numpy as np
 
 
 class BasicCh(_ErosionModel):
@@ -37,10 +37,10 @@ class BasicCh(_ErosionModel):
         self.K_sp = self.get_parameter_from_exponent('K_sp')
         linear_diffusivity = (self._length_factor**2.)*self.get_parameter_from_exponent('linear_diffusivity') # has units length^2/time
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = FastscapeEroder(self.grid,
@@ -54,6 +54,12 @@ class BasicCh(_ErosionModel):
                                                slope_crit=self.params['slope_crit'],
                                                nterms=11)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -62,14 +68,14 @@ class BasicCh(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
         # Do some soil creep
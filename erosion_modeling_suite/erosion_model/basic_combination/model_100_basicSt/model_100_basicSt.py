@@ -47,7 +47,8 @@ PrecipitationDistribution, LinearDiffuser, FastscapeEroder
 """
 
 from erosion_model.stochastic_erosion_model import _StochasticErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 LinearDiffuser, FastscapeEroder)
 import numpy as np
 
@@ -85,10 +86,10 @@ class BasicSt(_StochasticErosionModel):
         else:
             raise ValueError('A value for K_sp or K_ss  must be provided.')
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
         # instantiate rain generator
         self.instantiate_rain_generator()
         
@@ -117,6 +118,13 @@ class BasicSt(_StochasticErosionModel):
         self.diffuser = LinearDiffuser(self.grid, 
                                        linear_diffusivity=linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge')
+
 
     def calc_runoff_and_discharge(self):
         """Calculate runoff rate and discharge; return runoff."""
@@ -128,7 +136,7 @@ class BasicSt(_StochasticErosionModel):
                 runoff = 0
         else:
             runoff = self.rain_rate
-        self.discharge[:] = runoff * self.area        
+        np.multiply(self.area, runoff, out=self.discharge)
         return runoff
 
 
@@ -140,8 +148,8 @@ class BasicSt(_StochasticErosionModel):
         # Route flow
         self.flow_router.run_one_step()
         
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
                
         # Handle water erosion
         self.handle_water_erosion(dt, flooded)
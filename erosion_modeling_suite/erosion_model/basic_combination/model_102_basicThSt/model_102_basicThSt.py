@@ -35,7 +35,8 @@ PrecipitationDistribution, LinearDiffuser, StreamPowerSmoothThresholdEroder
 """
 
 from erosion_model.stochastic_erosion_model import _StochasticErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 LinearDiffuser, StreamPowerSmoothThresholdEroder)
 
 import numpy as np
@@ -81,10 +82,10 @@ class BasicThSt(_StochasticErosionModel):
         # StreamPowerSmoothThresholdEroder expects
         threshold = self._length_factor*self.get_parameter_from_exponent('erosion__threshold') # has units length/time
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # instantiate rain generator
         self.instantiate_rain_generator()
@@ -115,6 +116,13 @@ class BasicThSt(_StochasticErosionModel):
         # Instantiate a LinearDiffuser component
         self.diffuser = LinearDiffuser(self.grid,
                                      linear_diffusivity = linear_diffusivity)
+
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K_stoch_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge')
     
     def calc_runoff_and_discharge(self):
         """Calculate runoff rate and discharge; return runoff."""
@@ -126,7 +134,7 @@ class BasicThSt(_StochasticErosionModel):
                 runoff = 0
         else:
             runoff = self.rain_rate
-        self.discharge[:] = runoff * self.area        
+        np.multiply(self.area, runoff, out=self.discharge)
         return runoff
 
     def run_one_step(self, dt):
@@ -137,8 +145,8 @@ class BasicThSt(_StochasticErosionModel):
         # Route flow
         self.flow_router.run_one_step()
     
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Handle water erosion
         self.handle_water_erosion(dt, flooded)
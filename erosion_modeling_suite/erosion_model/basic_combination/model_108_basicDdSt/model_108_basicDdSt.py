@@ -36,7 +36,9 @@ PrecipitationDistribution, LinearDiffuser, StreamPowerSmoothThresholdEroder
 """
 
 from erosion_model.stochastic_erosion_model import _StochasticErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 LinearDiffuser, StreamPowerSmoothThresholdEroder)
 
 import numpy as np
@@ -86,10 +88,10 @@ class BasicDdSt(_StochasticErosionModel):
         # Get the parameter for rate of threshold increase with erosion depth
         self.thresh_change_per_depth = self.params['thresh_change_per_depth']
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # instantiate rain generator
         self.instantiate_rain_generator()
@@ -109,12 +111,12 @@ class BasicDdSt(_StochasticErosionModel):
         # Run flow routing and lake filler
         self.flow_router.run_one_step()
 
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.threshold_value
-
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.threshold_value,
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
 
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -128,6 +130,13 @@ class BasicDdSt(_StochasticErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge')
+
     def calc_runoff_and_discharge(self):
         """Calculate runoff rate and discharge; return runoff."""
         if self.rain_rate > 0.0 and self.infilt > 0.0:
@@ -138,18 +147,12 @@ class BasicDdSt(_StochasticErosionModel):
                 runoff = 0
         else:
             runoff = self.rain_rate
-        self.discharge[:] = runoff * self.area
+        np.multiply(self.area, runoff, out=self.discharge)
         return runoff
 
     def update_threshold_field(self):
         """Update the threshold based on cumulative erosion depth."""
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                      - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.threshold_value
-                             - (self.thresh_change_per_depth * cum_ero))
-        self.threshold[self.threshold < self.threshold_value] = \
-                self.threshold_value
+        self.threshold_tracker.run_one_step()
 
     def run_one_step(self, dt):
         """
@@ -159,8 +162,8 @@ class BasicDdSt(_StochasticErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Handle water erosion
         self.handle_water_erosion_with_threshold(dt, flooded)
@@ -186,13 +189,13 @@ class BasicDdSt(_StochasticErosionModel):
         """
         # (if we're varying precipitation parameters through time, update them)
         if self.opt_var_precip:
-            self.intermittency_factor, self.mean_storm__intensity = self.pc.get_current_precip_params(self.model_time)
+            self.intermittency_factor = self.forcing.value('intermittency_factor', self.model_time)
+            self.mean_storm__intensity = self.forcing.value('mean_storm__intensity', self.model_time)
 
         # If we're handling duration deterministically, as a set fraction of
-        # time step duration, calculate a rainfall intensity. Otherwise,
-        # assume it's already been calculated.
+        # time step duration, each sub-time step below draws its own rainfall
+        # intensity. Otherwise, assume it's already been calculated.
         if not self.opt_stochastic_duration:
-            self.rain_rate = np.random.exponential(self.mean_storm__intensity)
             dt_water = dt * self.intermittency_factor
         else:
             dt_water = dt
@@ -206,7 +209,7 @@ class BasicDdSt(_StochasticErosionModel):
         else:
             runoff = self.rain_rate
 
-        self.discharge[:] = runoff * area
+        np.multiply(area, runoff, out=self.discharge)
 
         # Handle water erosion:
         #
@@ -226,9 +229,7 @@ class BasicDdSt(_StochasticErosionModel):
             dt_water = ((dt * self.intermittency_factor)
                          / float(self.n_sub_steps))
             for i in range(self.n_sub_steps):
-                self.rain_rate = \
-                    self.rain_generator.generate_from_stretched_exponential(
-                        self.scale_factor, self.shape_factor)
+                self.rain_rate = self.next_storm_intensity()
                 self.update_threshold_field()
                 runoff = self.calc_runoff_and_discharge()
                 self.eroder.run_one_step(dt_water, flooded_nodes=flooded)
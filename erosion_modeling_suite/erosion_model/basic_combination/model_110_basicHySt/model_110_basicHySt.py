@@ -35,7 +35,8 @@ PrecipitationDistribution, LinearDiffuser, HybridAlluvium
 """
 
 from erosion_model.stochastic_erosion_model import _StochasticErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 LinearDiffuser, ErosionDeposition)
 
 import numpy as np
@@ -83,10 +84,10 @@ class BasicHySt(_StochasticErosionModel):
         
         v_s = (self._length_factor)*self.get_parameter_from_exponent('v_s') # has units length per time
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         #set methods and fields.
         method = 'simple_stream_power'
@@ -137,6 +138,14 @@ class BasicHySt(_StochasticErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge',
+                                      settling_velocity=v_s)
+
     def calc_runoff_and_discharge(self):
         """Calculate runoff rate and discharge; return runoff."""
         if self.rain_rate > 0.0 and self.infilt > 0.0:
@@ -147,7 +156,7 @@ class BasicHySt(_StochasticErosionModel):
                 runoff = 0        
         else:
             runoff = self.rain_rate
-        self.discharge[:] = runoff * self.area        
+        np.multiply(self.area, runoff, out=self.discharge)
         return runoff
 
     def run_one_step(self, dt):
@@ -157,8 +166,8 @@ class BasicHySt(_StochasticErosionModel):
         # Route flow
         self.flow_router.run_one_step()
         
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Handle water erosion
         self.handle_water_erosion(dt, flooded)
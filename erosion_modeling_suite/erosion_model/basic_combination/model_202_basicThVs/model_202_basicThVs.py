@@ -15,10 +15,11 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.effective_area_calculator import EffectiveAreaCalculator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
-import numpy as np
 
 
 class BasicThVs(_ErosionModel):
@@ -47,21 +48,21 @@ class BasicThVs(_ErosionModel):
         K_hydraulic_conductivity = (self._length_factor)*self.params['K_hydraulic_conductivity'] # has units length per time
 
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
-
-        # Add a field for effective drainage area
-        if 'effective_drainage_area' in self.grid.at_node:
-            self.eff_area = self.grid.at_node['effective_drainage_area']
-        else:
-            self.eff_area = self.grid.add_zeros('node',
-                                                'effective_drainage_area')
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Get the effective-area parameter
         self.sat_param = (K_hydraulic_conductivity*soil_thickness*self.grid.dx)/(recharge_rate)
 
+        # Instantiate an EffectiveAreaCalculator, which creates the effective
+        # drainage area field
+        self.eff_area_calculator = EffectiveAreaCalculator(
+            self.grid, self.sat_param,
+            float32=self.params.get('effective_area_float32', False))
+        self.eff_area = self.eff_area_calculator.eff_area
+
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
                                                        K_sp=self.K_sp,
@@ -74,26 +75,14 @@ class BasicThVs(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='effective_drainage_area')
 
 
-    def calc_effective_drainage_area(self):
-        """Calculate and store effective drainage area.
-
-        Effective drainage area is defined as:
-
-        $A_{eff} = A \exp ( \alpha S / A) = A R_r$
-
-        where $S$ is downslope-positive steepest gradient, $A$ is drainage
-        area, $R_r$ is the runoff ratio, and $\alpha$ is the saturation
-        parameter.
-        """
-
-        area = self.grid.at_node['drainage_area']
-        slope = self.grid.at_node['topographic__steepest_slope']
-        cores = self.grid.core_nodes
-        self.eff_area[cores] = (area[cores] * (np.exp(-self.sat_param
-                                                      * slope[cores]
-                                                      / area[cores])))
 
     def run_one_step(self, dt):
         """
@@ -103,17 +92,15 @@ class BasicThVs(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Update effective runoff ratio
-        self.calc_effective_drainage_area()
-
-        # Zero out effective area in flooded nodes
-        self.eff_area[self.flow_router.depression_finder.flood_status==3] = 0.0
+        # Update effective drainage area, which is zero in flooded nodes
+        self.eff_area_calculator.run_one_step(
+            flooded_nodes=self.find_flooded_nodes())
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt)
 
         # Do some soil creep
@@ -17,10 +17,12 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.effective_area_calculator import EffectiveAreaCalculator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
-import numpy as np
 
 
 class BasicDdVs(_ErosionModel):
@@ -50,25 +52,31 @@ class BasicDdVs(_ErosionModel):
 
         self.threshold_value = self._length_factor*self.get_parameter_from_exponent('erosion__threshold') # has units length/time
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
 
-        # Add a field for effective drainage area
-        if 'effective_drainage_area' in self.grid.at_node:
-            self.eff_area = self.grid.at_node['effective_drainage_area']
-        else:
-            self.eff_area = self.grid.add_zeros('node',
-                                                'effective_drainage_area')
-
         # Get the effective-area parameter
         self.sat_param = (K_hydraulic_conductivity*soil_thickness*self.grid.dx)/(recharge_rate)
 
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.threshold_value
+        # Instantiate an EffectiveAreaCalculator, which creates the effective
+        # drainage area field
+        self.eff_area_calculator = EffectiveAreaCalculator(
+            self.grid, self.sat_param,
+            float32=self.params.get('effective_area_float32', False))
+        self.eff_area = self.eff_area_calculator.eff_area
+
+        # Get the parameter for rate of threshold increase with erosion depth
+        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.threshold_value,
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
 
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -78,33 +86,18 @@ class BasicDdVs(_ErosionModel):
                                                        n_sp=self.params['n_sp'],
                                                        threshold_sp=self.threshold)
 
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
-
         # Instantiate a LinearDiffuser component
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='effective_drainage_area')
 
 
-    def calc_effective_drainage_area(self):
-        """Calculate and store effective drainage area.
-
-        Effective drainage area is defined as:
-
-        $A_{eff} = A \exp ( \alpha S / A) = A R_r$
-
-        where $S$ is downslope-positive steepest gradient, $A$ is drainage
-        area, $R_r$ is the runoff ratio, and $\alpha$ is the saturation
-        parameter.
-        """
-
-        area = self.grid.at_node['drainage_area']
-        slope = self.grid.at_node['topographic__steepest_slope']
-        cores = self.grid.core_nodes
-        self.eff_area[cores] = (area[cores] * (np.exp(-self.sat_param
-                                                      * slope[cores]
-                                                      / area[cores])))
 
     def run_one_step(self, dt):
         """
@@ -114,33 +107,18 @@ class BasicDdVs(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Update effective runoff ratio
-        self.calc_effective_drainage_area()
-
-        # Zero out effective area in flooded nodes
-        self.eff_area[self.flow_router.depression_finder.flood_status==3] = 0.0
-
-        # Set the erosion threshold.
-        #
-        # Note that a minus sign is used because cum ero depth is negative for
-        # erosion, positive for deposition.
-        # The second line handles the case where there is growth, in which case
-        # we want the threshold to stay at its initial value rather than
-        # getting smaller.
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                      - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.threshold_value
-                             - (self.thresh_change_per_depth
-                                * cum_ero))
-        self.threshold[self.threshold < self.threshold_value] = \
-            self.threshold_value
+        # Update effective drainage area, which is zero in flooded nodes
+        self.eff_area_calculator.run_one_step(
+            flooded_nodes=self.find_flooded_nodes())
+
+        # Update cumulative erosion depth and the erosion threshold
+        self.threshold_tracker.run_one_step()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt)
 
         # Do some soil creep
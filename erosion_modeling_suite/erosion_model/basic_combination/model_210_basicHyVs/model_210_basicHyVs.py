@@ -16,9 +16,10 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.effective_area_calculator import EffectiveAreaCalculator
+from landlab.components import (DepressionFinderAndRouter,
                                 ErosionDeposition, LinearDiffuser)
-import numpy as np
 
 
 class BasicHyVs(_ErosionModel):
@@ -50,10 +51,10 @@ class BasicHyVs(_ErosionModel):
 
         v_sc = self.get_parameter_from_exponent('v_sc') # normalized settling velocity. Unitless.
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # set methods and fields. K's and sp_crits need to be field names
         method = 'simple_stream_power'
@@ -61,17 +62,17 @@ class BasicHyVs(_ErosionModel):
         area_field = 'effective_drainage_area'
         discharge_field = None
 
-        # Add a field for effective drainage area
-        if 'effective_drainage_area' in self.grid.at_node:
-            self.eff_area = self.grid.at_node['effective_drainage_area']
-        else:
-            self.eff_area = self.grid.add_zeros('node',
-                                                'effective_drainage_area')
-
         # Get the effective-area parameter
         self.sat_param = ((K_hydraulic_conductivity * soil_thickness
                            * self.grid.dx) / recharge_rate)
 
+        # Instantiate an EffectiveAreaCalculator, which creates the effective
+        # drainage area field
+        self.eff_area_calculator = EffectiveAreaCalculator(
+            self.grid, self.sat_param,
+            float32=self.params.get('effective_area_float32', False))
+        self.eff_area = self.eff_area_calculator.eff_area
+
         # Handle solver option
         try:
             solver = self.params['solver']
@@ -96,25 +97,14 @@ class BasicHyVs(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='effective_drainage_area',
+                                      settling_velocity=v_sc)
 
-    def calc_effective_drainage_area(self):
-        """Calculate and store effective drainage area.
-
-        Effective drainage area is defined as:
-
-        $A_{eff} = A \exp ( \alpha S / A) = A R_r$
-
-        where $S$ is downslope-positive steepest gradient, $A$ is drainage
-        area, $R_r$ is the runoff ratio, and $\alpha$ is the saturation
-        parameter.
-        """
-
-        area = self.grid.at_node['drainage_area']
-        slope = self.grid.at_node['topographic__steepest_slope']
-        cores = self.grid.core_nodes
-        self.eff_area[cores] = (area[cores] * (np.exp(-self.sat_param
-                                                      * slope[cores]
-                                                      / area[cores])))
 
     def run_one_step(self, dt):
         """
@@ -124,17 +114,15 @@ class BasicHyVs(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Update effective runoff ratio
-        self.calc_effective_drainage_area()
-
-        # Zero out effective area in flooded nodes
-        self.eff_area[self.flow_router.depression_finder.flood_status==3] = 0.0
+        # Update effective drainage area, which is zero in flooded nodes
+        self.eff_area_calculator.run_one_step(
+            flooded_nodes=self.find_flooded_nodes())
 
         # Do some erosion
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt)
 
         # Do some soil creep
@@ -28,7 +28,8 @@ PrecipitationDistribution, StreamPowerEroder, LinearDiffuser
 """
 
 from erosion_model.stochastic_erosion_model import _StochasticErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerEroder, LinearDiffuser)
 
 import numpy as np
@@ -57,10 +58,10 @@ class BasicStVs(_StochasticErosionModel):
         soil_thickness = (self._length_factor)*self.params['initial_soil_thickness'] # has units length
         K_hydraulic_conductivity = (self._length_factor)*self.params['K_hydraulic_conductivity'] # has units length per time
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # instantiate rain generator
         self.instantiate_rain_generator()
@@ -87,6 +88,8 @@ class BasicStVs(_StochasticErosionModel):
         # Keep a reference to drainage area and steepest-descent slope
         self.area = self.grid.at_node['drainage_area']
         self.slope = self.grid.at_node['topographic__steepest_slope']
+        self._node_ids = np.arange(self.grid.number_of_nodes)
+        self.update_sloped_nodes()
 
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerEroder(self.grid,
@@ -99,27 +102,67 @@ class BasicStVs(_StochasticErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge')
 
-    def calc_runoff_and_discharge(self):
-        """Calculate runoff rate and discharge; return runoff."""
 
-        # Here's the total (surface + subsurface) discharge
-        pa = self.rain_rate * self.area
+    def update_sloped_nodes(self):
+        """Store the nodes with positive slope, and their subsurface
+        discharge capacity.
+
+        Transmissivity x lambda x slope is the subsurface discharge
+        capacity. It depends only on slope, so this is called only after
+        flow routing, and not at each storm sub-step.
+        """
+        sloped = self.get_scratch('positive_slope', dtype=bool)
+        np.greater(self.slope, 0.0, out=sloped)
+        n_sloped = np.count_nonzero(sloped)
+
+        # Gather the sloped node IDs into a preallocated index buffer
+        self.sloped_nodes = self.get_scratch('sloped_nodes', dtype=int)[:n_sloped]
+        np.compress(sloped, self._node_ids, out=self.sloped_nodes)
 
-        # Transmissivity x lambda x slope = subsurface discharge capacity
-        tls = self.tlam * self.slope[np.where(self.slope > 0.0)[0]]
+        self.sloped_capacity = self.get_scratch('subsurface_capacity')[:n_sloped]
+        np.take(self.slope, self.sloped_nodes, out=self.sloped_capacity)
+        self.sloped_capacity *= self.tlam
 
-        # Subsurface discharge: zero where slope is flat
-        self.qss[np.where(self.slope <= 0.0)[0]] = 0.0
-        self.qss[np.where(self.slope > 0.0)[0]] = (tls 
-                    * (1.0 - np.exp(-pa[np.where(self.slope > 0.0)[0]] / tls)))
+    def calc_runoff_and_discharge(self):
+        """Calculate runoff rate and discharge; return runoff.
+
+        Works only on the nodes found by update_sloped_nodes; at all other
+        nodes there is no subsurface discharge.
+        """
+        nodes = self.sloped_nodes
+        tls = self.sloped_capacity
+        n_sloped = len(nodes)
+        pa = self.get_scratch('sloped_total_discharge')[:n_sloped]
+        qss = self.get_scratch('sloped_subsurface_discharge')[:n_sloped]
+
+        # Here's the total (surface + subsurface) discharge
+        np.multiply(self.area, self.rain_rate, out=self.discharge)
+        np.take(self.discharge, nodes, out=pa)
+
+        # Subsurface discharge:
+        # tls (1 - exp(-pa / tls)) = -tls expm1(-pa / tls)
+        np.divide(pa, tls, out=qss)
+        np.negative(qss, out=qss)
+        np.expm1(qss, out=qss)
+        qss *= tls
+        np.negative(qss, out=qss)
+        self.qss.fill(0.0)
+        self.qss[nodes] = qss
 
         # Surface discharge = total minus subsurface
         #
         # Note that roundoff errors can sometimes produce a tiny negative
         # value when qss and pa are close; make sure these are set to 0
-        self.discharge[:] = pa - self.qss
-        self.discharge[self.discharge < 0.0] = 0.0
+        pa -= qss
+        np.maximum(pa, 0.0, out=pa)
+        self.discharge[nodes] = pa
 
 
     def run_one_step(self, dt):
@@ -129,9 +172,10 @@ class BasicStVs(_StochasticErosionModel):
         
         # Route flow
         self.flow_router.run_one_step()
+        self.update_sloped_nodes()
         
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Handle water erosion
         self.handle_water_erosion(dt, flooded)
@@ -15,7 +15,8 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 Space, DepthDependentDiffuser,
                                 ExponentialWeatherer)
 import numpy as np
@@ -53,10 +54,10 @@ class BasicHySa(_ErosionModel):
         max_soil_production_rate = (self._length_factor)*self.params['max_soil_production_rate'] # has units length per time
         soil_production_decay_depth = (self._length_factor)*self.params['soil_production_decay_depth']   # has units length
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         #set methods and fields. K's and sp_crits need to be field names
         method = 'simple_stream_power'
@@ -105,6 +106,14 @@ class BasicHySa(_ErosionModel):
                                                linear_diffusivity=linear_diffusivity,
                                                soil_transport_decay_depth=soil_transport_decay_depth)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity * soil_transport_decay_depth,
+                                      erodibility=max(self.K_sed, self.K_br),
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='surface_water__discharge',
+                                      settling_velocity=v_sc)
+
         self.weatherer = ExponentialWeatherer(self.grid,
                                               max_soil_production_rate=max_soil_production_rate,
                                               soil_production_decay_depth=soil_production_decay_depth)
@@ -121,14 +130,14 @@ class BasicHySa(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
-        #print('There are ' + str(len(flooded)) + ' flooded nodes')
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
+        #print('There are ' + str(np.count_nonzero(flooded)) + ' flooded nodes')
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.eroder.K_sed = self.K_sed * erode_factor
             self.eroder.K_br = self.K_br * erode_factor
 
@@ -139,7 +148,7 @@ class BasicHySa(_ErosionModel):
         # the actual elevation, so we simply re-set bedrock elevation to the
         # lower of itself or the current elevation.
         b = self.grid.at_node['bedrock__elevation']
-        b[:] = np.minimum(b, self.grid.at_node['topographic__elevation'])
+        np.minimum(b, self.grid.at_node['topographic__elevation'], out=b)
 
         # Calculate regolith-production rate
         self.weatherer.calc_soil_prod_rate()
@@ -162,9 +171,10 @@ class BasicHySa(_ErosionModel):
     def check_stability(self):
         """Check stability and exit if unstable."""
         fields = self.grid.at_node.keys()
+        finite = self.get_scratch('finite', dtype=bool)
         for f in fields:
-            if (np.any(np.isnan(self.grid.at_node[f])) or
-                np.any(np.isinf(self.grid.at_node[f]))):
+            np.isfinite(self.grid.at_node[f], out=finite)
+            if not finite.all():
 
                 # model is unstable, write message and exit.
                 with open('model_failed.txt', 'w') as f:
@@ -15,7 +15,8 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 FastscapeEroder, DepthDependentTaylorDiffuser,
                                 ExponentialWeatherer)
 import numpy as np
@@ -61,10 +62,10 @@ class BasicChSa(_ErosionModel):
         soil_thickness[:] = initial_soil_thickness
         bedrock_elev[:] = self.z - initial_soil_thickness
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = FastscapeEroder(self.grid,
@@ -84,6 +85,12 @@ class BasicChSa(_ErosionModel):
                                                     soil_transport_decay_depth=soil_transport_decay_depth,
                                                     nterms=11)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity * soil_transport_decay_depth,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -92,14 +99,14 @@ class BasicChSa(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
 
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
@@ -108,7 +115,7 @@ class BasicChSa(_ErosionModel):
         # the actual elevation, so we simply re-set bedrock elevation to the
         # lower of itself or the current elevation.
         b = self.grid.at_node['bedrock__elevation']
-        b[:] = np.minimum(b, self.grid.at_node['topographic__elevation'])
+        np.minimum(b, self.grid.at_node['topographic__elevation'], out=b)
 
         # Calculate regolith-production rate
         self.weatherer.calc_soil_prod_rate()
@@ -14,7 +14,9 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.effective_area_calculator import EffectiveAreaCalculator
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerEroder, DepthDependentDiffuser,
                                 ExponentialWeatherer)
 import numpy as np
@@ -68,21 +70,22 @@ class BasicVsSa(_ErosionModel):
         soil_thickness[:] = initial_soil_thickness
         bedrock_elev[:] = self.z - initial_soil_thickness
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
-
-        # Add a field for effective drainage area
-        if 'effective_drainage_area' in self.grid.at_node:
-            self.eff_area = self.grid.at_node['effective_drainage_area']
-        else:
-            self.eff_area = self.grid.add_zeros('node',
-                                                'effective_drainage_area')
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Get the effective-length parameter
         self.sat_len = (K_hydraulic_conductivity*self.grid.dx)/(recharge_rate)
 
+        # Instantiate an EffectiveAreaCalculator, which creates the effective
+        # drainage area field
+        self.eff_area_calculator = EffectiveAreaCalculator(
+            self.grid, self.sat_len,
+            soil_depth='soil__depth',
+            float32=self.params.get('effective_area_float32', False))
+        self.eff_area = self.eff_area_calculator.eff_area
+
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerEroder(self.grid,
                                         use_Q=self.eff_area,
@@ -95,33 +98,19 @@ class BasicVsSa(_ErosionModel):
                                                linear_diffusivity=linear_diffusivity,
                                                soil_transport_decay_depth=soil_transport_decay_depth)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity * soil_transport_decay_depth,
+                                      erodibility=self.K_sp,
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      discharge='effective_drainage_area')
+
         self.weatherer = ExponentialWeatherer(self.grid,
                                               max_soil_production_rate=max_soil_production_rate,
                                               soil_production_decay_depth=soil_production_decay_depth)
 
 
 
-    def calc_effective_drainage_area(self):
-        """Calculate and store effective drainage area.
-
-        Effective drainage area is defined as:
-
-        $A_{eff} = A \exp ( c H S / A) = A R_r$
-
-        where $H$ is soil thickness, $S$ is downslope-positive steepest
-        gradient, $A$ is drainage area, $R_r$ is the runoff ratio, and $c$ is
-        the saturation length parameter.
-        """
-
-        area = self.grid.at_node['drainage_area']
-        slope = self.grid.at_node['topographic__steepest_slope']
-        soil = self.grid.at_node['soil__depth']
-        cores = self.grid.core_nodes
-        self.eff_area[cores] = (area[cores] * (np.exp(-self.sat_len
-                                                      * soil[cores]
-                                                      * slope[cores]
-                                                      / area[cores])))
-
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -130,17 +119,15 @@ class BasicVsSa(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Update effective runoff ratio
-        self.calc_effective_drainage_area()
-
-        # Zero out effective area in flooded nodes
-        self.eff_area[self.flow_router.depression_finder.flood_status==3] = 0.0
+        # Update effective drainage area, which is zero in flooded nodes
+        self.eff_area_calculator.run_one_step(
+            flooded_nodes=self.find_flooded_nodes())
 
         # Do some erosion (but not on the flooded nodes)
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
             self.eroder.K = (self.K_sp
-                             * self.pc.get_erodibility_adjustment_factor(self.model_time))
+                             * self.forcing.value('erodibility_factor', self.model_time))
         self.eroder.run_one_step(dt)
 
         # We must also now erode the bedrock where relevant. If water erosion
@@ -148,7 +135,7 @@ class BasicVsSa(_ErosionModel):
         # the actual elevation, so we simply re-set bedrock elevation to the
         # lower of itself or the current elevation.
         b = self.grid.at_node['bedrock__elevation']
-        b[:] = np.minimum(b, self.grid.at_node['topographic__elevation'])
+        np.minimum(b, self.grid.at_node['topographic__elevation'], out=b)
 
         # Calculate regolith-production rate
         self.weatherer.calc_soil_prod_rate()
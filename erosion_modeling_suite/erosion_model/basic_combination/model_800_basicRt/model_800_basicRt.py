@@ -14,12 +14,14 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.rock_till_mixin import _RockTillMixin
+from landlab.components import (DepressionFinderAndRouter,
                                 FastscapeEroder, LinearDiffuser)
 import numpy as np
 
 
-class BasicRt(_ErosionModel):
+class BasicRt(_RockTillMixin, _ErosionModel):
     """
     A BasicRt model computes erosion using linear diffusion, basic stream
     power with two rock units, and Q~A.
@@ -73,10 +75,10 @@ class BasicRt(_ErosionModel):
                                  self.K_till,
                                  contact_zone__width)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = FastscapeEroder(self.grid,
@@ -88,6 +90,12 @@ class BasicRt(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility='substrate__erodibility',
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def setup_rock_and_till(self, file_name, rock_erody, till_erody,
                             contact_width):
         """Set up lithology handling for two layers with different erodibility.
@@ -140,6 +148,9 @@ class BasicRt(_ErosionModel):
         # Read and remember the contact zone characteristic width
         self.contact_width = contact_width
 
+        # Store the nodes and contact elevations used by the erodibility update
+        self.setup_rock_till_nodes()
+
     def update_erodibility_field(self):
         """Update erodibility at each node based on elevation relative to
         contact elevation.
@@ -176,31 +187,35 @@ class BasicRt(_ErosionModel):
         """
 
         # Update the erodibility weighting function (this is "F")
-        self.erody_wt[self.data_nodes] = (1.0
-                            / (1.0
-                               + np.exp(-(self.z[self.data_nodes] - self.rock_till_contact[self.data_nodes])
-                                         / self.contact_width)))
+        self.update_rock_till_weight(self.erody_wt)
 
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.till_erody = self.K_till * erode_factor
             self.rock_erody = self.K_rock * erode_factor
 
         # Calculate the effective erodibilities using weighted averaging
-        self.erody[:] = (self.erody_wt * self.till_erody
-                         + (1.0 - self.erody_wt) * self.rock_erody)
+        self.blend_rock_till(self.erody_wt, self.till_erody,
+                             self.rock_erody, out=self.erody)
 
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
 
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update the erodibility field
         self.update_erodibility_field()
@@ -209,17 +224,13 @@ class BasicRt(_ErosionModel):
         self.eroder.run_one_step(dt, flooded_nodes=flooded,
                                  K_if_used=self.erody)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
@@ -14,13 +14,15 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.rock_till_mixin import _RockTillMixin
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
 import numpy as np
 
 
-class BasicThRt(_ErosionModel):
+class BasicThRt(_RockTillMixin, _ErosionModel):
     """
     A BasicThRt computes erosion using linear diffusion, stream
     power with a smoothed threshold, Q~A, and two lithologies: rock and till.
@@ -50,10 +52,10 @@ class BasicThRt(_ErosionModel):
                                  till_erosion__threshold,
                                  contact_zone__width)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a StreamPowerSmoothThresholdEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -66,6 +68,12 @@ class BasicThRt(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility='substrate__erodibility',
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def setup_rock_and_till(self, file_name, rock_erody, till_erody,
                             rock_thresh, till_thresh, contact_width):
         """Set up lithology handling for two layers with different erodibility.
@@ -126,6 +134,9 @@ class BasicThRt(_ErosionModel):
         # Read and remember the contact zone characteristic width
         self.contact_width = contact_width
 
+        # Store the nodes and contact elevations used by the erodibility update
+        self.setup_rock_till_nodes()
+
     def update_erodibility_and_threshold_fields(self):
         """Update erodibility and threshold at each node based on elevation
         relative to contact elevation.
@@ -163,35 +174,39 @@ class BasicThRt(_ErosionModel):
         """
 
         # Update the erodibility weighting function (this is "F")
-        self.erody_wt[self.data_nodes] = (1.0
-                            / (1.0
-                               + np.exp(-(self.z[self.data_nodes] - self.rock_till_contact[self.data_nodes])
-                                         / self.contact_width)))
+        self.update_rock_till_weight(self.erody_wt)
 
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.till_erody = self.K_till_sp * erode_factor
             self.rock_erody = self.K_rock_sp * erode_factor
 
         # Calculate the effective erodibilities using weighted averaging
-        self.erody[:] = (self.erody_wt * self.till_erody
-                         + (1.0 - self.erody_wt) * self.rock_erody)
+        self.blend_rock_till(self.erody_wt, self.till_erody,
+                             self.rock_erody, out=self.erody)
 
         # Calculate the effective thresholds using weighted averaging
-        self.threshold[:] = (self.erody_wt * self.till_thresh
-                             + (1.0 - self.erody_wt) * self.rock_thresh)
+        self.blend_rock_till(self.erody_wt, self.till_thresh,
+                             self.rock_thresh, out=self.threshold)
 
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
 
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update the erodibility and threshold field
         self.update_erodibility_and_threshold_fields()
@@ -199,17 +214,13 @@ class BasicThRt(_ErosionModel):
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
@@ -14,13 +14,16 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.rock_till_mixin import _RockTillMixin
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder,
                                 LinearDiffuser)
 import numpy as np
 
 
-class BasicDdRt(_ErosionModel):
+class BasicDdRt(_RockTillMixin, _ErosionModel):
     """
     A BasicDdRt computes erosion using linear diffusion, stream
     power with a smoothed threshold, Q~A, and two lithologies: rock and till.
@@ -47,15 +50,21 @@ class BasicDdRt(_ErosionModel):
                                  self.K_till_sp,
                                  contact_zone__width)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
 
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.threshold_value
+        # Get the parameter for rate of threshold increase with erosion depth
+        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.threshold_value,
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
 
         # Instantiate a StreamPowerSmoothThresholdEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -64,13 +73,16 @@ class BasicDdRt(_ErosionModel):
                                                        n_sp=self.params['n_sp'],
                                                        threshold_sp=self.threshold)
 
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
-
         # Instantiate a LinearDiffuser component
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility='substrate__erodibility',
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def setup_rock_and_till(self, file_name, rock_erody, till_erody,
                             contact_width):
         """Set up lithology handling for two layers with different erodibility.
@@ -117,6 +129,9 @@ class BasicDdRt(_ErosionModel):
         # Read and remember the contact zone characteristic width
         self.contact_width = contact_width
 
+        # Store the nodes and contact elevations used by the erodibility update
+        self.setup_rock_till_nodes()
+
     def update_erodibility_field(self):
         """Update erodibility at each node based on elevation
         relative to contact elevation.
@@ -156,50 +171,40 @@ class BasicDdRt(_ErosionModel):
         """
 
         # Update the erodibility weighting function (this is "F")
-        self.erody_wt[self.data_nodes] = (1.0
-                            / (1.0
-                               + np.exp(-(self.z[self.data_nodes] - self.rock_till_contact[self.data_nodes])
-                                         / self.contact_width)))
+        self.update_rock_till_weight(self.erody_wt)
 
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.till_erody = self.K_till_sp * erode_factor
             self.rock_erody = self.K_rock_sp * erode_factor
 
         # Calculate the effective erodibilities using weighted averaging
-        self.erody[:] = (self.erody_wt * self.till_erody
-                         + (1.0 - self.erody_wt) * self.rock_erody)
+        self.blend_rock_till(self.erody_wt, self.till_erody,
+                             self.rock_erody, out=self.erody)
 
     def update_erosion_threshold_values(self):
         """Updates the erosion threshold at each node based on cumulative
         erosion so far."""
-
-        # Set the erosion threshold.
-        #
-        # Note that a minus sign is used because cum ero depth is negative for
-        # erosion, positive for deposition.
-        # The second line handles the case where there is growth, in which case
-        # we want the threshold to stay at its initial value rather than
-        # getting smaller.
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                      - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.threshold_value
-                             - (self.thresh_change_per_depth
-                                * cum_ero))
-        self.threshold[self.threshold < self.threshold_value] = \
-            self.threshold_value
+        self.threshold_tracker.run_one_step()
 
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
+
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update the erodibility and threshold field
         self.update_erodibility_field()
@@ -210,17 +215,13 @@ class BasicDdRt(_ErosionModel):
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
@@ -18,16 +18,21 @@ both.
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.rock_till_mixin import _RockTillMixin
+from landlab.components import (DepressionFinderAndRouter,
                                 ErosionDeposition, LinearDiffuser)
 import numpy as np
 
-class BasicHyRt(_ErosionModel):
+class BasicHyRt(_RockTillMixin, _ErosionModel):
     """
     A BasicHyRt computes erosion using linear diffusion, hybrid alluvium
     stream erosion, Q~A, and two lithologies: rock and till.
     """
 
+    # The erodibility weighting function F is self.erody_wt_br
+    _rock_till_weight_name = 'erody_wt_br'
+
     def __init__(self, input_file=None, params=None,
                  BaselevelHandlerClass=None):
         """Initialize the BasicHyRt."""
@@ -55,10 +60,10 @@ class BasicHyRt(_ErosionModel):
                                  till_thresh_br=0.0,
                                  contact_width=contact_zone__width)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder=DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder=DepressionFinderAndRouter)
 
         # Handle solver option
         try:
@@ -83,6 +88,13 @@ class BasicHyRt(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity=linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility='K_br',
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'],
+                                      settling_velocity=v_sc)
+
     def setup_rock_and_till(self,
                             file_name='file',
                             rock_erody_br=1,
@@ -150,6 +162,9 @@ class BasicHyRt(_ErosionModel):
         # Read and remember the contact zone characteristic width
         self.contact_width = contact_width
 
+        # Store the nodes and contact elevations used by the erodibility update
+        self.setup_rock_till_nodes()
+
     def update_erodibility_and_threshold_fields(self):
         """Update erodibility and threshold at each node based on elevation
         relative to contact elevation.
@@ -187,34 +202,39 @@ class BasicHyRt(_ErosionModel):
         """
 
         # Update the erodibility weighting function (this is "F")
-        self.erody_wt_br[self.data_nodes] = (1.0
-                            / (1.0
-                               + np.exp(-(self.z[self.data_nodes] - self.rock_till_contact[self.data_nodes])
-                                         / self.contact_width)))
+        self.update_rock_till_weight(self.erody_wt_br)
 
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.till_erody_br = self.K_till_sp * erode_factor
             self.rock_erody_br = self.K_rock_sp * erode_factor
 
         # Calculate the effective BEDROCK erodibilities using weighted averaging
-        self.erody_br[:] = (self.erody_wt_br * self.till_erody_br
-                         + (1.0 - self.erody_wt_br) * self.rock_erody_br)
+        self.blend_rock_till(self.erody_wt_br, self.till_erody_br,
+                             self.rock_erody_br, out=self.erody_br)
 
         # Calculate the effective BEDROCK thresholds using weighted averaging
-        self.threshold_br[:] = (self.erody_wt_br * self.till_thresh_br
-                             + (1.0 - self.erody_wt_br) * self.rock_thresh_br)
+        self.blend_rock_till(self.erody_wt_br, self.till_thresh_br,
+                             self.rock_thresh_br, out=self.threshold_br)
 
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
+
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update the erodibility and threshold field
         self.update_erodibility_and_threshold_fields()
@@ -222,17 +242,13 @@ class BasicHyRt(_ErosionModel):
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
@@ -14,12 +14,14 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from erosion_model.rock_till_mixin import _RockTillMixin
+from landlab.components import (DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder, TaylorNonLinearDiffuser)
 import numpy as np
 
 
-class BasicChRtTh(_ErosionModel):
+class BasicChRtTh(_RockTillMixin, _ErosionModel):
     """
     A BasicChRt model computes erosion using cubic diffusion, basic stream
     power with two rock units, and Q~A.
@@ -49,10 +51,10 @@ class BasicChRtTh(_ErosionModel):
                                  till_erosion__threshold,
                                  contact_zone__width)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a StreamPowerSmoothThresholdEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(self.grid,
@@ -67,6 +69,12 @@ class BasicChRtTh(_ErosionModel):
                                                slope_crit=self.params['slope_crit'],
                                                nterms=7)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility='substrate__erodibility',
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def setup_rock_and_till(self, file_name, rock_erody, till_erody,
                             rock_thresh, till_thresh, contact_width):
         """Set up lithology handling for two layers with different erodibility.
@@ -127,6 +135,9 @@ class BasicChRtTh(_ErosionModel):
         # Read and remember the contact zone characteristic width
         self.contact_width = contact_width
 
+        # Store the nodes and contact elevations used by the erodibility update
+        self.setup_rock_till_nodes()
+
     def update_erodibility_and_threshold_fields(self):
         """Update erodibility and threshold at each node based on elevation
         relative to contact elevation.
@@ -164,38 +175,39 @@ class BasicChRtTh(_ErosionModel):
         """
 
         # Update the erodibility weighting function (this is "F")
-        D_over_D_star = ((self.z[self.data_nodes] - self.rock_till_contact[self.data_nodes])
-                                         / self.contact_width)
-
-        # truncate D_over_D star to remove potential for overflow in exponent
-        D_over_D_star[D_over_D_star < -100.0] = -100.0
-        D_over_D_star[D_over_D_star > 100.0] = 100.0
-
-        self.erody_wt[self.data_nodes] = (1.0 / (1.0 + np.exp(-D_over_D_star)))
+        self.update_rock_till_weight(self.erody_wt)
 
         # (if we're varying K through time, update that first)
         if self.opt_var_precip:
-            erode_factor = self.pc.get_erodibility_adjustment_factor(self.model_time)
+            erode_factor = self.forcing.value('erodibility_factor', self.model_time)
             self.till_erody = self.K_till_sp * erode_factor
             self.rock_erody = self.K_rock_sp * erode_factor
 
         # Calculate the effective erodibilities using weighted averaging
-        self.erody[:] = (self.erody_wt * self.till_erody
-                         + (1.0 - self.erody_wt) * self.rock_erody)
+        self.blend_rock_till(self.erody_wt, self.till_erody,
+                             self.rock_erody, out=self.erody)
 
         # Calculate the effective thresholds using weighted averaging
-        self.threshold[:] = (self.erody_wt * self.till_thresh
-                             + (1.0 - self.erody_wt) * self.rock_thresh)
+        self.blend_rock_till(self.erody_wt, self.till_thresh,
+                             self.rock_thresh, out=self.threshold)
 
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
         """
+        self.run_erosion(dt)
+        self.run_diffusion(dt)
+        self.finish_step(dt)
+
+    def run_erosion(self, dt):
+        """
+        Route flow and erode for a time-step of duration dt.
+        """
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update the erodibility and threshold field
         self.update_erodibility_and_threshold_fields()
@@ -203,20 +215,16 @@ class BasicChRtTh(_ErosionModel):
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
 
+    def run_diffusion(self, dt):
+        """
+        Move material on hillslopes for a time-step of duration dt.
+        """
         # Do some soil creep
         self.diffuser.run_one_step(dt,
                                    dynamic_dt=True,
                                    if_unstable='raise',
                                    courant_factor=0.1)
 
-        # calculate model time
-        self.model_time += dt
-
-        # Lower outlet
-        self.update_outlet(dt)
-
-        # Check walltime
-        self.check_walltime()
 
 def main():
     """Executes model."""
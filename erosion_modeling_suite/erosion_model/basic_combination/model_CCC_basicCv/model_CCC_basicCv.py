@@ -13,11 +13,11 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
-from landlab.components import (FlowAccumulator, DepressionFinderAndRouter,
+from erosion_model.forcing_schedule import ForcingSchedule
+from erosion_model.incremental_flow_accumulator import IncrementalFlowAccumulator
+from landlab.components import (DepressionFinderAndRouter,
                                 FastscapeEroder, LinearDiffuser)
 
-import numpy as np
-from scipy.interpolate import interp1d
 
 class BasicCv(_ErosionModel):
     """
@@ -43,18 +43,24 @@ class BasicCv(_ErosionModel):
         self.climate_factor = self.params['climate_factor']
         self.climate_constant_date = self.params['climate_constant_date']
 
+        # K changes linearly from K_sp times climate_factor at the start to
+        # K_sp at climate_constant_date, and then stays constant.
+        self.K_sp = K_sp
         time = [0, self.climate_constant_date, self.params['run_duration']]
-        K = [K_sp*self.climate_factor, K_sp, K_sp]
-        self.K_through_time = interp1d(time, K)
+        climate_factors = [self.climate_factor, 1.0, 1.0]
+        if self.forcing is None:
+            self.forcing = ForcingSchedule(time, climate_factor=climate_factors)
+        else:
+            self.forcing.add('climate_factor', time, climate_factors)
 
-        # Instantiate a FlowAccumulator with DepressionFinderAndRouter using D8 method
-        self.flow_router = FlowAccumulator(self.grid,
-                                           flow_director='D8',
-                                           depression_finder = DepressionFinderAndRouter)
+        # Instantiate an IncrementalFlowAccumulator with DepressionFinderAndRouter using D8 method
+        self.flow_router = IncrementalFlowAccumulator(self.grid,
+                                                      flow_director='D8',
+                                                      depression_finder = DepressionFinderAndRouter)
 
         # Instantiate a FastscapeEroder component
         self.eroder = FastscapeEroder(self.grid,
-                                      K_sp=K[0],
+                                      K_sp=K_sp*self.climate_factor,
                                       m_sp=self.params['m_sp'],
                                       n_sp=self.params['n_sp'])
 
@@ -62,6 +68,12 @@ class BasicCv(_ErosionModel):
         self.diffuser = LinearDiffuser(self.grid,
                                        linear_diffusivity = linear_diffusivity)
 
+        # Describe processes for adaptive time stepping
+        self.set_stability_parameters(diffusivity=linear_diffusivity,
+                                      erodibility=K_sp*max(climate_factors),
+                                      m=self.params['m_sp'],
+                                      n=self.params['n_sp'])
+
     def run_one_step(self, dt):
         """
         Advance model for one time-step of duration dt.
@@ -69,11 +81,12 @@ class BasicCv(_ErosionModel):
         # Route flow
         self.flow_router.run_one_step()
 
-        # Get IDs of flooded nodes, if any
-        flooded = np.where(self.flow_router.depression_finder.flood_status==3)[0]
+        # Find flooded nodes, if any
+        flooded = self.find_flooded_nodes()
 
         # Update erosion based on climate
-        self.eroder.K = float(self.K_through_time(self.model_time))
+        self.eroder.K = (self.K_sp
+                         * self.forcing.value('climate_factor', self.model_time))
 
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
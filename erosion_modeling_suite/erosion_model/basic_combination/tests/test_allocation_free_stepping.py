@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+test_allocation_free_stepping.py: check that time steps reuse their work
+arrays instead of allocating new ones.
+"""
+
+import functools
+import tracemalloc
+
+import pytest
+from landlab.components.flow_accum import flow_accum_bw
+
+import erosion_model
+from erosion_model import Basic
+
+
+NUMBER_OF_STEPS = 20
+NUMBER_OF_NODE_ROWS = 40
+NUMBER_OF_NODE_COLUMNS = 40
+
+# Largest allocation, in bytes, allowed at any point of a step. Far less than
+# one node array (8 bytes per node), this leaves room only for Python objects
+# such as array views and floats.
+ALLOCATION_TOLERANCE = NUMBER_OF_NODE_ROWS * NUMBER_OF_NODE_COLUMNS
+
+MODEL_NAMES = ['Basic', 'BasicTh', 'BasicDd', 'BasicHy', 'BasicThHy',
+               'BasicDdHy', 'BasicCh', 'BasicSt', 'BasicThSt', 'BasicDdSt',
+               'BasicHySt', 'BasicVs', 'BasicThVs', 'BasicDdVs', 'BasicHyVs',
+               'BasicStVs', 'BasicSa', 'BasicHySa', 'BasicChSa', 'BasicVsSa',
+               'BasicRt', 'BasicThRt', 'BasicDdRt', 'BasicHyRt', 'BasicChRt',
+               'BasicChRtTh', 'BasicVsRt', 'BasicSaRt', 'BasicCv']
+
+
+def write_rock_till_file(file_name, elevation=-10.0):
+    """Write a flat rock-till contact, in the ESRI ASCII format the Rt
+    models read (without the one-node halo)."""
+    n_rows = NUMBER_OF_NODE_ROWS - 2
+    n_columns = NUMBER_OF_NODE_COLUMNS - 2
+    with open(file_name, 'w') as f:
+        f.write('ncols ' + str(n_columns) + '\n')
+        f.write('nrows ' + str(n_rows) + '\n')
+        f.write('xllcorner 10.0\n')
+        f.write('yllcorner 10.0\n')
+        f.write('cellsize 10.0\n')
+        f.write('NODATA_value -9999\n')
+        for row in range(n_rows):
+            f.write(' '.join([str(elevation)] * n_columns) + '\n')
+
+
+def make_params(rock_till_file_name=None, **kwds):
+    """Return parameters, for any basic_combination model, for a small model
+    on a rectangular grid."""
+    params = {'number_of_node_rows': NUMBER_OF_NODE_ROWS,
+              'number_of_node_columns': NUMBER_OF_NODE_COLUMNS,
+              'node_spacing': 10.0,
+              'dt': 10.0,
+              'output_interval': 1000.0,
+              'run_duration': 1000.0,
+              'random_seed': 1,
+              'm_sp': 0.5,
+              'n_sp': 1.0,
+              'linear_diffusivity': 0.01,
+              'K_sp': 0.001,
+              'K_stochastic_sp': 0.001,
+              'K_rock_sp': 0.0005,
+              'K_till_sp': 0.001,
+              'K_sed_sp': 0.001,
+              'contact_zone__width': 1.0,
+              'erosion__threshold': 0.01,
+              'rock_erosion__threshold': 0.02,
+              'till_erosion__threshold': 0.01,
+              'thresh_change_per_depth': 0.001,
+              'slope_crit': 0.6,
+              'F_f': 0.5,
+              'phi': 0.3,
+              'v_sc': 0.001,
+              'v_s': 0.001,
+              'H_star': 0.1,
+              'solver': 'original',
+              'initial_soil_thickness': 1.0,
+              'max_soil_production_rate': 0.001,
+              'soil_production_decay_depth': 0.5,
+              'soil_transport_decay_depth': 0.5,
+              'K_hydraulic_conductivity': 0.1,
+              'recharge_rate': 0.5,
+              'infiltration_capacity': 0.1,
+              'opt_stochastic_duration': False,
+              'mean_storm__intensity': 1.0,
+              'intermittency_factor': 0.1,
+              'precip_shape_factor': 0.65,
+              'number_of_sub_time_steps': 2,
+              # enough storm intensities for the whole test, so no batch is
+              # drawn while allocation is measured
+              'storm_intensity_batch_size': 10 * NUMBER_OF_STEPS,
+              'climate_factor': 2.0,
+              'climate_constant_date': 500.0}
+    if rock_till_file_name is not None:
+        params['rock_till_file__name'] = rock_till_file_name
+    params.update(kwds)
+    return params
+
+
+# Landlab functions called directly by the models' own code, as
+# (module, function name)
+LANDLAB_FUNCTIONS = [(flow_accum_bw, 'make_ordered_node_array')]
+
+
+def is_landlab(obj):
+    """Return True if obj was defined in a Landlab module."""
+    return (getattr(obj, '__module__', None) or '').startswith('landlab')
+
+
+def is_component(obj):
+    """Return True if obj is an instance of a Landlab class, or of a
+    subclass of one."""
+    return any(is_landlab(cls) for cls in type(obj).__mro__)
+
+
+class AllocationMonitor(object):
+    """Record the largest allocation made by a model's own code during a
+    time step.
+
+    Allocations made inside Landlab code are not the model's to avoid. Each
+    public method that a Landlab module defines, of each component the
+    model holds (and of the components they hold), is wrapped so that,
+    while it runs, the traced peak is not charged to the model: the peak
+    reached before the outermost call is recorded, and the peak is reset
+    after it. Methods that this repository defines, in its subclasses of
+    Landlab components, and grid methods are charged to the model.
+    """
+
+    def __init__(self, model):
+        self.largest = 0
+        self._base = 0
+        self._depth = 0
+        self._wrapped = set()
+        self._wrap_components(model, model.grid)
+
+    def _wrap_components(self, owner, grid):
+        for obj in list(vars(owner).values()):
+            if (obj is not grid and is_component(obj)
+                    and id(obj) not in self._wrapped):
+                self._wrapped.add(id(obj))
+                self._wrap(obj)
+                self._wrap_components(obj, grid)
+
+    def _wrap(self, component):
+        for name in dir(component):
+            if name.startswith('_'):
+                continue
+            try:
+                method = getattr(component, name)
+            except Exception:
+                continue
+            if (callable(method) and hasattr(method, '__self__') and
+                    is_landlab(getattr(method, '__func__', method))):
+                setattr(component, name, self.excluded(method))
+
+    def excluded(self, method):
+        """Return method, wrapped so that its allocations are not charged
+        to the model."""
+        @functools.wraps(method)
+        def wrapper(*args, **kwds):
+            if self._depth == 0:
+                self._charge()
+            self._depth += 1
+            try:
+                return method(*args, **kwds)
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._restart()
+        return wrapper
+
+    def _charge(self):
+        """Record the peak allocated since the last restart."""
+        peak = tracemalloc.get_traced_memory()[1]
+        self.largest = max(self.largest, peak - self._base)
+
+    def _restart(self):
+        """Measure from current memory use."""
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def measure(self, step, number_of_steps):
+        """Run step() number_of_steps times, and return the largest
+        allocation at any point of any step."""
+        tracemalloc.start()
+        try:
+            for i in range(number_of_steps):
+                self._restart()
+                step()
+                self._charge()
+        finally:
+            tracemalloc.stop()
+        return self.largest
+
+
+@pytest.fixture
+def rock_till_file_name(tmp_path):
+    file_name = str(tmp_path / 'rock_till_contact.asc')
+    write_rock_till_file(file_name)
+    return file_name
+
+
+def test_scratch_is_reused():
+    """get_scratch returns the same array each time it is asked for."""
+    model = Basic(params=make_params())
+    work = model.get_scratch('work')
+    assert work.size == model.grid.number_of_nodes
+    assert model.get_scratch('work') is work
+    assert model.get_scratch('flags', dtype=bool).dtype == bool
+
+
+@pytest.mark.parametrize('model_name', MODEL_NAMES)
+def test_steps_without_allocation(model_name, rock_till_file_name,
+                                  monkeypatch):
+    """A time step of each model allocates no arrays outside its
+    components."""
+    ModelClass = getattr(erosion_model, model_name)
+    model = ModelClass(params=make_params(rock_till_file_name))
+    dt = model.params['dt']
+
+    # One step first, so that scratch arrays already exist.
+    model.run_one_step(dt)
+
+    monitor = AllocationMonitor(model)
+    for (module, name) in LANDLAB_FUNCTIONS:
+        monkeypatch.setattr(module, name,
+                            monitor.excluded(getattr(module, name)))
+    largest = monitor.measure(lambda: model.run_one_step(dt), NUMBER_OF_STEPS)
+    assert largest < ALLOCATION_TOLERANCE
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+test_ensemble_erosion_model.py: check that an ErosionModelEnsemble gives
+the same topography as running each of its members on its own.
+"""
+
+import numpy as np
+import pytest
+
+from erosion_model import Basic, BasicRt, ErosionModelEnsemble
+
+
+NUMBER_OF_NODE_ROWS = 8
+NUMBER_OF_NODE_COLUMNS = 10
+NODE_SPACING = 10.0
+DT = 10.0
+RUN_DURATION = 200.0
+RANDOM_SEED = 3
+
+# Diffusivities from well below to well above the stable limit for one
+# time step, so that members take different numbers of sub-steps.
+LINEAR_DIFFUSIVITIES = [0.01, 0.5, 5.0, 20.0]
+
+
+def write_rock_till_file(file_name, elevation=0.5):
+    """Write a flat rock-till contact, in the ESRI ASCII format the Rt
+    models read (without the one-node halo)."""
+    n_rows = NUMBER_OF_NODE_ROWS - 2
+    n_columns = NUMBER_OF_NODE_COLUMNS - 2
+    with open(file_name, 'w') as f:
+        f.write('ncols ' + str(n_columns) + '\n')
+        f.write('nrows ' + str(n_rows) + '\n')
+        f.write('xllcorner 10.0\n')
+        f.write('yllcorner 10.0\n')
+        f.write('cellsize 10.0\n')
+        f.write('NODATA_value -9999\n')
+        for row in range(n_rows):
+            f.write(' '.join([str(elevation)] * n_columns) + '\n')
+
+
+def make_params_list(rock_till_file_name):
+    """Return one parameter dictionary per ensemble member."""
+    params_list = []
+    for (i, linear_diffusivity) in enumerate(LINEAR_DIFFUSIVITIES):
+        params_list.append({'number_of_node_rows': NUMBER_OF_NODE_ROWS,
+                            'number_of_node_columns': NUMBER_OF_NODE_COLUMNS,
+                            'node_spacing': NODE_SPACING,
+                            'dt': DT,
+                            'output_interval': RUN_DURATION,
+                            'run_duration': RUN_DURATION,
+                            'm_sp': 0.5,
+                            'n_sp': 1.0,
+                            'linear_diffusivity': linear_diffusivity,
+                            'K_sp': 0.001 * (i + 1),
+                            'K_rock_sp': 0.0005 * (i + 1),
+                            'K_till_sp': 0.001 * (i + 1),
+                            'contact_zone__width': 0.2,
+                            'rock_till_file__name': rock_till_file_name})
+    return params_list
+
+
+def make_standalone_model(ModelClass, params, seed_sequence):
+    """Create a model on its own, with the random streams it has as an
+    ensemble member."""
+    model = ModelClass.__new__(ModelClass)
+    model._seed_sequence = seed_sequence
+    model.__init__(params=params)
+    return model
+
+
+@pytest.mark.parametrize('ModelClass', [Basic, BasicRt])
+def test_ensemble_matches_standalone_models(ModelClass, tmp_path):
+    """Each ensemble member ends with the topography of the same model
+    run on its own."""
+    rock_till_file_name = str(tmp_path / 'rock_till_contact.asc')
+    write_rock_till_file(rock_till_file_name)
+    params_list = make_params_list(rock_till_file_name)
+
+    ensemble = ErosionModelEnsemble(ModelClass, params_list=params_list,
+                                    random_seed=RANDOM_SEED)
+    seed_sequences = np.random.SeedSequence(RANDOM_SEED).spawn(
+        len(params_list))
+    models = [make_standalone_model(ModelClass, params, seed_sequence)
+              for (params, seed_sequence) in zip(params_list, seed_sequences)]
+
+    # The stacked updates, not the members' own, are being checked.
+    assert ensemble.diffuser is not None
+    if ModelClass is BasicRt:
+        assert ensemble.rock_till_weight is not None
+
+    for (i, model) in enumerate(models):
+        np.testing.assert_array_equal(ensemble.z[i], model.z)
+
+    ensemble.run_for(DT, RUN_DURATION)
+    for model in models:
+        model.run_for(DT, RUN_DURATION)
+
+    for (i, model) in enumerate(models):
+        assert ensemble.members[i].model_time == model.model_time
+        np.testing.assert_allclose(ensemble.z[i], model.z,
+                                   rtol=1e-10, atol=1e-10)
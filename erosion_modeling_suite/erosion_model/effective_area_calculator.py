@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+effective_area_calculator.py: effective drainage area for the variable
+source area (Vs) models.
+"""
+
+import numpy as np
+
+
+class EffectiveAreaCalculator(object):
+    """
+    An EffectiveAreaCalculator calculates effective drainage area,
+
+        A_eff = A exp(-alpha S / A),
+
+    at core nodes, where S is downslope-positive steepest gradient, A is
+    drainage area, and alpha is the saturation parameter. If soil_depth is
+    given, alpha is saturation_param times soil depth, node by node.
+
+    The core node indices and work arrays are set up once, and each step is
+    one pass over the core nodes, written in place with no temporary
+    arrays. Calculations are done in float32 if float32 is True.
+
+    Effective area is written in place into the effective_drainage_area
+    field, which is created if needed.
+
+    Parameters
+    ----------
+    grid : ModelGrid
+    saturation_param : float
+    soil_depth : str, optional
+        Name of a soil depth field that alpha is proportional to.
+    float32 : bool, optional
+
+    Examples
+    --------
+    >>> from landlab import RasterModelGrid
+    >>> from erosion_model.effective_area_calculator import EffectiveAreaCalculator
+    >>> grid = RasterModelGrid((3, 4))
+    >>> area = grid.add_ones('node', 'drainage_area')
+    >>> slope = grid.add_zeros('node', 'topographic__steepest_slope')
+    >>> eac = EffectiveAreaCalculator(grid, 1.0)
+    >>> eac.run_one_step()
+    >>> grid.at_node['effective_drainage_area'][grid.core_nodes]
+    array([1., 1.])
+    """
+
+    def __init__(self, grid, saturation_param, soil_depth=None,
+                 float32=False):
+        """Initialize the EffectiveAreaCalculator."""
+        self.grid = grid
+        self.saturation_param = saturation_param
+
+        if 'effective_drainage_area' in grid.at_node:
+            self.eff_area = grid.at_node['effective_drainage_area']
+        else:
+            self.eff_area = grid.add_zeros('node', 'effective_drainage_area')
+        self._area_field = grid.at_node['drainage_area']
+        self._slope_field = grid.at_node['topographic__steepest_slope']
+        if soil_depth is None:
+            self._soil_field = None
+        else:
+            self._soil_field = grid.at_node[soil_depth]
+
+        self._cores = grid.core_nodes
+        n_cores = len(self._cores)
+        dtype = np.float32 if float32 else np.float64
+
+        # Work arrays for one input field, area, the exponent and effective
+        # area at core nodes
+        self._input = np.empty(n_cores)
+        self._area = np.empty(n_cores, dtype=dtype)
+        self._ratio = np.empty(n_cores, dtype=dtype)
+        self._core_eff_area = np.empty(n_cores, dtype=dtype)
+
+    def run_one_step(self, flooded_nodes=None):
+        """Update effective drainage area, and set it to zero at
+        flooded_nodes (an array of node indices or a boolean mask)."""
+        a = self._area
+        r = self._ratio
+        np.take(self._area_field, self._cores, out=self._input)
+        a[:] = self._input
+        np.take(self._slope_field, self._cores, out=self._input)
+        r[:] = self._input
+        if self._soil_field is not None:
+            np.take(self._soil_field, self._cores, out=self._input)
+            r *= self._input
+        r *= -self.saturation_param
+        r /= a
+        np.exp(r, out=r)
+        np.multiply(r, a, out=self._core_eff_area)
+
+        self.eff_area[self._cores] = self._core_eff_area
+        if flooded_nodes is not None:
+            self.eff_area[flooded_nodes] = 0.0
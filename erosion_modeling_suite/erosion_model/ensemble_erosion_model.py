@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+ensemble_erosion_model.py: run several parameter sets of one erosion model
+together, in a single process, on one grid topology.
+"""
+
+import numpy as np
+from landlab import load_params
+from landlab.components import LinearDiffuser
+
+from .erosion_model import _ErosionModel
+from .ensemble_linear_diffuser import EnsembleLinearDiffuser
+from .rock_till_mixin import rock_till_weight
+from .walltime_tracker import WalltimeTracker
+
+
+class ErosionModelEnsemble(_ErosionModel):
+    """
+    An ErosionModelEnsemble advances a set of members, one per parameter set,
+    of a single erosion model class.
+
+    Each DEM is read only once. Every member gets a copy of the grid read
+    from that DEM, so it does not parse the file again. The
+    topographic__elevation field of each member is a row of one
+    (n_members, n_nodes) array, self.z.
+
+    The parts of a time step that do not depend on flow routing are done
+    for all members at once, on the stacked arrays:
+
+        - For rock-till (Rt) models, the erodibility weighting function F
+          of every member is one row of self.rock_till_weight, calculated
+          in one pass. Each member then blends its own erodibility (and
+          threshold) from F.
+        - If every member diffuses with a LinearDiffuser on grids of the
+          same shape, spacing and core nodes, hillslope diffusion of all
+          members is done by one EnsembleLinearDiffuser.
+
+    Flow routing and erosion are Landlab components that each work on one
+    grid, and are run once per member. Members of models whose
+    run_one_step is not split into run_erosion, run_diffusion and
+    finish_step (Basic and the Rt models are) are stepped one at a time.
+
+    The ensemble uses the run, run_for, check_walltime, save_checkpoint and
+    load_checkpoint of _ErosionModel, with its own model time and output
+    iteration. With adaptive time steps, each step is the shortest of the
+    members' adaptive steps. The ensemble, not its members, tracks
+    walltime: when it runs out, one checkpoint holding the state of every
+    member is written to checkpoint_name, and load_checkpoint restores all
+    members from it.
+
+    Each member owns its random streams. Their SeedSequences are spawned
+    from one made from random_seed (by default, the random_seed parameter
+    of the first member, or 0), so an ensemble is reproducible however its
+    members are later run, and members do not share random state.
+
+    All members must use the same dt, run_duration, output_interval and
+    opt_adaptive_dt. Stochastic-duration models are not supported. In
+    those models, each member draws its own sequence of time steps.
+    Walltime options are taken from the parameters of the first member.
+
+    Examples
+    --------
+    >>> import os
+    >>> from erosion_model import Basic, ErosionModelEnsemble
+    >>> files = ['inputs.0.txt', 'inputs.1.txt']
+    >>> ens = ErosionModelEnsemble(Basic, input_files=files)  # doctest: +SKIP
+    >>> if os.path.exists(ens.checkpoint_name):  # doctest: +SKIP
+    ...     ens.load_checkpoint()
+    >>> ens.run(output_fields=['topographic__elevation'])  # doctest: +SKIP
+    """
+
+    def __init__(self, ModelClass, input_files=None, params_list=None,
+                 BaselevelHandlerClass=None, random_seed=None,
+                 checkpoint_name='saved_ensemble.npz'):
+        """Read the shared topography once and initialize each member.
+
+        The grid, I/O and process setup of _ErosionModel.__init__ belong to
+        the members, so it is not called here.
+        """
+
+        # Make sure user has given us input files or parameter dictionaries
+        # (but not both)
+        if input_files is None and params_list is None:
+            raise ValueError('You must specify either input_files or '
+                             'params_list.')
+        if input_files is not None and params_list is not None:
+            raise ValueError('ErosionModelEnsemble takes EITHER input_files '
+                             'or params_list, but not both.')
+        if input_files is not None:
+            params_list = [load_params(f) for f in input_files]
+
+        self.params_list = list(params_list)
+        self.n_members = len(self.params_list)
+        if self.n_members == 0:
+            raise ValueError('An ensemble needs at least one member.')
+
+        # All members are stepped together, so they must share a clock.
+        for key in ['dt', 'run_duration', 'output_interval', 'opt_adaptive_dt']:
+            values = set(params.get(key) for params in self.params_list)
+            if len(values) > 1:
+                raise ValueError('All ensemble members must use the same '
+                                 'value of ' + key + '.')
+        if any(params.get('opt_stochastic_duration')
+               for params in self.params_list):
+            raise ValueError('ErosionModelEnsemble does not support '
+                             'opt_stochastic_duration.')
+        self.params = self.params_list[0]
+        self.checkpoint_name = checkpoint_name
+
+        # Read each DEM once, then create the array that holds the
+        # topography of every member.
+        templates = {}
+        number_of_nodes = set()
+        for params in self.params_list:
+            dem_filename = params.get('DEM_filename')
+            if dem_filename is None:
+                number_of_nodes.add(params.get('number_of_node_rows', 4)
+                                    * params.get('number_of_node_columns', 5))
+            else:
+                if dem_filename not in templates:
+                    (grid, z) = _ErosionModel.read_topography(dem_filename,
+                                                              name='topographic__elevation',
+                                                              halo=1)
+                    templates[dem_filename] = grid
+                number_of_nodes.add(templates[dem_filename].number_of_nodes)
+        if len(number_of_nodes) > 1:
+            raise ValueError('All ensemble members must use grids with the '
+                             'same number of nodes.')
+        self.z = np.zeros((self.n_members, number_of_nodes.pop()))
+
+        # Give each member its own SeedSequence.
+        if random_seed is None:
+            random_seed = int(self.params.get('random_seed', 0))
+        self.seed_sequence = np.random.SeedSequence(random_seed)
+        member_seed_sequences = self.seed_sequence.spawn(self.n_members)
+
+        # Create members. Setting the template grid and elevation buffer
+        # before calling __init__ lets _ErosionModel use them in place of
+        # reading the DEM, and setting the seed sequence gives the member
+        # its own random streams. Walltime is tracked by the ensemble, so
+        # members never write checkpoints of their own.
+        self.members = []
+        for i, params in enumerate(self.params_list):
+            member = ModelClass.__new__(ModelClass)
+            member._template_grid = templates.get(params.get('DEM_filename'))
+            member._elevation_buffer = self.z[i]
+            member._seed_sequence = member_seed_sequences[i]
+            member.__init__(params=params,
+                            BaselevelHandlerClass=BaselevelHandlerClass)
+            member.walltime_tracker = None
+            self.members.append(member)
+
+        # instantiate model time and output iteration, as _ErosionModel
+        # does.
+        self.model_time = 0.
+        self.iteration = 0
+        self.save_first_timestep = any(member.save_first_timestep
+                                       for member in self.members)
+        self.opt_adaptive_dt = self.members[0].opt_adaptive_dt
+
+        # Handle option to save if walltime is to short.
+        self.opt_save = self.params.get('opt_save') or False
+        if self.opt_save:
+            self.walltime_tracker = WalltimeTracker(self.params.get('walltime'))
+            if not self.walltime_tracker.limited:
+                self.walltime_tracker = None
+        else:
+            self.walltime_tracker = None
+
+        # Members are stepped in parts only if every member can be.
+        self.opt_split_steps = all(hasattr(member, 'run_erosion')
+                                   for member in self.members)
+
+        self.setup_rock_till_weight()
+        self.setup_diffuser()
+
+    def _members_share(self, name):
+        """Return True if the array attribute name is equal in every
+        member."""
+        first = getattr(self.members[0], name)
+        return all(np.array_equal(getattr(member, name), first)
+                   for member in self.members[1:])
+
+    def setup_rock_till_weight(self):
+        """Stack the rock-till weighting function F of every member.
+
+        Each member's array of F is replaced by a row of one (n_members,
+        n_nodes) array, self.rock_till_weight, which update_rock_till_weight
+        sets for all members at once. This is done only if every member is
+        a rock-till model with a contact zone of non-zero width, and all
+        calculate F at the same nodes. Otherwise self.rock_till_weight is
+        None, and each member calculates its own F.
+        """
+        self.rock_till_weight = None
+        if not all(hasattr(member, '_rock_till_nodes')
+                   for member in self.members):
+            return
+        if not all(member.contact_width > 0. for member in self.members):
+            return
+        if not self._members_share('_rock_till_nodes'):
+            return
+
+        self._rock_till_nodes = self.members[0]._rock_till_nodes
+        self._rock_till_contact_at_nodes = np.vstack(
+            [member._rock_till_contact_at_nodes for member in self.members])
+        self._contact_width = np.array([[member.contact_width]
+                                        for member in self.members])
+        self._rock_till_scratch = np.empty(self._rock_till_contact_at_nodes.shape)
+
+        self.rock_till_weight = np.zeros(self.z.shape)
+        for i, member in enumerate(self.members):
+            weight = self.rock_till_weight[i]
+            weight[:] = getattr(member, member._rock_till_weight_name)
+            setattr(member, member._rock_till_weight_name, weight)
+            member._external_rock_till_weight = True
+
+    def update_rock_till_weight(self):
+        """Set the weighting function F of every rock-till member at once.
+
+        This is the calculation of _RockTillMixin.update_rock_till_weight,
+        done on (n_members, n_rock_till_nodes) arrays:
+
+            F = 1 / (1 + exp(-(z - b) / D*))
+        """
+        d = self._rock_till_scratch
+        np.take(self.z, self._rock_till_nodes, axis=1, out=d)
+        rock_till_weight(d, self._rock_till_contact_at_nodes,
+                         self._contact_width)
+        self.rock_till_weight[:, self._rock_till_nodes] = d
+
+    def setup_diffuser(self):
+        """Set up diffusion of all members at once.
+
+        This is done if members are stepped in parts, every member diffuses
+        with a LinearDiffuser, and all members have grids of the same shape,
+        node spacing and boundary conditions. Otherwise self.diffuser is
+        None, and each member runs its own diffusion.
+        """
+        self.diffuser = None
+        if not self.opt_split_steps:
+            return
+        if not all(isinstance(getattr(member, 'diffuser', None),
+                              LinearDiffuser)
+                   for member in self.members):
+            return
+        grids = [member.grid for member in self.members]
+        if not all(grid.shape == grids[0].shape and
+                   grid.dx == grids[0].dx and
+                   grid.dy == grids[0].dy and
+                   np.array_equal(grid.status_at_node,
+                                  grids[0].status_at_node)
+                   for grid in grids[1:]):
+            return
+
+        diffusivity = [member._stability_parameters['diffusivity']
+                       for member in self.members]
+        self.diffuser = EnsembleLinearDiffuser(self.members[0].grid, self.z,
+                                               diffusivity)
+
+    def run_one_step(self, dt):
+        """Advance every member for one time-step of duration dt."""
+        if self.rock_till_weight is not None:
+            self.update_rock_till_weight()
+
+        if self.opt_split_steps:
+            for member in self.members:
+                member.run_erosion(dt)
+
+            if self.diffuser is not None:
+                self.diffuser.run_one_step(dt)
+            else:
+                for member in self.members:
+                    member.run_diffusion(dt)
+
+            for member in self.members:
+                member.finish_step(dt)
+        else:
+            for member in self.members:
+                member.run_one_step(dt)
+
+        # calculate model time
+        self.model_time += dt
+
+        # Check walltime
+        self.check_walltime()
+
+    def calc_adaptive_dt(self):
+        """Return the shortest of the members' adaptive time steps."""
+        return min(member.calc_adaptive_dt() for member in self.members)
+
+    def write_output(self, params, field_names=None):
+        """Write output for each member, to the files named by its own
+        parameters."""
+        for member in self.members:
+            member.iteration = self.iteration
+            member.write_output(member.params, field_names=field_names)
+
+    def finalize(self):
+        """Finalize each member."""
+        for member in self.members:
+            member.iteration = self.iteration
+            member.finalize()
+
+    def close_output(self):
+        """Finish writing output of each member."""
+        for member in self.members:
+            member.close_output()
+
+    def _get_checkpoint_state(self):
+        """Return a dictionary of arrays holding the state of the ensemble
+        and of every member.
+
+        The state of member i is stored under keys starting with
+        'member_<i>__'.
+        """
+        state = {'model_time': np.array(self.model_time),
+                 'iteration': np.array(self.iteration),
+                 'number_of_members': np.array(self.n_members)}
+        for (i, member) in enumerate(self.members):
+            member.iteration = self.iteration
+            prefix = 'member_' + str(i) + '__'
+            for (key, value) in member._get_checkpoint_state().items():
+                state[prefix + key] = value
+        return state
+
+    def _set_checkpoint_state(self, state):
+        """Set the state of the ensemble and of every member from a
+        dictionary of arrays."""
+        if int(state['number_of_members']) != self.n_members:
+            raise ValueError('The checkpoint holds '
+                             + str(int(state['number_of_members']))
+                             + ' members, but the ensemble has '
+                             + str(self.n_members) + '.')
+
+        for (i, member) in enumerate(self.members):
+            prefix = 'member_' + str(i) + '__'
+            member._set_checkpoint_state(
+                {key[len(prefix):]: value for (key, value) in state.items()
+                 if key.startswith(prefix)})
+
+        self.model_time = float(state['model_time'])
+        self.iteration = int(state['iteration'])
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+ensemble_linear_diffuser.py: linear diffusion of a stack of elevation
+arrays that share one grid.
+"""
+
+import numpy as np
+
+
+class EnsembleLinearDiffuser(object):
+    """
+    An EnsembleLinearDiffuser does explicit linear diffusion,
+
+        dz/dt = -div(q),  q = -D grad(z),
+
+    of each row of an (n_members, n_nodes) elevation array, with a
+    diffusivity D for each row. All rows use the links, faces and core nodes
+    of one grid, so gradient, flux and divergence are calculated for every
+    member in the same array operations.
+
+    As in LinearDiffuser, gradient and flux are calculated at active links
+    only, elevation changes only at core nodes, and a time step is done in
+    sub-steps no longer than courant_factor dx^2 / D, with LinearDiffuser's
+    courant_factor of 0.15 by default. Each member takes its own sub-steps,
+    so its result matches that of a LinearDiffuser on its own grid.
+
+    The link and node indices, and the face width over cell area weight of
+    each link of each core node, are found once. Work arrays are made once.
+
+    Parameters
+    ----------
+    grid : ModelGrid
+    z : array of float, (n_members, n_nodes)
+        Elevations, updated in place.
+    diffusivity : array of float, (n_members, )
+    courant_factor : float, optional
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from landlab import RasterModelGrid
+    >>> from erosion_model.ensemble_linear_diffuser import EnsembleLinearDiffuser
+    >>> grid = RasterModelGrid((3, 4))
+    >>> z = np.zeros((2, grid.number_of_nodes))
+    >>> z[:, 5] = 1.
+    >>> eld = EnsembleLinearDiffuser(grid, z, [0.1, 0.])
+    >>> eld.run_one_step(1.)
+    >>> z[:, grid.core_nodes]
+    array([[0.6, 0.1],
+           [1. , 0. ]])
+    """
+
+    def __init__(self, grid, z, diffusivity, courant_factor=0.15):
+        """Initialize the EnsembleLinearDiffuser."""
+        self.z = z
+        self.diffusivity = np.asarray(diffusivity, dtype=float)
+        n_members = z.shape[0]
+
+        # Longest stable sub-step of each member (inf if D is zero)
+        dx = min(grid.dx, grid.dy)
+        self._max_substep = np.full(n_members, np.inf)
+        diffusing = self.diffusivity > 0.
+        self._max_substep[diffusing] = (courant_factor * dx ** 2
+                                        / self.diffusivity[diffusing])
+
+        # Flux is -D / link length times the elevation difference
+        active = grid.active_links
+        self._head = grid.node_at_link_head[active]
+        self._tail = grid.node_at_link_tail[active]
+        self._flux_coef = (-self.diffusivity[:, np.newaxis]
+                           / grid.length_of_link[active])
+
+        # Each link of each core node, as a position in the active links,
+        # with the weight of its flux in the divergence at the node. Links
+        # that are not active carry no flux, so have zero weight.
+        self.core_nodes = grid.core_nodes
+        links = grid.links_at_node[self.core_nodes]
+        position = np.full(grid.number_of_links + 1, -1, dtype=int)
+        position[active] = np.arange(len(active))
+        self._link_position = position[links]
+        face_width = grid.width_of_face[grid.face_at_link[links]]
+        cell_area = grid.area_of_cell[grid.cell_at_node[self.core_nodes]]
+        self._link_weight = (-grid.link_dirs_at_node[self.core_nodes]
+                             * face_width / cell_area[:, np.newaxis])
+        carries_flux = self._link_position >= 0
+        self._link_weight[~carries_flux] = 0.
+        self._link_position[~carries_flux] = 0
+
+        self._flux = np.empty((n_members, len(active)))
+        self._tail_z = np.empty((n_members, len(active)))
+        self._div = np.empty((n_members, len(self.core_nodes)))
+        self._div_part = np.empty((n_members, len(self.core_nodes)))
+
+    def calc_flux_div(self):
+        """Return the divergence of flux at core nodes, (n_members,
+        n_core_nodes), for the current elevations.
+
+        The array is reused by the next call.
+        """
+        q = self._flux
+        np.take(self.z, self._head, axis=1, out=q)
+        np.take(self.z, self._tail, axis=1, out=self._tail_z)
+        q -= self._tail_z
+        q *= self._flux_coef
+
+        div = self._div
+        div.fill(0.)
+        for j in range(self._link_position.shape[1]):
+            np.take(q, self._link_position[:, j], axis=1, out=self._div_part)
+            self._div_part *= self._link_weight[:, j]
+            div += self._div_part
+        return div
+
+    def run_one_step(self, dt):
+        """Diffuse every member for a time dt."""
+        n_full = np.zeros(len(self._max_substep), dtype=int)
+        finite = np.isfinite(self._max_substep)
+        n_full[finite] = np.floor(dt / self._max_substep[finite])
+        remainder = dt - n_full * np.where(finite, self._max_substep, 0.)
+
+        for i in range(n_full.max() + 1):
+            # a full sub-step, the remainder, or nothing once done
+            substep = np.where(i < n_full, self._max_substep,
+                               np.where(i == n_full, remainder, 0.))
+            div = self.calc_flux_div()
+            div *= substep[:, np.newaxis]
+            self.z[:, self.core_nodes] -= div
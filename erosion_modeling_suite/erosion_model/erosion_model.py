@@ -11,16 +11,20 @@ from landlab.io.netcdf import read_netcdf
 from landlab import load_params
 from landlab.io.netcdf import write_raster_netcdf
 import numpy as np
-from scipy.interpolate import interp1d
 import sys
 import os
-import subprocess
-import dill
-import time as tm
+import copy
 from .precip_changer import PrecipChanger
+from .forcing_schedule import ForcingSchedule
+from .output_writer import NetCDFOutputWriter, AsyncOutputWriter
+from .walltime_tracker import WalltimeTracker
+from .baselevel_handler import BaselevelSchedule
 
 DAYS_PER_YEAR = 365.25
 
+# Value of the DepressionFinderAndRouter flood_status code at flooded nodes
+_FLOODED = 3
+
 class _ErosionModel(object):
     """
     An ErosionModel is a basic model for erosion and landscape evolution in
@@ -31,6 +35,29 @@ class _ErosionModel(object):
     Landlab components to model actual erosion processes.
     """
 
+    # Set by ErosionModelEnsemble on its members before __init__ is called.
+    # _template_grid is an already-read DEM grid to copy instead of parsing
+    # the DEM file again, and _elevation_buffer is the row of the ensemble's
+    # elevation array that will hold this member's topography.
+    # _seed_sequence is the member's own numpy SeedSequence, spawned from the
+    # ensemble's.
+    _template_grid = None
+    _elevation_buffer = None
+    _seed_sequence = None
+
+    # Names of the independent random streams of each model. Each is a
+    # child of the model's SeedSequence, so draws from one stream do not
+    # change the numbers drawn from the others.
+    _random_streams = ('grid', 'noise', 'rain', 'exceedance')
+
+    # Node fields that hold model state, and are saved by save_checkpoint
+    # if present. All others are recalculated during each time step.
+    _checkpoint_fields = ('topographic__elevation',
+                          'initial_topographic__elevation',
+                          'cumulative_erosion__depth',
+                          'bedrock__elevation',
+                          'soil__depth')
+
     def __init__(self,
                  input_file=None,
                  params=None, BaselevelHandlerClass=None):
@@ -54,11 +81,14 @@ class _ErosionModel(object):
         else:
             self.params = load_params(input_file)
 
-        # if a pickled instance exists, load it instead of the standard init.
+        # name of the checkpoint file written if walltime runs out.
         try:
-            self.save_model_name = self.params['pickle_name']
+            self.checkpoint_name = self.params['checkpoint_name']
         except KeyError:
-            self.save_model_name = 'saved_model.model'
+            self.checkpoint_name = 'saved_model.npz'
+
+        # Set up the model's random streams before anything draws from them
+        self.setup_random_streams()
 
         # Read the topography data and create a grid
 
@@ -67,15 +97,28 @@ class _ErosionModel(object):
             raise ValueError('Both a DEM filename and number_of_node_rows have '
                              'been specified.')
         try:
-            (self.grid, self.z) = self.read_topography(self.params['DEM_filename'],
-                                                       name='topographic__elevation',
-                                                       halo=1)
+            dem_filename = self.params['DEM_filename']
+            if self._template_grid is None:
+                (self.grid, self.z) = self.read_topography(dem_filename,
+                                                           name='topographic__elevation',
+                                                           halo=1)
+            else:
+                self.grid = copy.deepcopy(self._template_grid)
+                self.z = self.grid.at_node['topographic__elevation']
             self.opt_watershed = True
 
         except KeyError:
             # this routine will set self.opt_watershed internally
             self.setup_rectangular_grid(self.params)
 
+        # If this model is an ensemble member, keep its topography in the
+        # ensemble's elevation array.
+        if self._elevation_buffer is not None:
+            self._elevation_buffer[:] = self.z
+            self.grid.add_field('node', 'topographic__elevation',
+                                self._elevation_buffer, noclobber=False)
+            self.z = self._elevation_buffer
+
         try:
             feet_to_meters = self.params['feet_to_meters']
         except KeyError:
@@ -104,11 +147,27 @@ class _ErosionModel(object):
         except KeyError:
             self.save_first_timestep = False
 
-        # instantiate model time.
+        # identify if output should go to a single file, and how it should
+        # be stored. default behavior is one file per output interval.
+        self.opt_single_output_file = self.params.get('output_single_file') or False
+        self.output_complevel = self.params.get('output_complevel', 4)
+        self.output_float32 = self.params.get('output_float32') or False
+        self._output_writer = None
+
+        # a single output file is added to only if it was written earlier in
+        # this run, or the run is restored from a checkpoint. Otherwise any
+        # old file is replaced.
+        self._append_output = False
+
+        # identify if output should be written on a background thread, and
+        # how many output snapshots may wait to be written.
+        self.opt_async_output = self.params.get('output_async') or False
+        self.output_buffer_slots = self.params.get('output_buffer_slots', 2)
+
+        # instantiate model time and output iteration. iteration is zero
+        # until the model starts running (or is restored from a checkpoint).
         self.model_time = 0.
-
-        # instantiate container for computational timestep:
-        self.compute_time = [tm.time()]
+        self.iteration = 0
 
         # Set DEM boundaries
         if self.opt_watershed:
@@ -127,6 +186,10 @@ class _ErosionModel(object):
         z0[:] = self.z  # keep a copy of starting elevation
         self.grid.add_zeros('node', 'cumulative_erosion__depth')
 
+        # Models that keep cumulative erosion depth up to date themselves
+        # (the Dd models) set this to their ErosionThresholdTracker.
+        self.threshold_tracker = None
+
         # identify which nodes are data nodes:
         self.data_nodes = self.grid.at_node['topographic__elevation']!=-9999.
 
@@ -136,44 +199,61 @@ class _ErosionModel(object):
         except KeyError:
             self.outlet_lowering_rate = 0.0
 
-        # Read and remember baselevel control param, if present
-        try:
-            file_name = self.params['outlet_lowering_file_path']
-
-            modern_outlet_elevation = self.params['modern_outlet_elevation']
-            postglacial_outlet_elevation = self.z[self.outlet_node]
-
-            elev_change_df = np.loadtxt(file_name, skiprows=1, delimiter =',')
-            time = elev_change_df[:, 0]
-            elev_change = elev_change_df[:, 1]
-
-            scaling_factor = np.abs(postglacial_outlet_elevation-modern_outlet_elevation)/np.abs(elev_change[0]-elev_change[-1])
-
-            outlet_elevation = (scaling_factor*elev_change_df[:, 1]) + postglacial_outlet_elevation
-
-            self.outlet_elevation_obj = interp1d(time, outlet_elevation)
-
-        except KeyError:
-            #self.outlet_lowering_rate = 0.0
-            self.outlet_elevation_obj = None
-
         if BaselevelHandlerClass is None:
             self.baselevel_handler = None
         else:
             self.baselevel_handler = BaselevelHandlerClass(self.grid,
                                                            self.params)
 
+        # Set up baselevel control. If we are dealing with a watershed, only
+        # the outlet node is lowered. If we are dealing with a rectangular
+        # grid, the core nodes are raised instead. This is done after the
+        # baselevel handler is made, as it may turn core nodes it controls
+        # into boundaries, and those must not be raised too.
+        if self.opt_watershed:
+            self.outlet_schedule = BaselevelSchedule.from_params(self.grid,
+                                                                 self.outlet_node,
+                                                                 self.params)
+        else:
+            self.outlet_schedule = BaselevelSchedule.from_params(self.grid,
+                                                                 self.grid.core_nodes,
+                                                                 self.params,
+                                                                 lowering_sign=-1.0,
+                                                                 reference_node=self.outlet_node)
+
         # Handle option for time-varying precipitation
         try:
             self.opt_var_precip = self.params['opt_var_precip']
         except KeyError:
             self.opt_var_precip = False
 
+        # Time-varying scalar forcings, if any, are looked up in one
+        # ForcingSchedule.
+        self.forcing = None
         if self.opt_var_precip:
             self.setup_time_varying_precip()
 
-        # Handle option to save if walltime is to short
+        # Handle option for adaptive time steps. By default, time steps may
+        # be as long as the output interval.
+        self.opt_adaptive_dt = self.params.get('opt_adaptive_dt') or False
+        self.adaptive_dt_min = self.params.get('adaptive_dt_min', 0.)
+        self.adaptive_dt_max = self.params.get('adaptive_dt_max',
+                                               self.params.get('output_interval'))
+        self.adaptive_dt_safety = self.params.get('adaptive_dt_safety', 0.5)
+        self._stability_parameters = None
+
+        # Reusable work arrays, made by get_scratch as they are first needed
+        self._scratch = {}
+
+        # Handle option to save if walltime is to short. The walltime left
+        # is found only once, here.
         self.opt_save = self.params.get('opt_save') or False
+        if self.opt_save:
+            self.walltime_tracker = WalltimeTracker(self.params.get('walltime'))
+            if not self.walltime_tracker.limited:
+                self.walltime_tracker = None
+        else:
+            self.walltime_tracker = None
 
     def setup_rectangular_grid(self, params):
         """Create rectangular grid based on input parameters.
@@ -221,12 +301,7 @@ class _ErosionModel(object):
 
         # Create and initialize elevation field
         self.z = self.grid.add_zeros('node', 'topographic__elevation')
-        if 'random_seed' in params:
-            seed = params['random_seed']
-        else:
-            seed = 0
-        np.random.seed(seed)
-        rs = np.random.rand(len(self.grid.core_nodes))
+        rs = self.make_rng('grid').random(len(self.grid.core_nodes))
         self.z[self.grid.core_nodes] = rs
 
         # Set boundary conditions
@@ -236,7 +311,8 @@ class _ErosionModel(object):
                                                           west_closed,
                                                           south_closed)
 
-    def read_topography(self, topo_file_name, name, halo):
+    @staticmethod
+    def read_topography(topo_file_name, name, halo):
         """Read and return topography from file, as a Landlab grid and field."""
         try:
             (grid, z) = read_esri_ascii(topo_file_name,
@@ -294,6 +370,13 @@ class _ErosionModel(object):
                                 m=m,
                                 stop_time=stop_time)
 
+        # Tabulate the parameters for the whole run. Forcings read from
+        # forcing_file_path, if given, replace those of the same name.
+        self.forcing = ForcingSchedule.from_precip_changer(self.pc)
+        if 'forcing_file_path' in self.params:
+            self.forcing.add_schedule(
+                ForcingSchedule.from_file(self.params['forcing_file_path']))
+
     def get_parameter_from_exponent(self, param_name, raise_error=True):
         """Return absolute parameter value from provided exponent.
         """
@@ -313,42 +396,164 @@ class _ErosionModel(object):
                 param = None
         return param
 
-    def __setstate__(self, state_dict):
-        """Get ErosionModel state from pickled state_dict."""
-        random_state = state_dict.pop('random_state')
-        np.random.set_state(random_state)
+    def setup_random_streams(self):
+        """Create the SeedSequence of each of the model's random streams.
 
-        if state_dict['outlet_elevation_obj'] == None:
-            pass
+        The model's own SeedSequence is made from the parameter random_seed
+        (0 if not given), unless it was set by an ErosionModelEnsemble. One
+        child sequence per name in _random_streams is spawned from it.
+        """
+        if self._seed_sequence is None:
+            self.seed_sequence = np.random.SeedSequence(
+                int(self.params.get('random_seed', 0)))
         else:
-            outlet_elev = state_dict.pop('outlet_elevation_obj')
-            state_dict['outlet_elevation_obj'] = interp1d(outlet_elev['x'], outlet_elev['y'])
+            self.seed_sequence = self._seed_sequence
+        children = self.seed_sequence.spawn(len(self._random_streams))
+        self._stream_seed_sequences = dict(zip(self._random_streams,
+                                               children))
+
+    def make_rng(self, stream):
+        """Return a new numpy Generator at the start of the random stream
+        called stream.
+
+        Generators made for the same stream of the same model draw the same
+        numbers, so a stream can be restarted by making its Generator again.
+        """
+        return np.random.default_rng(self._stream_seed_sequences[stream])
 
-        self.__dict__ = state_dict
+    def make_integer_seed(self, stream):
+        """Return an integer seed taken from the random stream called stream,
+        for components that accept only an integer seed."""
+        return int(self._stream_seed_sequences[stream].generate_state(1)[0])
 
-    def __getstate__(self):
-        """Set ErosionModel state for pickling."""
-        state_dict = self.__dict__
-        state_dict['random_state'] = np.random.get_state()
+    def add_surface_noise(self, noise_std, seed=None):
+        """Add normally distributed noise, with standard deviation noise_std,
+        to the elevation of the data nodes.
 
-        if self.outlet_elevation_obj == None:
-            pass
+        The noise is drawn from the model's noise stream, or, if seed is
+        given, from a Generator seeded with it.
+        """
+        if seed is None:
+            rng = self.make_rng('noise')
         else:
-            x = self.outlet_elevation_obj.x
-            y = self.outlet_elevation_obj.y
-            state_dict['outlet_elevation_obj'] = {'x': x, 'y': y}
-        return state_dict
+            rng = np.random.default_rng(seed)
+        noise = rng.standard_normal(np.count_nonzero(self.data_nodes))
+        self.z[self.data_nodes] += noise_std * noise
+
+    def get_scratch(self, name, size=None, dtype=float):
+        """Return the reusable work array called name.
+
+        The array is made the first time it is asked for, with size elements
+        (by default, one per grid node) of type dtype, and the same array is
+        returned afterwards. Its contents are not reset between calls, so
+        each user must fill it (e.g. with the out= argument of a numpy
+        function) before reading it. Using scratch arrays keeps time steps
+        from allocating new arrays.
+        """
+        try:
+            return self._scratch[name]
+        except KeyError:
+            if size is None:
+                size = self.grid.number_of_nodes
+            self._scratch[name] = np.empty(size, dtype=dtype)
+            return self._scratch[name]
+
+    def find_flooded_nodes(self):
+        """Return a boolean array that is True at flooded nodes.
+
+        Flooded nodes are those in depressions found by the flow router's
+        depression finder. The array is a scratch array, so it is valid only
+        until the next call.
+        """
+        flooded = self.get_scratch('flooded_nodes', dtype=bool)
+        np.equal(self.flow_router.depression_finder.flood_status, _FLOODED,
+                 out=flooded)
+        return flooded
+
+    def save_checkpoint(self, filename=None):
+        """Save the state needed to restart the model to a .npz file.
+
+        Only the state is saved: the fields listed in _checkpoint_fields,
+        model time, output iteration, the numpy random state and anything
+        added by _get_checkpoint_state. Components are not saved. They are
+        rebuilt from the parameters when the model is created again, before
+        load_checkpoint is called.
+
+        The file is written under a temporary name and then renamed, so an
+        interrupted write does not leave a damaged checkpoint.
+        """
+        if filename is None:
+            filename = self.checkpoint_name
+
+        state = self._get_checkpoint_state()
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'wb') as f:
+            np.savez(f, **state)
+        os.replace(temp_filename, filename)
+
+    def load_checkpoint(self, filename=None):
+        """Restore model state from a file written by save_checkpoint.
+
+        The model must have been created with the same parameters as the
+        model that wrote the checkpoint.
+        """
+        if filename is None:
+            filename = self.checkpoint_name
+
+        with np.load(filename) as data:
+            state = {key: data[key] for key in data.files}
+        self._set_checkpoint_state(state)
+
+    def _get_checkpoint_state(self):
+        """Return a dictionary of arrays holding the model state."""
+        random_state = np.random.get_state()
+        state = {'model_time': np.array(self.model_time),
+                 'iteration': np.array(self.iteration),
+                 'random_state__keys': random_state[1],
+                 'random_state__pos': np.array(random_state[2]),
+                 'random_state__has_gauss': np.array(random_state[3]),
+                 'random_state__cached_gaussian': np.array(random_state[4])}
+        for name in self._checkpoint_fields:
+            if name in self.grid.at_node:
+                state['at_node__' + name] = self.grid.at_node[name]
+        return state
+
+    def _set_checkpoint_state(self, state):
+        """Set the model state from a dictionary of arrays."""
+        # fields are set in place, as components hold references to them.
+        for key in state:
+            if key.startswith('at_node__'):
+                self.grid.at_node[key[len('at_node__'):]][:] = state[key]
+
+        self.model_time = float(state['model_time'])
+        self.iteration = int(state['iteration'])
+        self._append_output = True
+        np.random.set_state(('MT19937',
+                             state['random_state__keys'],
+                             int(state['random_state__pos']),
+                             int(state['random_state__has_gauss']),
+                             float(state['random_state__cached_gaussian'])))
+
+        # baselevel control keeps its own clock
+        self.outlet_schedule.current_time = self.model_time
+        if hasattr(self.baselevel_handler, 'current_time'):
+            self.baselevel_handler.current_time = self.model_time
 
     def calculate_cumulative_change(self):
         """Calculate cumulative node-by-node changes in elevation.
 
-        Store result in grid field.
+        Store result in grid field. If the model has a threshold tracker,
+        the field is updated by the tracker rather than separately.
         """
-        self.grid.at_node['cumulative_erosion__depth'] = \
-            self.grid.at_node['topographic__elevation'] - \
-            self.grid.at_node['initial_topographic__elevation']
-        max_cc = np.amax(self.grid.at_node['cumulative_erosion__depth'])
-        min_cc = np.amin(self.grid.at_node['cumulative_erosion__depth'])
+        cum_change = self.grid.at_node['cumulative_erosion__depth']
+        if self.threshold_tracker is not None:
+            self.threshold_tracker.run_one_step()
+        else:
+            np.subtract(self.grid.at_node['topographic__elevation'],
+                        self.grid.at_node['initial_topographic__elevation'],
+                        out=cum_change)
+        max_cc = np.amax(cum_change)
+        min_cc = np.amin(cum_change)
         print('Maximum cumulative topo change:')
         print(max_cc)
         print('Minimum cumulative topo change:')
@@ -356,7 +561,15 @@ class _ErosionModel(object):
 
 
     def write_output(self, params, field_names=None):
-        """Write output to file (currently netCDF)."""
+        """Write output to file (currently netCDF).
+
+        If the parameter output_single_file is True, all output is added
+        to the single file output_filename + '.nc'. Otherwise, a new file
+        is written for each output iteration. If output_async is True, the
+        output fields are copied and written on a background thread.
+        """
+        if field_names is None:
+            field_names = self.params.get('output_fields')
 
         # Exclude fields with int64 (incompatible with netCDF3)
         if field_names is None:
@@ -366,9 +579,47 @@ class _ErosionModel(object):
                     field_names.append(field)
 
         self.calculate_cumulative_change()
-        filename = self.params['output_filename'] + str(self.iteration).zfill(4) \
-                    + '.nc'
-        write_raster_netcdf(filename, self.grid, names=field_names, format='NETCDF4')
+
+        if self.opt_async_output:
+            if self._output_writer is None:
+                if self.opt_single_output_file:
+                    names = {'single_filename': self.params['output_filename'] + '.nc'}
+                else:
+                    names = {'filename_prefix': self.params['output_filename']}
+                self._output_writer = AsyncOutputWriter(self.grid,
+                                                        field_names,
+                                                        n_slots=self.output_buffer_slots,
+                                                        complevel=self.output_complevel,
+                                                        float32=self.output_float32,
+                                                        append=self._append_output,
+                                                        **names)
+                self._append_output = True
+            self._output_writer.submit(self.model_time, self.iteration)
+        elif self.opt_single_output_file:
+            if self._output_writer is None:
+                filename = self.params['output_filename'] + '.nc'
+                self._output_writer = NetCDFOutputWriter(filename,
+                                                         self.grid,
+                                                         field_names,
+                                                         complevel=self.output_complevel,
+                                                         float32=self.output_float32,
+                                                         append=self._append_output)
+                self._append_output = True
+            self._output_writer.write(self.model_time, self.iteration)
+        else:
+            filename = self.params['output_filename'] + str(self.iteration).zfill(4) \
+                        + '.nc'
+            write_raster_netcdf(filename, self.grid, names=field_names, format='NETCDF4')
+
+    def close_output(self):
+        """Finish writing output and close the output file, if it is open.
+
+        With asynchronous output, this waits until all queued output has
+        been written.
+        """
+        if self._output_writer is not None:
+            self._output_writer.close()
+            self._output_writer = None
 
     def run_one_step(self, dt):
         """
@@ -383,18 +634,122 @@ class _ErosionModel(object):
         """
         Finalize model
 
-        This base-class method does nothing. Derived classes can override
-        it to run any required finalizations steps.
+        This base-class method finishes writing output. Derived classes can
+        override it to run any required finalizations steps.
         """
-        pass
+        self.close_output()
+
+    def set_stability_parameters(self, diffusivity=None, erodibility=None,
+                                 m=None, n=None, discharge='drainage_area',
+                                 settling_velocity=0.):
+        """Describe the model's processes, for use by calc_stable_dt.
+
+        Parameters
+        ----------
+        diffusivity : float, optional
+            Largest hillslope diffusivity (length^2/time).
+        erodibility : float or str, optional
+            Stream power erodibility, or the name of a node field of
+            erodibility.
+        m, n : float, optional
+            Stream power exponents.
+        discharge : str, optional
+            Name of the node field that takes the place of drainage area in
+            the stream power law.
+        settling_velocity : float, optional
+            Normalized settling velocity, for ErosionDeposition or Space.
+        """
+        self._stability_parameters = {'diffusivity': diffusivity,
+                                      'erodibility': erodibility,
+                                      'm': m,
+                                      'n': n,
+                                      'discharge': discharge,
+                                      'settling_velocity': settling_velocity}
+
+    def calc_stable_dt(self):
+        """Return the longest stable time step, based on the current state.
+
+        This is the smallest of the explicit diffusion limit,
+
+            dt = dx^2 / (4 D),
+
+        and the stream power (CFL) limit,
+
+            dt = dx / max(K Q^m S^(n-1) (1 + v_s)),
+
+        where the settling velocity v_s accounts for the deposition term of
+        ErosionDeposition and Space. Returns inf if the model has not set
+        any stability parameters.
+        """
+        stability = self._stability_parameters
+        if stability is None:
+            return np.inf
+
+        dx = self.grid.dx
+        stable_dt = np.inf
+
+        diffusivity = stability['diffusivity']
+        if diffusivity is not None and diffusivity > 0.:
+            stable_dt = dx ** 2 / (4. * diffusivity)
+
+        erodibility = stability['erodibility']
+        if erodibility is not None:
+            core = self.grid.core_nodes
+            if isinstance(erodibility, str):
+                erodibility = self.grid.at_node[erodibility][core]
+            elif self.opt_var_precip:
+                erodibility = (erodibility
+                               * self.forcing.value('erodibility_factor',
+                                                    self.model_time))
+            discharge = self.grid.at_node[stability['discharge']][core]
+            slope = self.grid.at_node['topographic__steepest_slope'][core]
+            m = stability['m']
+            n = stability['n']
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                celerity = erodibility * np.power(discharge, m)
+                if n != 1.:
+                    celerity = np.where(slope > 0.,
+                                        celerity * np.power(slope, n - 1.),
+                                        0.)
+            celerity *= (1. + stability['settling_velocity'])
+
+            max_celerity = np.amax(celerity) if celerity.size > 0 else 0.
+            if max_celerity > 0.:
+                stable_dt = min(stable_dt, dx / max_celerity)
+
+        return stable_dt
+
+    def calc_adaptive_dt(self):
+        """Return the time step to use next when opt_adaptive_dt is True.
+
+        This is adaptive_dt_safety times the stable time step, limited to
+        the range adaptive_dt_min to adaptive_dt_max. Before flow has been
+        routed there is no discharge to base the limit on, so the fixed dt
+        is used.
+        """
+        stability = self._stability_parameters
+        if (stability is not None and
+                stability['erodibility'] is not None and
+                not np.any(self.grid.at_node[stability['discharge']] > 0.)):
+            return self.params['dt']
+
+        dt = self.adaptive_dt_safety * self.calc_stable_dt()
+        return min(max(dt, self.adaptive_dt_min), self.adaptive_dt_max)
 
     def run_for(self, dt, runtime):
         """
         Run model without interruption for a specified time period.
+
+        If opt_adaptive_dt is True, the time step is chosen before each step
+        by calc_adaptive_dt. Either way, the last step ends exactly at
+        runtime.
         """
         elapsed_time = 0.
         keep_running = True
         while keep_running:
+            if self.opt_adaptive_dt:
+                dt = self.calc_adaptive_dt()
             if elapsed_time+dt >= runtime:
                 dt = runtime-elapsed_time
                 keep_running = False
@@ -404,123 +759,79 @@ class _ErosionModel(object):
     def run(self, output_fields=None):
         """
         Run the model until complete.
+
+        If the model was restored from a checkpoint, the run continues from
+        the restored model time and output iteration.
         """
-        if self.save_first_timestep:
-            self.iteration = 0
-            self.write_output(self.params, field_names=output_fields)
+        if self.iteration == 0:
+            if self.save_first_timestep:
+                self.write_output(self.params, field_names=output_fields)
+            self.iteration = 1
         total_run_duration = self.params['run_duration']
         output_interval = self.params['output_interval']
-        self.iteration = 1
         time_now = self.model_time
         while time_now < total_run_duration:
-            next_run_pause = min(time_now + output_interval, total_run_duration)
+            next_run_pause = min(self.iteration * output_interval, total_run_duration)
             self.run_for(self.params['dt'], next_run_pause - time_now)
             time_now = next_run_pause
             self.write_output(self.params, field_names=output_fields)
             self.iteration += 1
 
         self.finalize()
-        # once done, remove saved model object if it exists
-        if os.path.exists(self.save_model_name):
-            os.remove(self.save_model_name)
+        self.close_output()
+        # once done, remove checkpoint if it exists
+        if os.path.exists(self.checkpoint_name):
+            os.remove(self.checkpoint_name)
 
     def update_outlet(self, dt):
         """
         Update outlet level
         """
-        # determine which nodes to lower
-        if self.opt_watershed:
-            # if we are dealing with a watershed, then lower only the outlet node
-            nodes_to_lower = self.outlet_node
-        else:
-            # if we are dealing with a rectangular grid, then raise only the core nodes
-            nodes_to_lower = self.grid.status_at_node == 0
-
-        # next, lower the correct nodes the desired amount
-
-        # first, if we do not have an outlet elevation object
-        if self.outlet_elevation_obj is None:
-
-            # calculate lowering amount and subtract
-            if self.opt_watershed:
-                self.z[nodes_to_lower] -= self.outlet_lowering_rate * dt
-            else:
-                # if this is not a watershed, we are raising the core nodes
-                self.z[nodes_to_lower] += self.outlet_lowering_rate * dt
-
-            # if bedrock_elevation exists as a field, lower it also
-            if 'bedrock__elevation' in self.grid.at_node.keys():
-                if self.opt_watershed:
-                    self.grid.at_node['bedrock__elevation'][nodes_to_lower] -= self.outlet_lowering_rate * dt
-                else:
-                    self.grid.at_node['bedrock__elevation'][nodes_to_lower] += self.outlet_lowering_rate * dt
-        # if there is an outlet elevation object
-        else:
-            # if bedrock_elevation exists as a field, lower it also
-            # calcuate the topographic change required to match the current time's value for
-            # outlet elevation. This must be done in case bedrock elevation exists, and must
-            # be done before the topography is lowered
-            if 'bedrock__elevation' in self.grid.at_node.keys():
-                topo_change = self.z[nodes_to_lower] - self.outlet_elevation_obj(self.model_time)
-                self.grid.at_node['bedrock__elevation'][nodes_to_lower] -= topo_change
-
-            # lower topography
-            self.z[nodes_to_lower] = self.outlet_elevation_obj(self.model_time)
+        self.outlet_schedule.run_one_step(dt)
 
         # Let the baselevel handler work if it exists.
         if self.baselevel_handler is not None:
             self.baselevel_handler.run_one_step(dt)
 
-    def pickle_self(self):
-        """Pickle model object."""
-        with open(self.save_model_name, 'wb') as f:
-                    dill.dump(self, f)
-
-    def check_walltime(self, wall_threshold=0, dynamic_cut_off_time=False, cut_off_time=0):
-        """Check walltime and save model out if near end of time."""
-        # check walltime
-
-        # format is days-hours:minutes:seconds
-        if dynamic_cut_off_time:
-            self.compute_time.append(tm.time())
-            mean_time_diffs = np.mean(np.diff(np.asarray(self.compute_time)))/60. # in minutes
-            cut_off_time = mean_time_diffs + wall_threshold
-        else:
-            pass # cut off time is 0
+    def finish_step(self, dt):
+        """
+        Finish a time step of duration dt: advance model time, lower the
+        outlet and check walltime.
 
-        try:
-            output,error = subprocess.Popen(['squeue',
-                                              '--job='+os.environ['SLURM_JOB_ID'], '--format=%.10L'],
-                                             stdout = subprocess.PIPE,
-                                             stderr = subprocess.PIPE).communicate()
-            time_left = output.strip().split(' ')[-1]
-
-            if len(time_left.split('-')) == 1:
-                days_left = 0
-            else:
-                days_left = time_left.split('-')[0]
+        Models whose run_one_step is split into run_erosion and
+        run_diffusion call this last, so that an ErosionModelEnsemble can
+        run each part for all of its members in turn.
+        """
+        # calculate model time
+        self.model_time += dt
 
-            try:
-                minutes_left = int(time_left.split(':')[-2])
-            except IndexError:
-                minutes_left = 0
+        # Lower outlet
+        self.update_outlet(dt)
 
-            try:
-                hours_left = int(time_left.split(':')[-3])
-            except IndexError:
-                hours_left = 0
+        # Check walltime
+        self.check_walltime()
 
-            remaining_time = (days_left*60*60) + (60*hours_left) + minutes_left
+    def check_walltime(self, wall_threshold=0, dynamic_cut_off_time=False, cut_off_time=0):
+        """Check walltime and save model out if near end of time.
 
-            if self.opt_save:
-                if remaining_time < cut_off_time:
-                    # pickle self
-                    self.pickle_self()
-                    # exit program
-                    sys.exit()
+        wall_threshold and cut_off_time are in minutes. If
+        dynamic_cut_off_time is True, the cut off time is wall_threshold
+        plus the expected cost of the next time step.
+        """
+        if self.walltime_tracker is None:
+            return
 
-        except KeyError:
-            pass
+        self.walltime_tracker.record_step()
+        if dynamic_cut_off_time:
+            cut_off_time = wall_threshold
+
+        if self.walltime_tracker.out_of_time(60. * cut_off_time,
+                                             include_step_cost=dynamic_cut_off_time):
+            # save a checkpoint
+            self.close_output()
+            self.save_checkpoint()
+            # exit program
+            sys.exit()
 
 
 def main():
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+erosion_threshold_tracker.py: cumulative erosion depth and a depth-dependent
+erosion threshold for the Dd models.
+"""
+
+import numpy as np
+
+
+class ErosionThresholdTracker(object):
+    """
+    An ErosionThresholdTracker maintains cumulative erosion depth,
+
+        D = z - z0,
+
+    and an erosion threshold that increases with incision depth,
+
+        w_c = max(w_c0 - R_T D, w_c0),
+
+    where z0 is initial elevation, w_c0 is the threshold value and R_T is
+    the rate of threshold increase with erosion depth. D is negative for
+    erosion and positive for deposition, so the threshold is kept at its
+    initial value where there has been deposition.
+
+    Both are written in place, with no temporary arrays, into the
+    cumulative_erosion__depth and erosion__threshold fields, which are
+    created if needed. The model's output and metrics read these fields
+    directly; calling run_one_step brings both up to date with the current
+    topography.
+
+    Parameters
+    ----------
+    grid : ModelGrid
+    threshold_value : float
+    thresh_change_per_depth : float
+    threshold : str, optional
+        Name of the threshold field.
+
+    Examples
+    --------
+    >>> from landlab import RasterModelGrid
+    >>> from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
+    >>> grid = RasterModelGrid((3, 3))
+    >>> z = grid.add_zeros('node', 'topographic__elevation')
+    >>> z0 = grid.add_zeros('node', 'initial_topographic__elevation')
+    >>> ett = ErosionThresholdTracker(grid, 1.0, 0.5)
+    >>> z[3:6] = [-2., 0., 2.]
+    >>> ett.run_one_step()
+    >>> ett.cumulative_erosion[3:6]
+    array([-2.,  0.,  2.])
+    >>> ett.threshold[3:6]
+    array([2., 1., 1.])
+    """
+
+    def __init__(self, grid, threshold_value, thresh_change_per_depth,
+                 threshold='erosion__threshold'):
+        """Initialize the ErosionThresholdTracker."""
+        self.grid = grid
+        self.threshold_value = threshold_value
+        self.thresh_change_per_depth = thresh_change_per_depth
+
+        self._z = grid.at_node['topographic__elevation']
+        self._z0 = grid.at_node['initial_topographic__elevation']
+        if 'cumulative_erosion__depth' in grid.at_node:
+            self.cumulative_erosion = grid.at_node['cumulative_erosion__depth']
+        else:
+            self.cumulative_erosion = grid.add_zeros('node',
+                                                     'cumulative_erosion__depth')
+        if threshold in grid.at_node:
+            self.threshold = grid.at_node[threshold]
+        else:
+            self.threshold = grid.add_zeros('node', threshold)
+        self.threshold.fill(threshold_value)
+
+    def update_cumulative_erosion(self):
+        """Set cumulative erosion depth from the current topography."""
+        np.subtract(self._z, self._z0, out=self.cumulative_erosion)
+
+    def update_threshold(self):
+        """Set the threshold from cumulative erosion depth."""
+        np.multiply(self.cumulative_erosion, -self.thresh_change_per_depth,
+                    out=self.threshold)
+        self.threshold += self.threshold_value
+        np.maximum(self.threshold, self.threshold_value, out=self.threshold)
+
+    def run_one_step(self):
+        """Update cumulative erosion depth and then the threshold."""
+        self.update_cumulative_erosion()
+        self.update_threshold()
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+exceedance_analyzer.py: theoretical and empirical N-year wet day rainfall
+totals for a stretched exponential (Weibull) rainfall distribution.
+"""
+
+import os
+import textwrap
+
+import numpy as np
+import scipy.stats as stats
+
+_STRING_LENGTH = 80
+
+EXCEEDANCE_TABLE_DTYPE = np.dtype([('event_interval', np.float64),
+                                   ('expected_value', np.float64),
+                                   ('expected_min', np.float64),
+                                   ('expected_max', np.float64),
+                                   ('empirical_value', np.float64),
+                                   ('bootstrap_min', np.float64),
+                                   ('bootstrap_max', np.float64)])
+
+
+class ExceedanceAnalyzer(object):
+    """
+    An ExceedanceAnalyzer compares the wet day rainfall totals of N-year
+    events predicted by a Weibull distribution with those found in a record
+    of daily rainfall.
+
+    An effective year is nwet = ceil(intermittency_factor * 365) wet days.
+    The record of wet day totals is viewed as an array of shape
+    (number of effective years, nwet), so yearly maxima are found with one
+    vectorized call. The empirical N-year event is the (1 - 1/N) percentile
+    of the yearly maxima.
+
+    If n_bootstrap is greater than zero, confidence bounds on the empirical
+    values are found by resampling the yearly maxima n_bootstrap times. The
+    resamples are drawn and evaluated batch_size at a time, each batch with
+    single vectorized calls.
+
+    Parameters
+    ----------
+    scale_factor : float
+    shape_factor : float
+    intermittency_factor : float
+    event_intervals : array of float, optional
+        Return intervals (years) of the events to evaluate.
+    n_bootstrap : int, optional
+    confidence : float, optional
+        Confidence level of all bounds.
+    batch_size : int, optional
+    random_seed : int, optional
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from erosion_model.exceedance_analyzer import ExceedanceAnalyzer
+    >>> ea = ExceedanceAnalyzer(1.0, 1.0, 4. / 365.)
+    >>> ea.nwet
+    4
+    >>> ea.yearly_maxima(np.arange(10.))
+    array([3., 7.])
+    """
+
+    def __init__(self, scale_factor, shape_factor, intermittency_factor,
+                 event_intervals=(10., 25., 100.), n_bootstrap=0,
+                 confidence=0.95, batch_size=100, random_seed=0):
+        """Initialize the ExceedanceAnalyzer."""
+        self.scale_factor = scale_factor
+        self.shape_factor = shape_factor
+        self.intermittency_factor = intermittency_factor
+        self.event_intervals = np.asarray(event_intervals, dtype=float)
+        self.n_bootstrap = int(n_bootstrap)
+        self.confidence = confidence
+        self.batch_size = int(batch_size)
+        self.random_seed = random_seed
+
+        # calculate the number of wet days per year.
+        number_of_days_per_year = 365
+        self.nwet = int(np.ceil(intermittency_factor * number_of_days_per_year))
+
+        # calculate the probability of each event based on the number of
+        # years and the number of wet days per year.
+        self.exceedance_probabilities = 1. / (self.nwet * self.event_intervals)
+
+        # the distribution percentiles associated with each interval
+        self.event_percentiles = (1. - (1. / self.event_intervals)) * 100.
+
+    def expected_values(self):
+        """Return the theoretical wet day totals of the events.
+
+        The probability of daily rainfall p exceeding a value po is
+
+            P(p > po) = exp(-(po / P)^c)
+
+        where P is the scale factor and c the shape factor, so
+
+            po = P (-ln P(p > po))^(1 / c)
+        """
+        return (self.scale_factor
+                * (-np.log(self.exceedance_probabilities))
+                ** (1. / self.shape_factor))
+
+    def expected_ranges(self, num_days, num_effective_years):
+        """Return the lower and upper confidence bounds on the empirical
+        values expected from num_days draws.
+
+        For a distribution f with a continuous, nonzero quantile function
+        F-1(p), the order statistic of the p percentile of n draws is
+
+            X[np] ~ AN(F-1(p), p (1 - p) / (n [f(F-1(p))]^2))
+
+        where AN is the asymptotic normal.
+        """
+        expected = self.expected_values()
+        percentile = 1.0 - self.exceedance_probabilities
+        scaled = expected / self.scale_factor
+        event_probability = ((self.shape_factor / self.scale_factor)
+                             * (scaled ** (self.shape_factor - 1.0))
+                             * np.exp(-(scaled ** self.shape_factor)))
+        event_std = np.sqrt((percentile * (1.0 - percentile))
+                            / (num_days * (event_probability ** 2)))
+        t_statistic = stats.t.ppf(0.5 + 0.5 * self.confidence,
+                                  num_effective_years, loc=0, scale=1)
+        return (expected - t_statistic * event_std,
+                expected + t_statistic * event_std)
+
+    def yearly_maxima(self, wet_day_totals):
+        """Return the largest wet day total of each complete effective
+        year."""
+        wet_day_totals = np.asarray(wet_day_totals)
+        num_effective_years = wet_day_totals.size // self.nwet
+        years = wet_day_totals[:num_effective_years * self.nwet]
+        return years.reshape((num_effective_years, self.nwet)).max(axis=1)
+
+    def empirical_values(self, maxima):
+        """Return the empirical wet day totals of the events."""
+        if maxima.size == 0:
+            return np.full(self.event_intervals.shape, np.nan)
+        return np.percentile(maxima, self.event_percentiles)
+
+    def bootstrap_bounds(self, maxima):
+        """Return bootstrapped lower and upper confidence bounds on the
+        empirical values."""
+        n_events = len(self.event_intervals)
+        if self.n_bootstrap < 1 or maxima.size < 2:
+            return (np.full(n_events, np.nan), np.full(n_events, np.nan))
+
+        rng = np.random.default_rng(self.random_seed)
+        estimates = np.empty((self.n_bootstrap, n_events))
+        for start in range(0, self.n_bootstrap, self.batch_size):
+            stop = min(start + self.batch_size, self.n_bootstrap)
+            samples = maxima[rng.integers(0, maxima.size,
+                                          size=(stop - start, maxima.size))]
+            estimates[start:stop] = np.percentile(samples,
+                                                  self.event_percentiles,
+                                                  axis=1).T
+        tail = 50. * (1. - self.confidence)
+        (lower, upper) = np.percentile(estimates, [tail, 100. - tail], axis=0)
+        return (lower, upper)
+
+    def analyze(self, wet_day_totals):
+        """Return a structured array with one row per event interval."""
+        wet_day_totals = np.asarray(wet_day_totals)
+        maxima = self.yearly_maxima(wet_day_totals)
+        table = np.empty(len(self.event_intervals),
+                         dtype=EXCEEDANCE_TABLE_DTYPE)
+        table['event_interval'] = self.event_intervals
+        table['expected_value'] = self.expected_values()
+        (table['expected_min'],
+         table['expected_max']) = self.expected_ranges(wet_day_totals.size,
+                                                       maxima.size)
+        table['empirical_value'] = self.empirical_values(maxima)
+        (table['bootstrap_min'],
+         table['bootstrap_max']) = self.bootstrap_bounds(maxima)
+        return table
+
+    def write(self, filename, rainfall_rates, mean_storm__intensity=None,
+              table_filename=None):
+        """Write a text summary of the analysis of a rainfall record.
+
+        Dry days (zero rainfall) are removed from rainfall_rates first. The
+        table returned by analyze is also written, as comma-separated text,
+        to table_filename (by default, filename with the extension .csv).
+        Returns the table.
+        """
+        rainfall_rates = np.asarray(rainfall_rates)
+        wet_day_totals = rainfall_rates[rainfall_rates > 0]
+        if wet_day_totals.size == 0:
+            raise ValueError('No rain fell, which makes calculating exceedance '
+                             'frequencies problematic. We recommend that you '
+                             'check the valude of intermittency_factor.')
+        table = self.analyze(wet_day_totals)
+        num_effective_years = wet_day_totals.size // self.nwet
+
+        def wrap(message_text):
+            return '\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)) + '\n'
+
+        # Section 1: the distribution
+        lines = ['Section 1: Distribution Description\n',
+                 'Scale Factor: ' + str(self.scale_factor) + '\n',
+                 'Shape Factor: ' + str(self.shape_factor) + '\n',
+                 'Intermittency Factor: ' + str(self.intermittency_factor) + '\n',
+                 'Number of wet days per year: ' + str(self.nwet) + '\n\n',
+                 wrap('The scale factor that describes this distribution is '
+                      'calculated based on a provided value for the mean wet '
+                      'day rainfall.'),
+                 'This provided value was:\n' + str(mean_storm__intensity) + '\n']
+
+        # Section 2: theoretical values
+        lines.append('\n\nSection 2: Theoretical Predictions\n')
+        lines.append(wrap('Based on the analytical form of the wet day '
+                          'rainfall distribution, we can calculate theoretical '
+                          'predictions of the daily rainfall amounts '
+                          'associated with N-year events.'))
+        for row in table:
+            lines.append('Expected value for the wet day total of the '
+                         + str(row['event_interval']) + ' year event is: '
+                         + str(np.round(row['expected_value'], decimals=3))
+                         + '\n')
+
+        # Section 3: expected ranges of the empirical values
+        lines.append('\n\n')
+        lines.append(wrap('Section 3: Predicted 95% confidence bounds on the '
+                          'exceedance values based on number of samples '
+                          'drawn.'))
+        lines.append(wrap('The ability to empirically estimate the rainfall '
+                          'associated with an N-year event depends on the '
+                          'probability of that event occurring and the number '
+                          'of draws from the probability distribution. The '
+                          'ability to estimate increases with an increasing '
+                          'number of samples and decreases with decreasing '
+                          'probability of event occurrence.'))
+        lines.append(wrap('Exceedance values calculated from '
+                          + str(wet_day_totals.size) + ' draws from the '
+                          'daily-rainfall probability distribution. This '
+                          'corresponds to ' + str(num_effective_years)
+                          + ' effective years.'))
+        lines.append('\n')
+        lines.append(wrap('For the given number of samples, the 95% '
+                          'confidence bounds for the following event return '
+                          'intervals are as follows: '))
+        for row in table:
+            lines.append('Expected range for the wet day total of the '
+                         + str(row['event_interval']) + ' year event is: ('
+                         + str(np.round(row['expected_min'], decimals=3))
+                         + ', '
+                         + str(np.round(row['expected_max'], decimals=3))
+                         + ')\n')
+
+        # Section 4: empirical values
+        lines.append('\n\nSection 4: Empirical Values\n')
+        lines.append(wrap('These empirical values should be interpreted in '
+                          'the context of the expected ranges printed in '
+                          'Section 3. If the expected range is large, consider '
+                          'using a longer record of rainfall. The empirical '
+                          'values should fall within the expected range at a '
+                          '95% confidence level.'))
+        for row in table:
+            line = ('Estimated value for the wet day total of the '
+                    + str(np.round(row['event_interval'], decimals=3))
+                    + ' year event is: '
+                    + str(np.round(row['empirical_value'], decimals=3)))
+            if not np.isnan(row['bootstrap_min']):
+                line += (' (bootstrapped range: '
+                         + str(np.round(row['bootstrap_min'], decimals=3))
+                         + ', '
+                         + str(np.round(row['bootstrap_max'], decimals=3))
+                         + ')')
+            lines.append(line + '\n')
+
+        with open(filename, 'w') as exceedance_file:
+            exceedance_file.write(''.join(lines))
+
+        if table_filename is None:
+            table_filename = os.path.splitext(filename)[0] + '.csv'
+        np.savetxt(table_filename,
+                   table.view(np.float64).reshape((len(table), -1)),
+                   fmt='%.17g', delimiter=',',
+                   header=','.join(table.dtype.names), comments='')
+        return table
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+forcing_schedule.py: time-varying scalar forcings (erodibility factor,
+intermittency, storm intensity, ...) tabulated once for a whole run.
+"""
+
+import numpy as np
+
+
+class ForcingSchedule(object):
+    """
+    A ForcingSchedule holds named scalar forcings that vary piecewise
+    linearly through time, all given at one increasing array of times. Time
+    outside the given times takes the first or last value.
+
+    All forcings are stored as rows of one (n_forcings, n_times) array.
+    When a forcing is asked for at a new time, every forcing is
+    interpolated to that time at once. Lookup starts from where the
+    previous one ended, so advancing through time costs nothing extra, and
+    further forcings at the same time are read from the stored values.
+
+    A forcing given at other times is added by resampling all forcings at
+    the union of both sets of times. This is exact for piecewise-linear
+    forcings.
+
+    Parameters
+    ----------
+    times : array of float
+    **forcings : array of float
+        Value of each forcing at times.
+
+    Examples
+    --------
+    >>> from erosion_model.forcing_schedule import ForcingSchedule
+    >>> fs = ForcingSchedule([0., 10.], erodibility_factor=[2., 1.])
+    >>> fs.value('erodibility_factor', 5.)
+    1.5
+    >>> fs.add('intermittency_factor', [0., 5., 10.], [0.1, 0.2, 0.2])
+    >>> fs.value('intermittency_factor', 2.5)
+    0.15
+    >>> fs.value('erodibility_factor', 20.)
+    1.0
+    """
+
+    def __init__(self, times, **forcings):
+        """Initialize the ForcingSchedule."""
+        self.times = np.asarray(times, dtype=float)
+        if self.times.ndim != 1 or len(self.times) == 0:
+            raise ValueError('ForcingSchedule times must be a non-empty, '
+                             'one-dimensional array.')
+        if np.any(np.diff(self.times) < 0.):
+            raise ValueError('ForcingSchedule times must increase.')
+
+        self.names = []
+        self._values = np.empty((0, len(self.times)))
+        self._index = {}
+        for name in sorted(forcings):
+            self._append(name, forcings[name])
+        self._reset_cursor()
+
+    def __contains__(self, name):
+        """Return True if the schedule has a forcing called name."""
+        return name in self._index
+
+    def _append(self, name, values):
+        """Add a forcing given at self.times."""
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.times.shape:
+            raise ValueError('Forcing ' + name + ' must have one value '
+                             'per schedule time.')
+        if name in self._index:
+            self._values[self._index[name]] = values
+        else:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+            self._values = np.vstack((self._values, values))
+
+    def _reset_cursor(self):
+        """Forget the previous lookup."""
+        self._cursor = 0
+        self._time = None
+        self._current = np.empty(len(self.names))
+
+    def add(self, name, times, values):
+        """Add (or replace) the forcing called name, given at times."""
+        times = np.asarray(times, dtype=float)
+        if np.any(np.diff(times) < 0.):
+            raise ValueError('ForcingSchedule times must increase.')
+        if times.shape != self.times.shape or np.any(times != self.times):
+            union = np.union1d(self.times, times)
+            self._values = np.array([np.interp(union, self.times, row)
+                                     for row in self._values]).reshape(
+                                         (len(self.names), len(union)))
+            self.times = union
+            values = np.interp(union, times, values)
+        self._append(name, values)
+        self._reset_cursor()
+
+    def add_schedule(self, other):
+        """Add (or replace) every forcing of another ForcingSchedule."""
+        for name in other.names:
+            self.add(name, other.times, other._values[other._index[name]])
+
+    def _find_interval(self, time):
+        """Return index i such that times[i] <= time < times[i + 1]."""
+        times = self.times
+        if time < times[self._cursor]:
+            self._cursor = 0
+        while (self._cursor < len(times) - 1
+               and times[self._cursor + 1] <= time):
+            self._cursor += 1
+        return self._cursor
+
+    def update(self, time):
+        """Interpolate all forcings to a time."""
+        if time == self._time:
+            return
+        i = self._find_interval(time)
+        if time <= self.times[0] or i == len(self.times) - 1:
+            self._current[:] = self._values[:, i]
+        else:
+            weight = ((time - self.times[i])
+                      / (self.times[i + 1] - self.times[i]))
+            np.subtract(self._values[:, i + 1], self._values[:, i],
+                        out=self._current)
+            self._current *= weight
+            self._current += self._values[:, i]
+        self._time = time
+
+    def value(self, name, time):
+        """Return the value of the forcing called name at a time."""
+        self.update(time)
+        return float(self._current[self._index[name]])
+
+    @classmethod
+    def from_file(cls, file_name):
+        """Create a schedule from a comma-separated text file.
+
+        The first line names the columns. The first column is time, and
+        each other column is a forcing.
+        """
+        with open(file_name) as forcing_file:
+            names = [name.strip()
+                     for name in forcing_file.readline().split(',')]
+        data = np.loadtxt(file_name, skiprows=1, delimiter=',', ndmin=2)
+        if data.shape[1] != len(names):
+            raise ValueError('Forcing file ' + file_name + ' must have one '
+                             'name per column.')
+        forcings = dict((name, data[:, j])
+                        for (j, name) in enumerate(names) if j > 0)
+        return cls(data[:, 0], **forcings)
+
+    @classmethod
+    def from_precip_changer(cls, pc):
+        """Create a schedule from a PrecipChanger.
+
+        The forcings are erodibility_factor, intermittency_factor and
+        mean_storm__intensity (the daily mean depth, as returned by
+        pc.get_current_precip_params), calculated in one pass at the
+        pc.table_size evenly spaced times returned by pc.get_table_times.
+        """
+        times = pc.get_table_times()
+        (frac_wet, mean_depth) = pc.get_current_precip_params(times)
+        forcings = {'intermittency_factor': frac_wet,
+                    'mean_storm__intensity': mean_depth}
+        if pc.m is not None:
+            forcings['erodibility_factor'] = \
+                pc.get_erodibility_adjustment_factor(times)
+        return cls(times, **forcings)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+incremental_flow_accumulator.py: a FlowAccumulator that reuses the previous
+step's drainage area when flow directions have changed at only a few nodes.
+"""
+
+import numpy as np
+from landlab.components import FlowAccumulator
+from landlab.components.flow_accum import flow_accum_bw
+
+_UNFLOODED = 0
+
+
+class IncrementalFlowAccumulator(FlowAccumulator):
+    """
+    An IncrementalFlowAccumulator routes flow like a FlowAccumulator with a
+    depression finder, but avoids a full rebuild when it can.
+
+    Each call runs only the (cheap) flow director. It then compares the new
+    receivers with those from the previous call:
+
+        1. If any core node is a pit, lakes must be mapped, so the
+           depression finder and a full accumulation are run as usual.
+        2. If no receiver changed, drainage area, discharge and the upstream
+           node order from the previous call are still correct and are
+           reused.
+        3. If some receivers changed, the drainage area (and discharge) of
+           each changed node is removed from its old downstream path and
+           added to its new one. This stops and falls back to a full
+           rebuild if more than *rebuild_fraction* of the grid's nodes would
+           be visited.
+
+    The result is the same as that of FlowAccumulator.run_one_step. When no
+    pits exist, the depression finder would leave the flow directions
+    unchanged.
+
+    Parameters
+    ----------
+    grid : ModelGrid
+    rebuild_fraction : float, optional
+        Fraction of grid nodes that incremental updating may visit before a
+        full rebuild is used instead.
+    **kwds
+        Passed on to FlowAccumulator.
+    """
+
+    def __init__(self, grid, rebuild_fraction=0.01, **kwds):
+        """Initialize the IncrementalFlowAccumulator."""
+        super(IncrementalFlowAccumulator, self).__init__(grid, **kwds)
+
+        self.rebuild_fraction = rebuild_fraction
+        self._max_visits = max(1, int(rebuild_fraction
+                                      * grid.number_of_nodes))
+
+        self._core_nodes = grid.core_nodes
+        self._receivers = grid.at_node['flow__receiver_node']
+        self._area_field = grid.at_node['drainage_area']
+        self._discharge_field = grid.at_node['surface_water__discharge']
+        self._stack = grid.at_node['flow__upstream_node_order']
+
+        # Routing state as of the end of the previous call. Discharge is kept
+        # separately because some models overwrite the discharge field.
+        self._previous_receivers = None
+        self._area = np.zeros(grid.number_of_nodes)
+        self._discharge = np.zeros(grid.number_of_nodes)
+        self._lakes_mapped = False
+
+        # Work arrays, so that a step that does not rebuild allocates no
+        # node arrays
+        self._node_ids = np.arange(grid.number_of_nodes)
+        self._node_flags = np.empty(grid.number_of_nodes, dtype=bool)
+        self._changed_nodes = np.empty(grid.number_of_nodes, dtype=int)
+        self._core_receivers = np.empty(len(self._core_nodes),
+                                        dtype=self._receivers.dtype)
+        self._core_flags = np.empty(len(self._core_nodes), dtype=bool)
+        self._moving_receivers = np.empty_like(self._receivers)
+
+    def run_one_step(self):
+        """Route flow, rebuilding drainage area only where needed."""
+
+        # The first call always does a complete rebuild.
+        if self._previous_receivers is None:
+            super(IncrementalFlowAccumulator, self).run_one_step()
+            self._remember_routing()
+            return
+
+        self.flow_director.run_one_step()
+
+        # Pits mean lakes to map. The depression finder has to run.
+        r = self._receivers
+        core = self._core_nodes
+        np.take(r, core, out=self._core_receivers)
+        np.equal(self._core_receivers, core, out=self._core_flags)
+        if np.any(self._core_flags):
+            self.accumulate_flow(update_flow_director=False)
+            self._remember_routing()
+            return
+
+        # No lakes now, so clear any left from the last rebuild.
+        if self._lakes_mapped:
+            self.depression_finder.flood_status[:] = _UNFLOODED
+            self._lakes_mapped = False
+
+        np.not_equal(r, self._previous_receivers, out=self._node_flags)
+        n_changed = np.count_nonzero(self._node_flags)
+        if n_changed > 0:
+            changed = np.compress(self._node_flags, self._node_ids,
+                                  out=self._changed_nodes[:n_changed])
+            if self._move_upstream_areas(changed):
+                self._stack[:] = flow_accum_bw.make_ordered_node_array(r)
+                np.copyto(self._previous_receivers, r)
+            else:
+                self.accumulate_flow(update_flow_director=False)
+                self._remember_routing()
+                return
+
+        self._area_field[:] = self._area
+        self._discharge_field[:] = self._discharge
+
+    def _remember_routing(self):
+        """Store routing state after a full rebuild."""
+        if self._previous_receivers is None:
+            self._previous_receivers = self._receivers.copy()
+        else:
+            self._previous_receivers[:] = self._receivers
+        self._area[:] = self._area_field
+        self._discharge[:] = self._discharge_field
+        np.not_equal(self.depression_finder.flood_status, _UNFLOODED,
+                     out=self._node_flags)
+        self._lakes_mapped = np.any(self._node_flags)
+
+    def _move_upstream_areas(self, changed):
+        """Move the area draining through each changed node to its new path.
+
+        Changes are applied one node at a time. Each move keeps self._area
+        and self._discharge consistent with the partly updated receivers.
+        Return False if the visit budget is exceeded or a move would form a
+        loop. Either way, the caller does a full rebuild.
+        """
+        rcvr = self._moving_receivers
+        np.copyto(rcvr, self._previous_receivers)
+        new_rcvr = self._receivers
+        area = self._area
+        discharge = self._discharge
+        visits = 0
+
+        for node in changed:
+            node_area = area[node]
+            node_discharge = discharge[node]
+
+            # Remove from the old downstream path
+            down = node
+            while rcvr[down] != down:
+                down = rcvr[down]
+                area[down] -= node_area
+                discharge[down] -= node_discharge
+                visits += 1
+                if visits > self._max_visits:
+                    return False
+
+            # Add to the new downstream path. Any loop formed by this change
+            # passes back through the node itself.
+            rcvr[node] = new_rcvr[node]
+            down = node
+            while rcvr[down] != down:
+                down = rcvr[down]
+                if down == node:
+                    return False
+                area[down] += node_area
+                discharge[down] += node_discharge
+                visits += 1
+                if visits > self._max_visits:
+                    return False
+
+        return True
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+output_writer.py: write model output to NetCDF4 files, optionally in the
+background.
+"""
+
+import os
+import threading
+import queue
+
+import numpy as np
+
+try:
+    import netCDF4 as nc4
+except ImportError:
+    nc4 = None
+
+
+class NetCDFOutputWriter(object):
+    """
+    A NetCDFOutputWriter keeps one NetCDF4 (HDF5) file open and adds a time
+    slice to it at each call to write.
+
+    The file has an unlimited time dimension 'nt' and grid dimensions 'nj'
+    (rows) and 'ni' (columns), as in files written by landlab's
+    write_raster_netcdf. Node coordinates are stored once as 'x' and 'y'.
+    Each output field is a variable of shape (nt, nj, ni), chunked so that
+    one time slice is one chunk. Model time and the output iteration number
+    of each slice are stored in 't' and 'iteration'.
+
+    If append is True (when a model is restarted from a checkpoint) and the
+    file already exists, it is opened in append mode, and a slice with an
+    iteration number that is already in the file overwrites the old slice.
+    Otherwise a new file is created, replacing any old one.
+
+    Parameters
+    ----------
+    filename : str
+    grid : RasterModelGrid
+    field_names : list of str
+        Names of the node fields to write.
+    complevel : int, optional
+        zlib compression level, 0 (no compression) to 9.
+    shuffle : bool, optional
+        Use the HDF5 shuffle filter before compression.
+    float32 : bool, optional
+        Store float fields as 32 bit floats.
+    append : bool, optional
+        Add to the existing file, if there is one.
+    """
+
+    def __init__(self, filename, grid, field_names, complevel=4,
+                 shuffle=True, float32=False, append=False):
+        """Initialize the NetCDFOutputWriter."""
+        if nc4 is None:
+            raise ImportError('NetCDFOutputWriter requires netCDF4.')
+
+        self.filename = filename
+        self.grid = grid
+        self.field_names = list(field_names)
+        self.complevel = complevel
+        self.shuffle = shuffle
+        self.float32 = float32
+        self._shape = grid.shape
+
+        if append and os.path.exists(filename):
+            self._root = nc4.Dataset(filename, 'a')
+            for name in self.field_names:
+                if name not in self._root.variables:
+                    self._create_field_variable(name)
+        else:
+            self._root = nc4.Dataset(filename, 'w', format='NETCDF4')
+            self._create_file()
+
+    def _create_file(self):
+        """Create dimensions, coordinates and variables of a new file."""
+        root = self._root
+        (nj, ni) = self._shape
+        root.createDimension('nt', None)
+        root.createDimension('nj', nj)
+        root.createDimension('ni', ni)
+
+        x = root.createVariable('x', 'f8', ('nj', 'ni'))
+        x[:] = self.grid.node_x.reshape(self._shape)
+        y = root.createVariable('y', 'f8', ('nj', 'ni'))
+        y[:] = self.grid.node_y.reshape(self._shape)
+
+        root.createVariable('t', 'f8', ('nt', ))
+        root.createVariable('iteration', 'i4', ('nt', ))
+
+        for name in self.field_names:
+            self._create_field_variable(name)
+
+    def _create_field_variable(self, name):
+        """Create the (nt, nj, ni) variable for one node field."""
+        (nj, ni) = self._shape
+        dtype = self.grid.at_node[name].dtype
+        if self.float32 and np.issubdtype(dtype, np.floating):
+            dtype = np.float32
+        self._root.createVariable(name, dtype, ('nt', 'nj', 'ni'),
+                                  zlib=self.complevel > 0,
+                                  complevel=self.complevel,
+                                  shuffle=self.shuffle,
+                                  chunksizes=(1, nj, ni))
+
+    def write(self, time, iteration, values=None):
+        """Write the current values of the output fields as a new slice.
+
+        If values (a dictionary of node arrays keyed by field name) is
+        given, it is written instead of the grid's fields.
+        """
+        if values is None:
+            values = self.grid.at_node
+        root = self._root
+        written = root.variables['iteration'][:]
+        existing = np.flatnonzero(np.asarray(written) == iteration)
+        if existing.size > 0:
+            index = existing[0]
+        else:
+            index = len(root.dimensions['nt'])
+
+        root.variables['t'][index] = time
+        root.variables['iteration'][index] = iteration
+        for name in self.field_names:
+            root.variables[name][index, :, :] = \
+                values[name].reshape(self._shape)
+        root.sync()
+
+    def close(self):
+        """Close the file."""
+        if self._root is not None:
+            self._root.close()
+            self._root = None
+
+
+class AsyncOutputWriter(object):
+    """
+    An AsyncOutputWriter writes output on a background thread, so the model
+    can keep running while a file is written.
+
+    submit copies the output fields into a free slot of a preallocated ring
+    buffer and queues that slot. The writer thread writes queued slots in
+    order and returns each slot to the free list when it is done. If all
+    slots are waiting to be written, submit blocks until one is free.
+
+    Output goes either to the single file single_filename, or to one file
+    per output iteration named filename_prefix + iteration + '.nc'. Both
+    use the layout of NetCDFOutputWriter.
+
+    An error on the writer thread is raised again by the next call to
+    submit or close.
+
+    Parameters
+    ----------
+    grid : RasterModelGrid
+    field_names : list of str
+    single_filename : str, optional
+    filename_prefix : str, optional
+    n_slots : int, optional
+        Number of output snapshots that can be held at once.
+    **kwds
+        Passed on to NetCDFOutputWriter. append applies only to the single
+        file; a file for one iteration is always written anew.
+    """
+
+    def __init__(self, grid, field_names, single_filename=None,
+                 filename_prefix=None, n_slots=2, **kwds):
+        """Initialize the AsyncOutputWriter and start its thread."""
+        if (single_filename is None) == (filename_prefix is None):
+            raise ValueError('AsyncOutputWriter takes EITHER '
+                             'single_filename or filename_prefix.')
+
+        self.grid = grid
+        self.field_names = list(field_names)
+        self.single_filename = single_filename
+        self.filename_prefix = filename_prefix
+        self._writer_kwds = kwds
+        self._single_writer = None
+
+        self._slots = [dict((name, np.empty_like(grid.at_node[name]))
+                            for name in self.field_names)
+                       for i in range(n_slots)]
+        self._free_slots = queue.Queue()
+        for i in range(n_slots):
+            self._free_slots.put(i)
+        self._pending = queue.Queue()
+        self._error = None
+
+        self._thread = threading.Thread(target=self._write_pending)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, time, iteration):
+        """Queue the current values of the output fields for writing."""
+        self._raise_error()
+        slot = self._free_slots.get()
+        values = self._slots[slot]
+        for name in self.field_names:
+            values[name][:] = self.grid.at_node[name]
+        self._pending.put((slot, time, iteration))
+
+    def close(self):
+        """Write everything still queued, then stop the writer thread."""
+        if self._thread is not None:
+            self._pending.put(None)
+            self._thread.join()
+            self._thread = None
+        self._raise_error()
+
+    def _raise_error(self):
+        """Raise an error from the writer thread, if one occurred."""
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+    def _write_pending(self):
+        """Write queued slots until close is called. Runs on the thread."""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            (slot, time, iteration) = item
+            try:
+                if self._error is None:
+                    self._write_slot(self._slots[slot], time, iteration)
+            except Exception as error:
+                self._error = error
+            self._free_slots.put(slot)
+
+        if self._single_writer is not None:
+            try:
+                self._single_writer.close()
+            except Exception as error:
+                self._error = error
+            self._single_writer = None
+
+    def _write_slot(self, values, time, iteration):
+        """Write one snapshot."""
+        if self.single_filename is not None:
+            if self._single_writer is None:
+                self._single_writer = NetCDFOutputWriter(self.single_filename,
+                                                         self.grid,
+                                                         self.field_names,
+                                                         **self._writer_kwds)
+            self._single_writer.write(time, iteration, values=values)
+        else:
+            filename = self.filename_prefix + str(iteration).zfill(4) + '.nc'
+            kwds = dict(self._writer_kwds, append=False)
+            writer = NetCDFOutputWriter(filename, self.grid,
+                                        self.field_names, **kwds)
+            try:
+                writer.write(time, iteration, values=values)
+            finally:
+                writer.close()
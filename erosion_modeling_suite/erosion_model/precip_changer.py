@@ -43,13 +43,33 @@ def depth_to_intensity(depth, time_unit):
 class PrecipChanger(object):
     """Class PrecipChanger handles time-varying precipitation and related
     parameters in Erosion Modeling Suite (EMS).
+
+    The erodibility adjustment factor depends on psi, the part of the
+    erosion coefficient that depends on precipitation intensity (see
+    calculate_psi). Without an infiltration capacity, psi has the closed
+    form lambda^m Gamma(1 + m / c). With one, psi is found by numerical
+    integration. This is done once, at table_size evenly spaced times
+    between zero and stop_time, and get_erodibility_adjustment_factor
+    interpolates linearly in this table. psi varies smoothly with time, so
+    the table adds no meaningful error.
+
+    The get_ methods take either one time or an array of times, so all the
+    parameters of a run can be found at once (see ForcingSchedule).
+
+    Examples
+    --------
+    >>> from erosion_model import PrecipChanger
+    >>> pc = PrecipChanger(0.3, 0.0, 0.002, 0.0, 0.6, m=0.5, stop_time=10.)
+    >>> float(pc.get_erodibility_adjustment_factor(5.))
+    1.0
     """
 
     def __init__(self, starting_frac_wet_days,
                  frac_wet_days_rate_of_change,
                  starting_daily_mean_depth, mean_depth_rate_of_change,
                  precip_shape_factor, time_unit='year',
-                 infiltration_capacity=None, m=None, stop_time=None):
+                 infiltration_capacity=None, m=None, stop_time=None,
+                 table_size=1001):
         """Initialize a PrecipChanger object.
         """
         self.starting_frac_wet_days = starting_frac_wet_days
@@ -61,16 +81,28 @@ class PrecipChanger(object):
         self.infilt_cap = infiltration_capacity
         self.m = m
         self.stop_time = stop_time
+        self.table_size = table_size
 
-        if self.infilt_cap is not None:
+        self._psi_table = None
+        if self.m is not None:
             (self.starting_psi, abserr) = self._calculate_starting_psi()
-
+            if self.infilt_cap is not None and self.stop_time is not None:
+                self._tabulate_psi(table_size)
+        else:
+            self.starting_psi = None
 
     def _calculate_starting_psi(self):
         """Calculate and store for later the factor psi, which represents the
         portion of the erosion coefficient that depends on precipitation
         intensity.
 
+        Returns psi and an estimate of its absolute error.
+        """
+        return self.calculate_psi(self.starting_daily_mean_depth)
+
+    def calculate_psi(self, mean_depth):
+        """Calculate the factor psi for a daily mean precipitation depth.
+
         Psi is defined as the integral from Ic to infinity of
 
             (p - Ic)^m f(p) dp
@@ -78,21 +110,61 @@ class PrecipChanger(object):
         where p is precipitation intensity, Ic is infiltration capacity, m is
         the discharge/area exponent (e.g., 1/2), and f(p) is the Weibull
         distribution representing the probability distribution of daily
-        precipitation intensity.
+        precipitation intensity. If there is no infiltration capacity, Ic is
+        zero and psi = lambda^m Gamma(1 + m / c), where lambda and c are the
+        scale and shape factors of the distribution.
+
+        Returns psi and an estimate of its absolute error.
         """
-        mean_intensity = depth_to_intensity(self.starting_daily_mean_depth,
-                                            self.time_unit)
+        mean_intensity = depth_to_intensity(mean_depth, self.time_unit)
         lam = scale_fac(mean_intensity, self.precip_shape_factor)
-        psi = quad(integrand, self.infilt_cap, np.inf,
-                         args=(self.infilt_cap, lam, self.precip_shape_factor,
-                               self.m))
-        return psi
+        if self.infilt_cap is None:
+            psi = (lam ** self.m) * gamma(1.0 + self.m
+                                          / self.precip_shape_factor)
+            return (psi, 0.0)
+        return quad(integrand, self.infilt_cap, np.inf,
+                    args=(self.infilt_cap, lam, self.precip_shape_factor,
+                          self.m))
+
+    def _tabulate_psi(self, table_size):
+        """Calculate psi at table_size evenly spaced times from zero to
+        stop_time."""
+        self._table_dt = float(self.stop_time) / (table_size - 1)
+        self._psi_table = np.empty(table_size)
+        for i in range(table_size):
+            time = i * self._table_dt
+            mean_depth = (self.starting_daily_mean_depth
+                          + self.mean_depth_rate_of_change * time)
+            (self._psi_table[i], abserr) = self.calculate_psi(mean_depth)
+
+    def get_table_times(self):
+        """Return table_size evenly spaced times from zero to stop_time."""
+        return np.linspace(0.0, self.stop_time, self.table_size)
+
+    def get_current_psi(self, current_time):
+        """Return psi at the current time."""
+        current_time = np.minimum(current_time, self.stop_time)
+
+        if self._psi_table is None:
+            frac_wet, mean_depth = self.get_current_precip_params(current_time)
+            if self.infilt_cap is None or np.ndim(mean_depth) == 0:
+                (psi, abserr) = self.calculate_psi(mean_depth)
+                return psi
+            return np.array([self.calculate_psi(depth)[0]
+                             for depth in np.ravel(mean_depth)]).reshape(
+                                 np.shape(mean_depth))
+
+        # linear interpolation in the table
+        position = np.maximum(current_time, 0.0) / self._table_dt
+        i = np.minimum(position.astype(int), len(self._psi_table) - 2)
+        weight = position - i
+        return ((1.0 - weight) * self._psi_table[i]
+                + weight * self._psi_table[i + 1])
 
     def get_current_precip_params(self, current_time):
         """Return current frac wet days and daily mean depth."""
 
-        if current_time > self.stop_time:
-            current_time = self.stop_time
+        current_time = np.minimum(current_time, self.stop_time)
 
         frac_wet_days = (self.starting_frac_wet_days
                          + self.frac_wet_days_rate_of_change * current_time)
@@ -111,16 +183,11 @@ class PrecipChanger(object):
         We will have already calculated Kq, and it won't
         """
 
-        if current_time > self.stop_time:
-            current_time = self.stop_time
-                    
+        current_time = np.minimum(current_time, self.stop_time)
+
         frac_wet, mean_depth = self.get_current_precip_params(current_time)
+        psi = self.get_current_psi(current_time)
 
-        mean_intensity = depth_to_intensity(mean_depth, self.time_unit)
-        lam = scale_fac(mean_intensity, self.precip_shape_factor)
-        (psi, abserr) = quad(integrand, self.infilt_cap, np.inf,
-                         args=(self.infilt_cap, lam, self.precip_shape_factor,
-                               self.m))
         adj_fac = ((frac_wet * psi)
                     / (self.starting_frac_wet_days * self.starting_psi))
         return adj_fac
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+rain_record.py: a growable, typed record of rain events.
+"""
+
+import os
+
+import numpy as np
+
+RAIN_RECORD_DTYPE = np.dtype([('event_start_time', np.float64),
+                              ('event_duration', np.float64),
+                              ('rainfall_rate', np.float64),
+                              ('runoff_rate', np.float64)])
+
+
+class RainRecord(object):
+    """
+    A RainRecord holds the event start time, event duration, rainfall rate
+    and runoff rate of each rain event (or dry interval) of a model run.
+
+    Events are stored in a NumPy structured array that doubles in size when
+    it is full, so appending an event does not create any Python objects.
+    A column of all recorded events is returned by indexing with its name,
+    e.g. record['rainfall_rate'].
+
+    If spill_filename is given, events are written (as raw binary records)
+    to that file whenever chunk_size events are held in memory, and memory
+    use stays bounded for long runs. Spilled events are read back only when
+    the record is written out or a column is asked for.
+
+    Parameters
+    ----------
+    chunk_size : int, optional
+        Initial number of events held in memory and, if spilling, the
+        number of events written to the spill file at once.
+    spill_filename : str, optional
+
+    Examples
+    --------
+    >>> from erosion_model.rain_record import RainRecord
+    >>> record = RainRecord(chunk_size=2)
+    >>> record.append(0., 1., 2., 1.5)
+    >>> record.append(1., 1., 0., 0.)
+    >>> record.append(2., 1., 3., 2.5)
+    >>> len(record)
+    3
+    >>> record['rainfall_rate']
+    array([2., 0., 3.])
+    """
+
+    names = RAIN_RECORD_DTYPE.names
+
+    def __init__(self, chunk_size=1024, spill_filename=None):
+        """Initialize the RainRecord."""
+        self.chunk_size = int(chunk_size)
+        if self.chunk_size < 1:
+            raise ValueError('RainRecord chunk_size must be at least 1.')
+        self.spill_filename = spill_filename
+        self._buffer = np.empty(self.chunk_size, dtype=RAIN_RECORD_DTYPE)
+        self._count = 0
+        self._spilled = 0
+        if spill_filename is not None:
+            open(spill_filename, 'wb').close()
+
+    def __len__(self):
+        """Return the number of recorded events."""
+        return self._spilled + self._count
+
+    def __iter__(self):
+        """Iterate over column names."""
+        return iter(self.names)
+
+    def keys(self):
+        """Return the column names."""
+        return self.names
+
+    def __getitem__(self, name):
+        """Return a column of all recorded events as an array."""
+        if name not in self.names:
+            raise KeyError(name)
+        in_memory = self._buffer[name][:self._count]
+        if self._spilled == 0:
+            return in_memory.copy()
+        return np.concatenate((self._read_spilled()[name], in_memory))
+
+    def append(self, event_start_time, event_duration, rainfall_rate,
+               runoff_rate):
+        """Record one event."""
+        if self._count == len(self._buffer):
+            if self.spill_filename is not None:
+                self.spill()
+            else:
+                self._grow()
+        self._buffer[self._count] = (event_start_time, event_duration,
+                                     rainfall_rate, runoff_rate)
+        self._count += 1
+
+    def extend(self, events):
+        """Record a structured array of events, in order."""
+        events = np.asarray(events, dtype=RAIN_RECORD_DTYPE)
+        start = 0
+        while start < len(events):
+            if self._count == len(self._buffer):
+                if self.spill_filename is not None:
+                    self.spill()
+                else:
+                    self._grow(len(events) - start)
+            n = min(len(events) - start, len(self._buffer) - self._count)
+            self._buffer[self._count:self._count + n] = events[start:start + n]
+            self._count += n
+            start += n
+
+    def clear(self):
+        """Remove all events, including spilled ones."""
+        self._count = 0
+        self._spilled = 0
+        if self.spill_filename is not None:
+            open(self.spill_filename, 'wb').close()
+
+    def spill(self):
+        """Append the events held in memory to the spill file."""
+        if self.spill_filename is None:
+            raise ValueError('This RainRecord has no spill_filename.')
+        with open(self.spill_filename, 'ab') as spill_file:
+            self._buffer[:self._count].tofile(spill_file)
+        self._spilled += self._count
+        self._count = 0
+
+    def _grow(self, at_least=1):
+        """Double the size of the in-memory buffer (or more, if needed)."""
+        size = max(2 * len(self._buffer), self._count + at_least)
+        buffer = np.empty(size, dtype=RAIN_RECORD_DTYPE)
+        buffer[:self._count] = self._buffer[:self._count]
+        self._buffer = buffer
+
+    def _read_spilled(self):
+        """Return a read-only memory map of the spilled events."""
+        return np.memmap(self.spill_filename, dtype=RAIN_RECORD_DTYPE,
+                         mode='r', shape=(self._spilled, ))
+
+    def _chunks(self):
+        """Yield all events, in order, as structured arrays of at most
+        chunk_size events."""
+        if self._spilled > 0:
+            spilled = self._read_spilled()
+            for start in range(0, self._spilled, self.chunk_size):
+                yield spilled[start:start + self.chunk_size]
+        if self._count > 0:
+            yield self._buffer[:self._count]
+
+    def to_array(self):
+        """Return all events as one structured array."""
+        if self._spilled == 0:
+            return self._buffer[:self._count].copy()
+        return np.concatenate(list(self._chunks()))
+
+    def write(self, filename):
+        """Write all events to a file.
+
+        The format is chosen by the file extension: '.npy' writes a NumPy
+        structured array, '.parquet' a Parquet table (this requires pandas
+        with a Parquet engine), and anything else a comma-separated text
+        file with a header line. Events are written a chunk at a time.
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == '.npy' and len(self) == 0:
+            np.save(filename, self.to_array())
+        elif extension == '.npy':
+            out = np.lib.format.open_memmap(filename, mode='w+',
+                                            dtype=RAIN_RECORD_DTYPE,
+                                            shape=(len(self), ))
+            start = 0
+            for chunk in self._chunks():
+                out[start:start + len(chunk)] = chunk
+                start += len(chunk)
+            out.flush()
+            del out
+        elif extension == '.parquet':
+            try:
+                import pandas as pd
+            except ImportError:
+                raise ImportError('Writing a rain record to Parquet requires '
+                                  'pandas.')
+            pd.DataFrame(self.to_array()).to_parquet(filename)
+        else:
+            with open(filename, 'w') as stormfile:
+                stormfile.write(','.join(self.names) + '\n')
+                for chunk in self._chunks():
+                    np.savetxt(stormfile, chunk.view(np.float64).reshape(
+                        (len(chunk), len(self.names))), fmt='%.17g',
+                        delimiter=',')
+
+    def close(self):
+        """Remove the spill file, if any."""
+        if self.spill_filename is not None and \
+                os.path.exists(self.spill_filename):
+            os.remove(self.spill_filename)
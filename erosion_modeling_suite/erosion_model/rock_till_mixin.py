@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+rock_till_mixin.py: in-place erodibility and threshold updates shared by the
+rock-till (Rt) models.
+"""
+
+import numpy as np
+
+# D/D* is limited to +/- this value to prevent overflow in the exponent.
+_MAX_EXPONENT = 100.0
+
+
+def rock_till_weight(d, contact, contact_width):
+    """Replace elevation d with the weighting function F, in place, for
+    contact elevation b = contact and contact zone width D* = contact_width.
+
+    d may be a stack of elevations, with contact and contact_width
+    broadcast against it.
+    """
+    # d = -(z - b) / D*, limited to avoid overflow
+    d -= contact
+    d *= -1.0 / contact_width
+    np.clip(d, -_MAX_EXPONENT, _MAX_EXPONENT, out=d)
+
+    # F = 1 / (1 + exp(d))
+    np.exp(d, out=d)
+    d += 1.0
+    np.reciprocal(d, out=d)
+    return d
+
+
+class _RockTillMixin(object):
+    """
+    A _RockTillMixin gives a rock-till model the steps of its erodibility
+    update as in-place operations on preallocated arrays.
+
+    The weighting function
+
+        F = 1 / (1 + exp(-(z - b) / D*))
+
+    is calculated only at the rock-till nodes, a fixed index array made once
+    by setup_rock_till_nodes. The contact elevation b at those nodes is also
+    stored once, and every step works in one scratch array of the same
+    length, so no temporary arrays are made. A value blended from the till
+    and rock values,
+
+        K = F K_till + (1 - F) K_rock = K_rock + F (K_till - K_rock),
+
+    is then written directly into its output array.
+
+    The mixin uses self.z, self.rock_till_contact and self.contact_width,
+    which the model sets in setup_rock_and_till. It looks up the weight
+    and output arrays on each call, so they may be replaced (for example
+    by an ErosionModelEnsemble).
+
+    _rock_till_weight_name is the name of the model's array of F. An
+    ErosionModelEnsemble replaces that array with a row of its own stack,
+    calculates F for all of its members at once, and sets
+    _external_rock_till_weight so that update_rock_till_weight leaves it as
+    it is.
+    """
+
+    _rock_till_weight_name = 'erody_wt'
+    _external_rock_till_weight = False
+
+    def setup_rock_till_nodes(self, nodes=None):
+        """Store the nodes where F is calculated (by default, the data
+        nodes) and the contact elevation at those nodes."""
+        if nodes is None:
+            nodes = np.flatnonzero(self.data_nodes)
+        self._rock_till_nodes = np.ascontiguousarray(nodes, dtype=np.intp)
+        self._rock_till_contact_at_nodes = \
+            self.rock_till_contact[self._rock_till_nodes]
+        self._rock_till_scratch = np.empty(len(self._rock_till_nodes))
+
+    def update_rock_till_weight(self, weight):
+        """Set the weighting function F at the rock-till nodes, in place."""
+        if self._external_rock_till_weight:
+            return
+
+        nodes = self._rock_till_nodes
+        d = self._rock_till_scratch
+        np.take(self.z, nodes, out=d, mode='clip')
+        rock_till_weight(d, self._rock_till_contact_at_nodes,
+                         self.contact_width)
+        weight[nodes] = d
+
+    @staticmethod
+    def blend_rock_till(weight, till_value, rock_value, out):
+        """Set out = F till_value + (1 - F) rock_value, in place."""
+        np.multiply(weight, till_value - rock_value, out=out)
+        out += rock_value
@@ -31,6 +31,7 @@ Landlab components used: FlowRouter, DepressionFinderAndRouter,
 """
 
 from erosion_model.erosion_model import _ErosionModel
+from erosion_model.erosion_threshold_tracker import ErosionThresholdTracker
 from landlab.components import (FlowRouter, DepressionFinderAndRouter,
                                 StreamPowerSmoothThresholdEroder)
 import numpy as np
@@ -57,9 +58,15 @@ class StreamPowerVarThresholdModel(_ErosionModel):
         self.flow_router = FlowRouter(self.grid, **self.params)
         self.lake_filler = DepressionFinderAndRouter(self.grid, **self.params)
         
-        # Create a field for the (initial) erosion threshold
-        self.threshold = self.grid.add_zeros('node', 'erosion__threshold')
-        self.threshold[:] = self.params['threshold_sp']
+        # Get the parameter for rate of threshold increase with erosion depth
+        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
+
+        # Create a field for the (initial) erosion threshold, and a tracker
+        # that keeps it and cumulative erosion depth up to date
+        self.threshold_tracker = ErosionThresholdTracker(self.grid,
+                                                         self.params['threshold_sp'],
+                                                         self.thresh_change_per_depth)
+        self.threshold = self.threshold_tracker.threshold
         
         # Instantiate a FastscapeEroder component
         self.eroder = StreamPowerSmoothThresholdEroder(
@@ -67,9 +74,6 @@ class StreamPowerVarThresholdModel(_ErosionModel):
             K_sp=self.params['K_sp'],
             threshold_sp=self.threshold)
 
-        # Get the parameter for rate of threshold increase with erosion depth
-        self.thresh_change_per_depth = self.params['thresh_change_per_depth']
-
 
     def run_one_step(self, dt):
         """
@@ -83,21 +87,8 @@ class StreamPowerVarThresholdModel(_ErosionModel):
         # Get IDs of flooded nodes, if any
         flooded = np.where(self.lake_filler.flood_status==3)[0]
 
-        # Set the erosion threshold.
-        #
-        # Note that a minus sign is used because cum ero depth is negative for
-        # erosion, positive for deposition.
-        # The second line handles the case where there is growth, in which case
-        # we want the threshold to stay at its initial value rather than 
-        # getting smaller.
-        cum_ero = self.grid.at_node['cumulative_erosion__depth']
-        cum_ero[:] = (self.z
-                      - self.grid.at_node['initial_topographic__elevation'])
-        self.threshold[:] = (self.params['threshold_sp']
-                             - (self.thresh_change_per_depth
-                                * cum_ero))
-        self.threshold[self.threshold < self.params['threshold_sp']] = \
-            self.params['threshold_sp']
+        # Set the erosion threshold from cumulative erosion depth
+        self.threshold_tracker.run_one_step()
 
         # Do some erosion (but not on the flooded nodes)
         self.eroder.run_one_step(dt, flooded_nodes=flooded)
@@ -8,14 +8,14 @@ that uses stochastic hydrology.
 """
 
 from erosion_model import _ErosionModel
+from erosion_model.rain_record import RainRecord
+from erosion_model.exceedance_analyzer import ExceedanceAnalyzer
 
 from landlab.components import (PrecipitationDistribution)
 
-import numpy as np
-import scipy.stats as stats
-import textwrap
+import json
 
-_STRING_LENGTH = 80
+import numpy as np
 
 class _StochasticErosionModel(_ErosionModel):
     """
@@ -36,6 +36,11 @@ class _StochasticErosionModel(_ErosionModel):
                                                       BaselevelHandlerClass=BaselevelHandlerClass)
 
         self.opt_stochastic_duration = (self.params['opt_stochastic_duration'])
+
+        # Handle option to skip flow routing between storms (stochastic
+        # duration only)
+        self.opt_event_driven = self.params.get('opt_event_driven') or False
+
         # initialize record for storms. Depending on how this model is run
         # (stochastic time, number_time_steps>1, more manually) the dt may
         # change. Thus, rather than writing routines to reconstruct the time
@@ -54,13 +59,13 @@ class _StochasticErosionModel(_ErosionModel):
                   'written')
             self.params['record_rain'] = True
 
-        # Second, test that
+        # Second, test that. Long runs can spill the record to disk every
+        # rain_record_chunk_size events by giving rain_record_spill_filename.
         if self.params.get('record_rain'):
             self.record_rain = True
-            self.rain_record = {'event_start_time': [],
-                                'event_duration': [],
-                                'rainfall_rate': [],
-                                'runoff_rate': []}
+            self.rain_record = RainRecord(
+                chunk_size=self.params.get('rain_record_chunk_size', 1024),
+                spill_filename=self.params.get('rain_record_spill_filename'))
         else:
             self.record_rain = False
             self.rain_record = None
@@ -83,9 +88,51 @@ class _StochasticErosionModel(_ErosionModel):
         """
         self.rain_generator.delta_t = dt
         self.rain_generator.run_time = runtime
+        if not self.opt_event_driven:
+            for (tr, p) in self.rain_generator.yield_storm_interstorm_duration_intensity():
+                self.rain_rate = p
+                self.run_one_step(tr)
+            return
+
+        # Event-driven: consecutive dry intervals are run as one step, and
+        # flow is routed only for storms.
+        dry_time = 0.0
         for (tr, p) in self.rain_generator.yield_storm_interstorm_duration_intensity():
-            self.rain_rate = p
-            self.run_one_step(tr)
+            if p > 0.0:
+                if dry_time > 0.0:
+                    self.run_dry_interval(dry_time)
+                    dry_time = 0.0
+                self.rain_rate = p
+                self.run_one_step(tr)
+            else:
+                if self.record_rain:
+                    self.record_rain_event(self.model_time + dry_time, tr, 0, 0)
+                dry_time += tr
+        if dry_time > 0.0:
+            self.run_dry_interval(dry_time)
+
+    def run_dry_interval(self, dt):
+        """Advance model through a dry period of duration dt.
+
+        With no rain there is no water erosion, so flow is not routed; only
+        hillslope diffusion, baselevel change and the walltime check are
+        done. Used by run_for_stochastic if opt_event_driven is True. The
+        dry period is not recorded here, as run_for_stochastic records each
+        dry interval in it.
+        """
+        self.rain_rate = 0.0
+
+        # Do some soil creep
+        self.diffuser.run_one_step(dt)
+
+        # calculate model time
+        self.model_time += dt
+
+        # Lower outlet
+        self.update_outlet(dt)
+
+        # Check walltime
+        self.check_walltime()
 
     def instantiate_rain_generator(self):
         """Instantiate RainGenerator."""
@@ -98,7 +145,7 @@ class _StochasticErosionModel(_ErosionModel):
                                           mean_storm_depth=self.params['mean_storm_depth'],
                                           total_t=self.params['run_duration'],
                                           delta_t=self.params['dt'],
-                                          random_seed=int(self.params['random_seed']))
+                                          random_seed=self.make_integer_seed('rain'))
             self.run_for = self.run_for_stochastic  # override base method
         else:
             from scipy.special import gamma
@@ -109,7 +156,7 @@ class _StochasticErosionModel(_ErosionModel):
                 PrecipitationDistribution(mean_storm_duration=1.0,
                                           mean_interstorm_duration=1.0,
                                           mean_storm_depth=1.0,
-                                          random_seed=int(self.params['random_seed']))
+                                          random_seed=self.make_integer_seed('rain'))
             self.intermittency_factor = intermittency_factor
             self.mean_storm__intensity = mean_storm__intensity
             self.shape_factor = self.params['precip_shape_factor']
@@ -117,13 +164,47 @@ class _StochasticErosionModel(_ErosionModel):
                                  / gamma(1.0 + (1.0 / self.shape_factor)))
             self.n_sub_steps = int(self.params['number_of_sub_time_steps'])
 
+            # Storm intensities are drawn in batches (by default, enough for
+            # one output interval) from the model's rain stream, so they do
+            # not depend on, or change, the global np.random state.
+            self.rain_rng = self.make_rng('rain')
+            try:
+                self.intensity_batch_size = int(self.params['storm_intensity_batch_size'])
+            except KeyError:
+                interval = self.params.get('output_interval',
+                                           self.params['run_duration'])
+                steps_per_output = int(np.ceil(interval / self.params['dt']))
+                self.intensity_batch_size = max(1, steps_per_output
+                                                * self.n_sub_steps)
+            self._storm_intensities = np.empty(0)
+            self._next_intensity = 0
+
     def reset_random_seed(self):
         """Re-set the random number generation sequence."""
-        try:
-            seed = int(self.params['random_seed'])
-        except KeyError:
-            seed = 0
-        self.rain_generator.seed_generator(seedval=seed)
+        self.rain_generator.seed_generator(seedval=self.make_integer_seed('rain'))
+        if not self.opt_stochastic_duration:
+            self.rain_rng = self.make_rng('rain')
+            self._storm_intensities = np.empty(0)
+            self._next_intensity = 0
+
+    def draw_storm_intensities(self, n):
+        """Return n storm intensities from the stretched exponential
+        (Weibull) distribution with shape_factor and a scale of one."""
+        return self.rain_rng.weibull(self.shape_factor, n)
+
+    def next_storm_intensity(self):
+        """Return the next storm intensity, drawing a new batch if needed.
+
+        Batches are drawn with a scale of one and multiplied by the current
+        scale_factor here.
+        """
+        if self._next_intensity >= len(self._storm_intensities):
+            self._storm_intensities = \
+                self.draw_storm_intensities(self.intensity_batch_size)
+            self._next_intensity = 0
+        intensity = self._storm_intensities[self._next_intensity]
+        self._next_intensity += 1
+        return self.scale_factor * intensity
 
     def handle_water_erosion(self, dt, flooded):
         """Handle water erosion.
@@ -152,7 +233,8 @@ class _StochasticErosionModel(_ErosionModel):
         """
         # (if we're varying precipitation parameters through time, update them)
         if self.opt_var_precip:
-            self.intermittency_factor, self.mean_storm__intensity = self.pc.get_current_precip_params(self.model_time)
+            self.intermittency_factor = self.forcing.value('intermittency_factor', self.model_time)
+            self.mean_storm__intensity = self.forcing.value('mean_storm__intensity', self.model_time)
 
         if self.opt_stochastic_duration and self.rain_rate > 0.0:
 
@@ -174,9 +256,7 @@ class _StochasticErosionModel(_ErosionModel):
             dt_water = ((dt * self.intermittency_factor)
                          / float(self.n_sub_steps))
             for i in range(self.n_sub_steps):
-                self.rain_rate = \
-                    self.rain_generator.generate_from_stretched_exponential(
-                        self.scale_factor, self.shape_factor)
+                self.rain_rate = self.next_storm_intensity()
 
                 runoff = self.calc_runoff_and_discharge()
                 self.eroder.run_one_step(dt_water, flooded_nodes=flooded,
@@ -200,6 +280,8 @@ class _StochasticErosionModel(_ErosionModel):
 
     def finalize(self):
 
+        super(_StochasticErosionModel, self).finalize()
+
         # if rain was recorded, write it out.
         if self.record_rain:
             filename = self.params.get('storm_sequence_filename')
@@ -211,6 +293,34 @@ class _StochasticErosionModel(_ErosionModel):
             frequency_filename = self.params.get('frequency_filename')
             self.write_exceedance_frequency_file(frequency_filename)
 
+        # remove the spill file, if any
+        if self.record_rain:
+            self.rain_record.close()
+
+    def _get_checkpoint_state(self):
+        """Return a dictionary of arrays holding the model state."""
+        state = super(_StochasticErosionModel, self)._get_checkpoint_state()
+        if self.record_rain:
+            state['rain_record'] = self.rain_record.to_array()
+        if not self.opt_stochastic_duration:
+            state['storm_intensity__rng_state'] = \
+                np.array(json.dumps(self.rain_rng.bit_generator.state))
+            state['storm_intensity__batch'] = self._storm_intensities
+            state['storm_intensity__next'] = np.array(self._next_intensity)
+        return state
+
+    def _set_checkpoint_state(self, state):
+        """Set the model state from a dictionary of arrays."""
+        super(_StochasticErosionModel, self)._set_checkpoint_state(state)
+        if self.record_rain:
+            self.rain_record.clear()
+            self.rain_record.extend(state['rain_record'])
+        if not self.opt_stochastic_duration:
+            self.rain_rng.bit_generator.state = \
+                json.loads(str(state['storm_intensity__rng_state']))
+            self._storm_intensities = state['storm_intensity__batch']
+            self._next_intensity = int(state['storm_intensity__next'])
+
     def record_rain_event(self, event_start_time, event_duration, rainfall_rate, runoff_rate):
         """Record rain events.
 
@@ -218,232 +328,46 @@ class _StochasticErosionModel(_ErosionModel):
         runoff rate.
 
         """
-        self.rain_record['event_start_time'].append(event_start_time)
-        self.rain_record['event_duration'].append(event_duration)
-        self.rain_record['rainfall_rate'].append(rainfall_rate)
-        self.rain_record['runoff_rate'].append(runoff_rate)
+        self.rain_record.append(event_start_time, event_duration,
+                                rainfall_rate, runoff_rate)
 
     def write_storm_sequence_to_file(self, filename=None):
         """
-        Write event duration and intensity to a formatted text file.
+        Write event start time, duration, rainfall rate and runoff rate to a
+        file.
+
+        A .npy or .parquet filename writes a binary table; any other name
+        writes comma-separated text. See RainRecord.write.
         """
 
-        # Open a file for writing
         if self.record_rain == False:
             raise ValueError('Rain was not recorded when the model run. To '
                              'record rain, set the parameter "record_rain"'
                              'to True.')
         if filename is None:
             filename = 'event_sequence.txt'
-        stormfile = open(filename, 'w')
-        stormfile.write('event_start_time' + ',' +
-                        'event_duration' + ',' +
-                        'rainfall_rate' + ',' +
-                        'runoff_rate' + '\n')
-
-        n_events = len(self.rain_record['event_start_time'])
-        for i in range(n_events):
-            stormfile.write(str(self.rain_record['event_start_time'][i]) + ',' +
-                            str(self.rain_record['event_duration'][i]) + ',' +
-                            str(self.rain_record['rainfall_rate'][i]) + ',' +
-                            str(self.rain_record['runoff_rate'][i])+ '\n')
-
-        # Close the file
-        stormfile.close()
+        self.rain_record.write(filename)
 
     def write_exceedance_frequency_file(self, filename=None):
         """
+        Write theoretical and empirical wet day totals of 10, 25 and 100 year
+        events to a text summary, and as a table to a .csv file of the same
+        name. See ExceedanceAnalyzer.
+
+        Bootstrapped bounds on the empirical values are found if the
+        parameter exceedance_bootstrap_samples is greater than zero. The
+        resampling is seeded from the model's exceedance random stream.
         """
         if filename is None:
             filename = 'exceedance_summary.txt'
-        exceedance_file = open(filename, 'w')
-
-        # calculate the number of wet days per year.
-        number_of_days_per_year = 365
-        nwet = int(np.ceil(self.intermittency_factor * number_of_days_per_year))
-        #ndry = int(number_of_days_per_year - nwet)
-
-        # Write some basic information about the distribution to the file.
-        exceedance_file.write('Section 1: Distribution Description\n')
-        exceedance_file.write('Scale Factor: ' + str(self.scale_factor) + '\n')
-        exceedance_file.write('Shape Factor: ' + str(self.shape_factor) + '\n')
-        exceedance_file.write(('Intermittency Factor: ' +
-                               str(self.intermittency_factor) + '\n'))
-        exceedance_file.write(('Number of wet days per year: ' +
-                               str(nwet) + '\n\n'))
-        message_text = ('The scale factor that describes this distribution is ' +
-                        'calculated based on a provided value for the mean wet day rainfall.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        exceedance_file.write(('This provided value was:\n' +
-                               str(self.mean_storm__intensity) + '\n'))
-
-        # calculate the predictions for 10, 25, and 100 year event based on
-        # the analytical form of the exceedance function.
-        event_intervals = np.array([10., 25, 100.])
-
-        # calculate the probability of each event based on the number of years
-        # and the number of wet days per year.
-        daily_distribution_exceedance_probabilities = (1./(nwet * event_intervals))
-
-        # exceedance probability is given as
-        # Probability of daily rainfall of p exceeding a value of po is given as:
-        #
-        # P(p>po) = e^(-(po/P)^c)
-        # P = scale
-        # c = shape
-        #
-        # this can be re-arranged to
-        #
-        # po = P * (- ln (P(p>po))) ^ (1 / c)
-
-        expected_rainfall = self.scale_factor * (-1. * np.log(daily_distribution_exceedance_probabilities)) ** (1. / self.shape_factor)
-
-        exceedance_file.write('\n\nSection 2: Theoretical Predictions\n')
-
-        message_text = ('Based on the analytical form of the wet day rainfall ' +
-                        'distribution, we can calculate theoretical predictions ' +
-                        'of the daily rainfall amounts associated with N-year events.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        for i in range(len(daily_distribution_exceedance_probabilities)):
-            exceedance_file.write(('Expected value for the wet day total of the ' +
-                                   str(event_intervals[i]) +
-                                   ' year event is: ' +
-                                   str(np.round(expected_rainfall[i], decimals=3)) + '\n'))
-
-        # get rainfall record and filter out time without any rain
-        all_precipitation = np.array(self.rain_record['rainfall_rate'])
-        rainy_day_inds = np.where(all_precipitation>0)
-        if len(rainy_day_inds[0])>0:
-            wet_day_totals = all_precipitation[rainy_day_inds]
-        else:
-            raise ValueError('No rain fell, which makes calculating exceedance '
-                             'frequencies problematic. We recommend that you '
-                             'check the valude of intermittency_factor.')
-
-        # construct the distribution of yearly maxima.
-        # here an effective year is represented by the number of draws implied
-        # by the intermittency factor
-
-        # first calculate the number of effective years.
-        num_days = len(wet_day_totals)
-        num_effective_years = int(np.floor(wet_day_totals.size/nwet))
-
-
-        # write out the calculated event only if the duration
-        exceedance_file.write('\n\n')
-        message_text = ('Section 3: Predicted 95% confidence bounds on the ' +
-                        'exceedance values based on number of samples drawn.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        message_text = ('The ability to empirically estimate the rainfall ' +
-                        'associated with an N-year event depends on the ' +
-                        'probability of that event occurring and the number of ' +
-                        'draws from the probability distribution. The ability ' +
-                        'to estimate increases with an increasing number of samples ' +
-                        'and decreases with decreasing probability of event ' +
-                        'occurrence.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        message_text = ('Exceedance values calculated from ' + str(len(wet_day_totals)) +
-                        ' draws from the daily-rainfall probability distribution. '+
-                        'This corresponds to ' + str(num_effective_years) +
-                        ' effective years.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        # For a general probability distribution, f, with a continuous not zero
-        # quantile function at F-1(p), the order statistic associated with the
-        # p percentile given n draws from the distribution is given as:
-
-        # X[np] ~ AN ( F-1(p), (p * (p - 1 ))/ (n * [f (F-1 (p)) ]**2))
-
-        # where AN is the asymptotic normal. The value for the variance is more
-        # intuitive once you consider that [f (F-1 (p)) ] is the probability
-        # that an event of percentile p will occur. Thus the variance increases
-        # non-linearly with decreasing event probability and decreases linearly
-        # with increaseing observations.
-
-        # we've already calculated F-1(p) for our events, and it is represented
-        # by the variable expected_rainfall
-
-        daily_distribution_event_percentile = 1.0 - daily_distribution_exceedance_probabilities
-
-        event_probability = ((self.shape_factor/self.scale_factor) *
-                             ((expected_rainfall/self.scale_factor) ** (self.shape_factor - 1.0)) *
-                             (np.exp(-1. * (expected_rainfall/self.scale_factor) ** self.shape_factor)))
-
-        event_variance = ((daily_distribution_event_percentile * (1.0 - daily_distribution_event_percentile)) /
-                          (num_days * (event_probability ** 2)))
-
-        event_std = event_variance ** 0.5
-
-        t_statistic = stats.t.ppf(0.975, num_effective_years, loc=0, scale=1)
-
-        exceedance_file.write('\n')
-        message_text = ('For the given number of samples, the 95% ' +
-                        'confidence bounds for the following event ' +
-                        'return intervals are as follows: ')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-        for i in range(len(event_intervals)):
-
-            min_expected_val = expected_rainfall[i] - t_statistic * event_std[i]
-            max_expected_val = expected_rainfall[i] + t_statistic * event_std[i]
-
-            exceedance_file.write(('Expected range for the wet day total of the ' +
-                                   str(event_intervals[i]) +
-                                   ' year event is: (' +
-                                   str(np.round(min_expected_val, decimals=3)) + ', ' +
-                                   str(np.round(max_expected_val, decimals=3)) + ')\n'))
-        # next, calculate the emperical exceedance values, if a sufficient record
-        # exists.
-
-        # inititialize a container for the maximum yearly precipitation.
-        maximum_yearly_precipitation = np.nan * np.zeros((num_effective_years))
-        for yi in range(num_effective_years):
-
-            # identify the starting and ending index coorisponding to the
-            # year
-            starting_index = yi*nwet
-            ending_index = starting_index+nwet
-
-            # select the years portion of the wet_day_totals
-            selected_wet_day_totals = wet_day_totals[starting_index:ending_index]
-
-            # record the yearly maximum precipitation
-            maximum_yearly_precipitation[yi] = selected_wet_day_totals.max()
-
-
-        # calculate the distribution percentiles associated with each interval
-        event_percentiles = (1. - (1./event_intervals)) * 100.
-
-        # calculated the event magnitudes associated with the percentiles.
-        event_magnitudes = np.percentile(maximum_yearly_precipitation, event_percentiles)
-
-        # write out the calculated event only if the duration
-        exceedance_file.write('\n\nSection 4: Empirical Values\n')
-        message_text = ('These empirical values should be interpreted in the ' +
-                        'context of the expected ranges printed in Section 3. ' +
-                        'If the expected range is large, consider using a longer ' +
-                        'record of rainfall. The empirical values should fall ' +
-                        'within the expected range at a 95% confidence level.')
-        exceedance_file.write('\n'.join(textwrap.wrap(message_text, _STRING_LENGTH)))
-        exceedance_file.write('\n')
-
-        for i in range(len(event_percentiles)):
-
-            exceedance_file.write(('Estimated value for the wet day total of the ' +
-                                   str(np.round(event_intervals[i], decimals=3)) +
-                                   ' year event is: ' +
-                                   str(np.round(event_magnitudes[i], decimals=3)) + '\n'))
-
-        exceedance_file.close()
+
+        analyzer = ExceedanceAnalyzer(
+            self.scale_factor, self.shape_factor, self.intermittency_factor,
+            n_bootstrap=self.params.get('exceedance_bootstrap_samples', 0),
+            random_seed=self.make_integer_seed('exceedance'))
+        analyzer.write(filename, self.rain_record['rainfall_rate'],
+                       mean_storm__intensity=self.mean_storm__intensity,
+                       table_filename=self.params.get('exceedance_table_filename'))
 
 
 def main():
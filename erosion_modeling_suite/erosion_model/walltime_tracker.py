@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+walltime_tracker.py: keep track of how much of a job's walltime is left.
+"""
+
+import os
+import subprocess
+import time as tm
+
+WALLTIME_ENVIRONMENT_VARIABLE = 'EROSION_MODEL_WALLTIME'
+
+
+def parse_walltime(walltime):
+    """Return a walltime, given in minutes or as a Slurm time string, in
+    seconds.
+
+    Slurm time strings have the form days-hours:minutes:seconds, where the
+    leading parts are optional. A number (or a string that holds only a
+    number) is taken to be minutes. Returns None if the walltime is
+    unlimited or can't be read.
+
+    Examples
+    --------
+    >>> from erosion_model.walltime_tracker import parse_walltime
+    >>> parse_walltime('1-02:03:04')
+    93784.0
+    >>> parse_walltime('03:04')
+    184.0
+    >>> parse_walltime(90)
+    5400.0
+    >>> parse_walltime('UNLIMITED') is None
+    True
+    """
+    try:
+        return 60.0 * float(walltime)
+    except ValueError:
+        pass
+
+    text = walltime.strip()
+    if '-' in text:
+        (days, text) = text.split('-', 1)
+    else:
+        days = 0
+    parts = text.split(':')
+    try:
+        days = int(days)
+        seconds = 0.0
+        for part in parts:
+            seconds = (60.0 * seconds) + int(part)
+    except ValueError:
+        return None
+    return (days * 24. * 60. * 60.) + seconds
+
+
+def query_slurm_walltime():
+    """Return the walltime left in the current Slurm job, in seconds.
+
+    Returns None if not running in a Slurm job, or if squeue fails.
+    """
+    try:
+        job_id = os.environ['SLURM_JOB_ID']
+    except KeyError:
+        return None
+    try:
+        output, error = subprocess.Popen(['squeue',
+                                          '--job=' + job_id,
+                                          '--format=%.10L'],
+                                         stdout=subprocess.PIPE,
+                                         stderr=subprocess.PIPE).communicate()
+    except OSError:
+        return None
+    lines = output.decode().strip().split('\n')
+    return parse_walltime(lines[-1].strip().split(' ')[-1])
+
+
+class WalltimeTracker(object):
+    """
+    A WalltimeTracker finds out once how much walltime is left, and then
+    tracks the time used with a monotonic clock.
+
+    The walltime comes from, in order of preference, the walltime argument,
+    the EROSION_MODEL_WALLTIME environment variable, or a single squeue
+    query if running in a Slurm job. Either of the first two can be given
+    in minutes or as a Slurm time string (days-hours:minutes:seconds). If
+    none of these is available, the walltime is unlimited.
+
+    record_step keeps an exponentially weighted moving average (EWMA) of
+    the time between calls, which is the cost of one model time step.
+
+    Parameters
+    ----------
+    walltime : float or str, optional
+    step_cost_weight : float, optional
+        Weight of the newest step in the EWMA of step cost.
+    """
+
+    def __init__(self, walltime=None, step_cost_weight=0.1):
+        """Initialize the WalltimeTracker."""
+        start = tm.monotonic()
+
+        if walltime is None:
+            walltime = os.environ.get(WALLTIME_ENVIRONMENT_VARIABLE)
+        if walltime is None:
+            seconds_left = query_slurm_walltime()
+        else:
+            seconds_left = parse_walltime(walltime)
+
+        if seconds_left is None:
+            self.deadline = None
+        else:
+            self.deadline = start + seconds_left
+
+        self.step_cost_weight = step_cost_weight
+        self.step_cost = None
+        self._last_step = start
+
+    @property
+    def limited(self):
+        """True if the walltime is limited."""
+        return self.deadline is not None
+
+    def record_step(self):
+        """Record the end of a time step, and update the step cost."""
+        now = tm.monotonic()
+        cost = now - self._last_step
+        self._last_step = now
+        if self.step_cost is None:
+            self.step_cost = cost
+        else:
+            self.step_cost += self.step_cost_weight * (cost - self.step_cost)
+
+    def seconds_left(self):
+        """Return the walltime left, in seconds (inf if unlimited)."""
+        if self.deadline is None:
+            return float('inf')
+        return self.deadline - tm.monotonic()
+
+    def out_of_time(self, threshold=0., include_step_cost=False):
+        """Return True if less than threshold seconds are left.
+
+        If include_step_cost is True, the expected cost of the next time
+        step is added to threshold.
+        """
+        if self.deadline is None:
+            return False
+        if include_step_cost and self.step_cost is not None:
+            threshold += self.step_cost
+        return self.seconds_left() < threshold
@@ -2,3 +2,6 @@ from .metric_calculator import MetricCalculator
 from .metric_difference import MetricDifference
 from .grouped_differences  import GroupedDifferences
 from .ncextractor import NCExtractor
+from .modern_reference import ModernReference, load_modern_reference
+from .gradient_statistics import GradientStatistics
+from .sorted_values import SortedValues
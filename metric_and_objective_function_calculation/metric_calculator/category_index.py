@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+category_index.py: node categories and weights compiled once for grouped
+RMS residuals.
+"""
+
+import numpy as np
+
+
+class CategoryIndex(object):
+    """
+    A CategoryIndex calculates, for each category, the weighted RMS
+    residual between two topographies,
+
+        r_c = sqrt( sum over nodes i in c of ((z_i - zm_i) / w_i)^2 / n_c ),
+
+    where the categories are the distinct category values at core nodes,
+    n_c is the number of nodes (core or not) with category value c, and w
+    is the weight.
+
+    The category of each node is stored once as an integer label (nodes in
+    none of the categories get an extra label whose sums are dropped), with
+    the node counts of each category and 1 / w^2. The residuals of all
+    categories then come from one np.bincount. Many modeled topographies,
+    stacked as an (n_runs, n_nodes) array, are scored with one np.bincount
+    as well.
+
+    Parameters
+    ----------
+    category_values : array of float
+    weight_values : array of float
+    core_nodes : array of int
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from metric_calculator.category_index import CategoryIndex
+    >>> ci = CategoryIndex([1., 1., 2., 2.], np.ones(4), [0, 1, 2, 3])
+    >>> ci.rms_residuals(np.zeros(4), np.array([1., 1., 2., 0.]))
+    array([1.        , 1.41421356])
+    >>> ci.rms_residuals(np.zeros(4), np.array([[1., 1., 2., 0.],
+    ...                                         [0., 0., 0., 0.]]))
+    array([[1.        , 1.41421356],
+           [0.        , 0.        ]])
+    """
+
+    def __init__(self, category_values, weight_values, core_nodes):
+        """Initialize the CategoryIndex."""
+        category_values = np.asarray(category_values)
+        weight_values = np.asarray(weight_values, dtype=float)
+        if weight_values.shape != category_values.shape:
+            raise ValueError('There must be one weight per category value.')
+
+        self.cat_vals = np.sort(np.unique(category_values[core_nodes]))
+        self.n_categories = len(self.cat_vals)
+        self.n_nodes = category_values.size
+
+        # label each node with the index of its category, or n_categories
+        # if it is in none of them.
+        labels = np.searchsorted(self.cat_vals, category_values)
+        labels[labels == self.n_categories] = 0
+        outside = self.cat_vals[labels] != category_values
+        labels[outside] = self.n_categories
+        self.labels = labels
+
+        self.counts = np.bincount(labels,
+                                  minlength=self.n_categories + 1)[:-1]
+        self.inverse_square_weights = 1.0 / np.square(weight_values)
+
+    @property
+    def keys(self):
+        """Metric names of the categories, in order."""
+        return [str(cv) for cv in self.cat_vals]
+
+    def rms_residuals(self, z, modeled_z):
+        """Return the RMS residual of each category.
+
+        modeled_z may be one topography (n_nodes, ), giving an array of
+        n_categories residuals, or a stack (n_runs, n_nodes), giving an
+        (n_runs, n_categories) array.
+        """
+        modeled_z = np.asarray(modeled_z)
+        n_bins = self.n_categories + 1
+        squares = np.subtract(z, modeled_z)
+        np.square(squares, out=squares)
+        squares *= self.inverse_square_weights
+
+        if squares.ndim == 1:
+            sums = np.bincount(self.labels, weights=squares,
+                               minlength=n_bins)[:-1]
+        else:
+            n_runs = squares.shape[0]
+            offsets = np.arange(n_runs)[:, np.newaxis] * n_bins
+            sums = np.bincount((self.labels + offsets).ravel(),
+                               weights=squares.ravel(),
+                               minlength=n_runs * n_bins)
+            sums = sums.reshape((n_runs, n_bins))[:, :-1]
+        return np.sqrt(sums / self.counts)
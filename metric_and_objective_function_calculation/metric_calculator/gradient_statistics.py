@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+gradient_statistics.py: mean and variance of topographic gradient on a
+raster grid, for several node masks at once.
+"""
+
+import numpy as np
+from landlab import CLOSED_BOUNDARY, CORE_NODE
+
+
+def find_interior_nodes(grid):
+    """Return a boolean (nrows, ncols) array that is True at the nodes of a
+    raster grid that have four active links.
+
+    A link is active if neither of its nodes is closed and at least one is
+    a core node.
+    """
+    status = grid.status_at_node.reshape(grid.shape)
+    core = status == CORE_NODE
+    open_ = status != CLOSED_BOUNDARY
+
+    interior = np.zeros(grid.shape, dtype=bool)
+    center = (slice(1, -1), slice(1, -1))
+    interior[center] = open_[center]
+    for neighbor in ((slice(1, -1), slice(2, None)),
+                     (slice(2, None), slice(1, -1)),
+                     (slice(1, -1), slice(None, -2)),
+                     (slice(None, -2), slice(1, -1))):
+        interior[center] &= open_[neighbor] & (core[center] | core[neighbor])
+    return interior
+
+
+class GradientStatistics(object):
+    """
+    GradientStatistics calculates the mean and variance of slope magnitude,
+
+        S = sqrt( ((z_E - z_W) / 2 dx)^2 + ((z_N - z_S) / 2 dy)^2 ),
+
+    over the nodes of a raster grid that have four active links, and over
+    each of those nodes that are also in a mask. This is the mean of the
+    gradients on the two links in each direction, without calculating
+    gradients at links.
+
+    The nodes and masks are found once, as weights on the interior of the
+    raster. Slope is calculated from row and column differences of the
+    elevation array, a block of rows at a time, and the count, mean and sum
+    of squared deviations of each mask are updated from each block with
+    Welford's (parallel) update, so slope is never stored for the whole
+    grid. A stack of elevations, (n_runs, n_nodes), is done in the same
+    pass.
+
+    Parameters
+    ----------
+    grid : RasterModelGrid
+    masks : list of arrays of bool, optional
+        Node masks; statistics of mask i are in column i + 1 of the results.
+    rows_per_block : int, optional
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from landlab import RasterModelGrid
+    >>> from metric_calculator.gradient_statistics import GradientStatistics
+    >>> grid = RasterModelGrid((4, 5))
+    >>> z = grid.x_of_node + 2. * grid.y_of_node
+    >>> mask = grid.x_of_node < 2.
+    >>> gs = GradientStatistics(grid, masks=[mask])
+    >>> gs.counts
+    array([6, 2])
+    >>> (mean, var) = gs.mean_and_var(z)
+    >>> np.round(mean, 6)
+    array([2.236068, 2.236068])
+    >>> np.round(var, 6)
+    array([0., 0.])
+    """
+
+    def __init__(self, grid, masks=(), rows_per_block=256):
+        """Initialize the GradientStatistics."""
+        self.shape = grid.shape
+        self.dx = grid.dx
+        self.dy = grid.dy
+        self.rows_per_block = rows_per_block
+
+        interior = find_interior_nodes(grid)
+        self.interior_nodes = np.flatnonzero(interior)
+
+        # One weight (0 or 1) per mask at each node of the raster interior
+        self._weights = np.empty((1 + len(masks), self.shape[0] - 2,
+                                  self.shape[1] - 2))
+        self._weights[0] = interior[1:-1, 1:-1]
+        for (i, mask) in enumerate(masks):
+            mask = np.asarray(mask, dtype=bool).reshape(self.shape)
+            self._weights[i + 1] = interior[1:-1, 1:-1] & mask[1:-1, 1:-1]
+        self.counts = self._weights.sum(axis=(1, 2)).astype(int)
+
+    def slope(self, z, rows):
+        """Return slope magnitude at the interior nodes in the given slice
+        of rows of the raster interior, for elevation z."""
+        z = z.reshape(z.shape[:-1] + self.shape)
+        start = rows.start + 1
+        stop = rows.stop + 1
+        grad_x = z[..., start:stop, 2:] - z[..., start:stop, :-2]
+        grad_x /= 2.0 * self.dx
+        grad_y = (z[..., start + 1:stop + 1, 1:-1]
+                  - z[..., start - 1:stop - 1, 1:-1])
+        grad_y /= 2.0 * self.dy
+        return np.hypot(grad_x, grad_y, out=grad_x)
+
+    def mean_and_var(self, z):
+        """Return the mean and variance of slope for each mask.
+
+        z is one elevation array, giving arrays of n_masks + 1 means and
+        variances, or a stack (n_runs, n_nodes), giving (n_runs,
+        n_masks + 1) arrays. Column 0 is all nodes with four active links.
+        A mask with no nodes has mean and variance nan.
+        """
+        z = np.asarray(z, dtype=float)
+        batch_shape = z.shape[:-1]
+        n_masks = self._weights.shape[0]
+        count = np.zeros(n_masks)
+        mean = np.zeros(batch_shape + (n_masks, ))
+        m2 = np.zeros(batch_shape + (n_masks, ))
+
+        n_interior_rows = self.shape[0] - 2
+        for start in range(0, n_interior_rows, self.rows_per_block):
+            rows = slice(start, min(start + self.rows_per_block,
+                                    n_interior_rows))
+            weights = self._weights[:, rows].reshape((n_masks, -1))
+            block_count = weights.sum(axis=1)
+            if not np.any(block_count):
+                continue
+            s = self.slope(z, rows)
+            s = s.reshape(batch_shape + (1, -1))
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                block_mean = np.sum(s * weights, axis=-1) / block_count
+            block_mean[..., block_count == 0] = 0.0
+            block_m2 = np.sum(np.square(s - block_mean[..., np.newaxis])
+                              * weights, axis=-1)
+
+            # Welford's update of the running statistics with the block's
+            total = count + block_count
+            delta = block_mean - mean
+            with np.errstate(invalid='ignore', divide='ignore'):
+                fraction = np.where(total > 0, block_count / total, 0.0)
+            mean += delta * fraction
+            m2 += block_m2 + np.square(delta) * count * fraction
+            count = total
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = m2 / count
+        mean[..., count == 0] = np.nan
+        return (mean, var)
@@ -17,12 +17,27 @@ Created on Fri Jul 15 08:23:33 2016
 """
 import os
 import numpy as np
-from landlab.io import read_esri_ascii
-from landlab.io.netcdf import read_netcdf
+
+from .category_index import CategoryIndex
+from .reference_cache import (cached, load_watershed_topography,
+                              load_node_values, read_topography)
 
 class GroupedDifferences(object):
     """Calculator for topographic metrics used in sensitivity analysis and
-    model evaluation."""
+    model evaluation.
+
+    The modern DEM and category and weight files are read once per process
+    (see reference_cache). The modeled topography is read from
+    modeled_dem_name or, to score a model that is still in memory, taken
+    from modeled_elevation, a grid or an array of node elevations. In that
+    case no model output file is read.
+
+    Categories and weights are compiled once into a CategoryIndex, which is
+    reused by every GroupedDifferences with the same modern DEM, outlet and
+    category and weight files. calculate_metrics_batch scores a stack of
+    modeled DEMs at once; for that use, modeled_dem_name and
+    modeled_elevation may both be None.
+    """
     
     def __init__(self, 
                  modeled_dem_name, 
@@ -31,80 +46,120 @@ class GroupedDifferences(object):
                  category_file=None, 
                  category_values=None, 
                  weight_file=None,
-                 weight_values=None):
+                 weight_values=None,
+                 modeled_elevation=None):
         """Initialize GroupedDifferences with names of postglacial and modern
         DEMs."""
 
         # save dem names
         self.modern_dem_name = modern_dem_name
+        read_modeled_dem = (modeled_dem_name is not None
+                            and modeled_elevation is None)
+        if modeled_dem_name is None:
+            modeled_dem_name = 'in-memory model topography'
         self.modeled_dem_name = modeled_dem_name
         
-        # Read and remember the modern DEM
-        (self.grid, self.z) = self.read_topography(modern_dem_name)
-        self.grid.set_watershed_boundary_condition_outlet_id(outlet_id,
-                                                             self.z, 
-                                                             nodata_value=-9999)
-        # Read and remember the modeled DEM 
-        (self.mgrid, self.mz) = self.read_topography(modeled_dem_name)
-        self.mgrid.set_watershed_boundary_condition_outlet_id(outlet_id,
-                                                              self.mz, 
-                                                              nodata_value=-9999)
-        if self.mz.size != self.z.size:
+        # Get the modern DEM (read once per process)
+        (self.grid, self.z) = load_watershed_topography(modern_dem_name,
+                                                        outlet_id)
+
+        # Read and remember the modeled DEM, unless it was given
+        if read_modeled_dem:
+            (self.mgrid, self.mz) = read_topography(modeled_dem_name)
+            self.mgrid.set_watershed_boundary_condition_outlet_id(outlet_id,
+                                                                  self.mz,
+                                                                  nodata_value=-9999)
+        elif modeled_elevation is None:
+            self.mgrid = None
+            self.mz = None
+        elif hasattr(modeled_elevation, 'at_node'):
+            self.mgrid = modeled_elevation
+            self.mz = modeled_elevation.at_node['topographic__elevation']
+        else:
+            self.mgrid = None
+            self.mz = np.asarray(modeled_elevation)
+        if self.mz is not None and self.mz.size != self.z.size:
             raise ValueError(('Size of provided DEMS is different.'))
                     
-        if category_file and category_values:
+        if category_file is not None and category_values is not None:
             raise ValueError(('Provide either an array-like structure of catetory ',
                              'values or a filename, not both.'))
-        if weight_file and weight_values:
+        if weight_file is not None and weight_values is not None:
             raise ValueError(('Provide either an array-like structure of weight ',
                              'values or a filename, not both.'))
-        if category_file:
-            if os.path.exists(category_file):
-                catagory_values = np.loadtxt(category_file)
-                if catagory_values.size != self.z.size:
-                    raise ValueError(('Size of catagory array is different than the ',
-                                      'provided DEM.'))
-        if weight_file:
-            if os.path.exists(weight_file):
-                weight_values = np.loadtxt(weight_file)
-                if weight_values.size != self.z.size:
-                    raise ValueError(('Size of weight array is different than the ',
-                                      'provided DEM.'))
-        try:
-            np.asarray(weight_values).size == self.z.size 
-        except TypeError:
+        # The compiled categories can be shared only if no values were
+        # given as arrays.
+        shareable = category_values is None and weight_values is None
+        if category_file is not None:
+            if not os.path.exists(category_file):
+                raise IOError('Category file ' + category_file +
+                              ' does not exist.')
+            category_values = load_node_values(category_file)
+            if category_values.size != self.z.size:
+                raise ValueError(('Size of catagory array is different than the ',
+                                  'provided DEM.'))
+        if category_values is None:
+            raise ValueError('Provide either category values or a category '
+                             'file.')
+        if weight_file is not None:
+            if not os.path.exists(weight_file):
+                raise IOError('Weight file ' + weight_file +
+                              ' does not exist.')
+            weight_values = load_node_values(weight_file)
+            if weight_values.size != self.z.size:
+                raise ValueError(('Size of weight array is different than the ',
+                                  'provided DEM.'))
+        if weight_values is None:
             weight_values = np.ones_like(self.z)
                
-        self.category_values = category_values
-        self.weight_values = weight_values
-        self.cat_vals = np.sort(np.unique(self.category_values[self.grid.core_nodes]))
+        self.category_values = np.asarray(category_values)
+        self.weight_values = np.asarray(weight_values)
+
+        # Compile the categories, once per set of files if they were given
+        def make_index():
+            return CategoryIndex(self.category_values, self.weight_values,
+                                 self.grid.core_nodes)
+        if shareable and category_file is not None:
+            self.category_index = cached(('category_index', modern_dem_name,
+                                          outlet_id, category_file,
+                                          weight_file), make_index)
+        else:
+            self.category_index = make_index()
+        self.cat_vals = self.category_index.cat_vals
         self.metric = {}
         
     def read_topography(self, topo_file_name):
         """Read and return topography from file, as a Landlab grid and field.
         
         Along the way, process the topography to identify the watershed."""
-        try:
-            (grid, z) = read_esri_ascii(topo_file_name,
-                                        name='topographic__elevation',
-                                        halo=1)
-        except:
-            grid = read_netcdf(topo_file_name)
-            z = grid.at_node['topographic__elevation']
-        
-        return (grid, z)
+        return read_topography(topo_file_name)
     
     def calculate_metrics(self):
         """Calculate and store each metric."""
         
-        for cv in self.cat_vals:
-            cat_inds = np.where(self.category_values == cv)[0]
-            weighted_difference = (self.z[cat_inds]-self.mz[cat_inds])/self.weight_values[cat_inds]
-            resid = np.sqrt(np.sum(np.square(weighted_difference))/(cat_inds.size))
-            self.metric[str(cv)] = resid
+        if self.mz is None:
+            raise ValueError('No modeled topography was given.')
+
+        resids = self.category_index.rms_residuals(self.z, self.mz)
+        for (key, resid) in zip(self.category_index.keys, resids):
+            self.metric[key] = resid
         
         return self.metric
 
+    def calculate_metrics_batch(self, modeled_elevations):
+        """Calculate the metrics of a stack of modeled DEMs.
+
+        modeled_elevations is an (n_runs, n_nodes) array. Returns an
+        (n_runs, n_categories) array, whose columns are in the order of
+        self.cat_vals (the metric names are self.category_index.keys).
+        """
+        modeled_elevations = np.asarray(modeled_elevations)
+        if modeled_elevations.ndim != 2 or \
+                modeled_elevations.shape[1] != self.z.size:
+            raise ValueError('modeled_elevations must have shape '
+                             '(n_runs, number of nodes).')
+        return self.category_index.rms_residuals(self.z, modeled_elevations)
+
     def save_metrics(self, filename='grouped_differences.txt'):
         """Write metrics to file."""
         outfile = open(filename, 'w')
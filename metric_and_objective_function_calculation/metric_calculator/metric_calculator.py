@@ -9,36 +9,95 @@ Created on Fri Jul 15 08:23:33 2016
 """
 
 import numpy as np
-from landlab.io import read_esri_ascii
-from landlab.io.netcdf import read_netcdf
 from landlab.components import (ChiFinder, FlowRouter,
                                 DepressionFinderAndRouter)
 from yaml import load
 
+from .gradient_statistics import GradientStatistics
+from .reference_cache import load_topography, read_topography
+from .sorted_values import SortedValues
+
+def chi_file_name(metric_file_name):
+    """Return the name of the chi distribution file that goes with a metric
+    file, e.g. metrics.chi.txt for metrics.txt."""
+    fn_split = metric_file_name.split('.')
+    fn_split[-1] = 'chi'
+    fn_split.append('txt')
+    return '.'.join(fn_split)
+
 class MetricCalculator(object):
     """Calculator for topographic metrics used in sensitivity analysis and
-    model evaluation."""
+    model evaluation.
+
+    The topography is read from modern_dem_name or, to score a model that
+    is still in memory, given as grid. With route_flow False, the
+    drainage_area and flow routing fields already on grid (e.g. from the
+    model's own flow router) are used instead of routing flow again. The
+    chi mask DEM is read once per process (see reference_cache).
+
+    The distribution metrics are declared below as (name, value) pairs.
+    Drainage area and elevation at core nodes are each sorted once, and
+    every count and percentile is read from the sorted values (see
+    SortedValues), so adding a metric to a list adds no pass over the grid.
+    """
+
+    # Number of core nodes with drainage area at most factor x cell area
+    source_node_metrics = [('one_cell_nodes', 1.0),
+                           ('two_cell_nodes', 2.0),
+                           ('three_cell_nodes', 3.0),
+                           ('four_cell_nodes', 4.0)]
+
+    # Percentiles of drainage area at core nodes, for the uppermost portion
+    # of the distribution
+    area_percentile_metrics = [('cumarea95', 95),
+                               ('cumarea96', 96),
+                               ('cumarea97', 97),
+                               ('cumarea98', 98),
+                               ('cumarea99', 99)]
+
+    # Percentiles of elevation at core nodes, chosen to characterize the
+    # shape of the modern distribution
+    elevation_percentile_metrics = [('elev02', 2),
+                                    ('elev08', 8),
+                                    ('elev23', 23),
+                                    ('elev30', 30),
+                                    ('elev36', 36),
+                                    ('elev50', 50),
+                                    ('elev75', 75),
+                                    ('elev85', 85),
+                                    ('elev90', 90),
+                                    ('elev96', 96),
+                                    ('elev100', 100)]
     
-    def __init__(self, modern_dem_name, outlet_id, chi_mask_dem_name=None, from_file=None):
+    def __init__(self, modern_dem_name, outlet_id, chi_mask_dem_name=None,
+                 from_file=None, grid=None, route_flow=True):
         """Initialize MetricCalculator with names of postglacial and modern
         DEMs."""
 
 
         if from_file is None:
 
-            # Read and remember the modern DEM (whether data or model)
-            (self.grid, self.z) = self.read_topography(modern_dem_name)
-            #print self.grid.x_of_node
+            if grid is None:
+                # Read and remember the modern DEM (whether data or model)
+                (self.grid, self.z) = self.read_topography(modern_dem_name)
+                #print self.grid.x_of_node
     
-            self.grid.set_watershed_boundary_condition_outlet_id(outlet_id,
-                                                                 self.z, nodata_value=-9999)
+                self.grid.set_watershed_boundary_condition_outlet_id(outlet_id,
+                                                                     self.z, nodata_value=-9999)
+            else:
+                self.grid = grid
+                self.z = grid.at_node['topographic__elevation']
     
             # Instantiate and run a FlowRouter and lake filler, so we get
             # drainage area for cumulative-area statistic, and also fields for chi.
-            fr = FlowRouter(self.grid)
-            dfr = DepressionFinderAndRouter(self.grid)
-            fr.route_flow()
-            dfr.map_depressions()
+            if route_flow:
+                fr = FlowRouter(self.grid)
+                dfr = DepressionFinderAndRouter(self.grid)
+                fr.route_flow()
+                dfr.map_depressions()
+            elif 'drainage_area' not in self.grid.at_node:
+                raise ValueError('route_flow is False, but the grid has no '
+                                 'drainage_area field.')
     
             # Remember modern drainage area grid
             self.area = self.grid.at_node['drainage_area']
@@ -55,14 +114,18 @@ class MetricCalculator(object):
                  self.till_mask = np.zeros(self.mask.shape, dtype=bool) 
                  self.till_mask[self.grid.core_nodes] = 1
             else:
-                (self.mask_grid, zmask) = self.read_topography(chi_mask_dem_name)
+                (self.mask_grid, zmask) = load_topography(chi_mask_dem_name)
                 mask = (zmask>0)*1
                 self.mask = (self.area>1e5)*(mask==1)
                 
                 mask_bool = (zmask>0)
                 self.till_mask = np.zeros(self.mask.shape, dtype=bool) 
                 self.till_mask[mask_bool*core_nodes] = 1
-            # 
+            
+            # Find the nodes for gradient statistics, everywhere and in
+            # the chi area, once
+            self.gradient_statistics = GradientStatistics(self.grid,
+                                                          masks=[self.till_mask])
             
             # Create dictionary to contain metrics
             self.metric = {}
@@ -74,25 +137,13 @@ class MetricCalculator(object):
 
                 self.metric = metrics
     
-            fn_split = from_file.split('.')
-            fn_split[-1] = 'chi'
-            fn_split.append('txt')
-            chi_filename = '.'.join(fn_split)
-            self.density_chi = np.loadtxt(chi_filename)
+            self.density_chi = np.loadtxt(chi_file_name(from_file))
 
     def read_topography(self, topo_file_name):
         """Read and return topography from file, as a Landlab grid and field.
         
         Along the way, process the topography to identify the watershed."""
-        try:
-            (grid, z) = read_esri_ascii(topo_file_name,
-                                        name='topographic__elevation',
-                                        halo=1)
-        except:
-            grid = read_netcdf(topo_file_name)
-            z = grid.at_node['topographic__elevation']
-        
-        return (grid, z)
+        return read_topography(topo_file_name)
 
     def calc_hyps_integral(self):
         """Calculate and return hypsometric integral of modern topo."""
@@ -107,60 +158,27 @@ class MetricCalculator(object):
         # Calc and return hyps int
         return np.mean(wshed_elevs - min_elev) / (max_elev - min_elev)
 
+    def calc_mean_and_var_gradients(self):
+        """Calculate and return the mean and variance of gradients, and the
+        mean and variance of gradients in chi area, in one pass.
+
+        Gradients are taken at nodes that have four active links (see
+        GradientStatistics).
+        """
+        (means, variances) = self.gradient_statistics.mean_and_var(self.z)
+        return (means[0], variances[0], means[1], variances[1])
+
     def calc_mean_and_var_gradient(self):
         """Calculate and return the mean and variance of gradients.
         """
-        # Calculate the gradient at links
-        grad = self.grid.calc_grad_at_link(self.z)
-        
-        # Find IDs of nodes that have four active links
-        active_links_at_node = (self.grid.links_at_node * 
-                                np.abs(self.grid.active_link_dirs_at_node))
-        nodes = np.where(np.amin(active_links_at_node, axis=1) > 0)
-        
-        # Get the x and y components of slope at each of these.
-        # We're assuming we're dealing with raster grids, in which columns
-        # 0 and 2 of the links_at_node array contain east-west links, and
-        # columns 1 and 3 contain north-south links. We take the average in
-        # each direction.
-        grad_x = 0.5 * (grad[self.grid.links_at_node[nodes, 0]] +
-                        grad[self.grid.links_at_node[nodes, 2]])
-        grad_y = 0.5 * (grad[self.grid.links_at_node[nodes, 1]] +
-                        grad[self.grid.links_at_node[nodes, 3]])
-        
-        # Combine them to get the slope magnitude
-        slope = np.sqrt(grad_x**2 + grad_y**2)
-        
-        # Return the mean and variance
-        return np.mean(slope), np.var(slope)
+        (means, variances) = self.gradient_statistics.mean_and_var(self.z)
+        return means[0], variances[0]
         
     def calc_mean_and_var_gradient_chi_area(self):
         """Calculate and return the mean and variance of gradients in chi area.
         """
-        # Calculate the gradient at links
-        grad = self.grid.calc_grad_at_link(self.z)
-        
-        # Find IDs of nodes that have four active links
-        active_links_at_node = (self.grid.links_at_node * 
-                                np.abs(self.grid.active_link_dirs_at_node))
-        
-        nodes = np.where((np.amin(active_links_at_node, axis=1) > 0) & self.till_mask)
-        
-        # Get the x and y components of slope at each of these.
-        # We're assuming we're dealing with raster grids, in which columns
-        # 0 and 2 of the links_at_node array contain east-west links, and
-        # columns 1 and 3 contain north-south links. We take the average in
-        # each direction.
-        grad_x = 0.5 * (grad[self.grid.links_at_node[nodes, 0]] +
-                        grad[self.grid.links_at_node[nodes, 2]])
-        grad_y = 0.5 * (grad[self.grid.links_at_node[nodes, 1]] +
-                        grad[self.grid.links_at_node[nodes, 3]])
-        
-        # Combine them to get the slope magnitude
-        slope = np.sqrt(grad_x**2 + grad_y**2)
-        
-        # Return the mean and variance
-        return np.mean(slope), np.var(slope)
+        (means, variances) = self.gradient_statistics.mean_and_var(self.z)
+        return means[1], variances[1]
         
     def calc_chi_index(self):
         """Calculate and return coefficients of chi plot."""
@@ -196,51 +214,46 @@ class MetricCalculator(object):
     def calculate_metrics(self):
         """Calculate and store each metric."""
         
+        # Take drainage area and elevation at core nodes once, and sort them
+        # once for all of the distribution metrics
+        core_z = self.z[self.grid.core_nodes]
+        sorted_area = SortedValues(self.area[self.grid.core_nodes])
+        sorted_z = SortedValues(core_z)
+
         # characterize the lowest portions of the area distribution
-        self.metric['one_cell_nodes'] = self.calc_number_source_nodes(factor=1.0)
-        self.metric['two_cell_nodes'] = self.calc_number_source_nodes(factor=2.0)
-        self.metric['three_cell_nodes'] = self.calc_number_source_nodes(factor=3.0)
-        self.metric['four_cell_nodes'] = self.calc_number_source_nodes(factor=4.0)
+        cell_area = self.grid.dx**2.0
+        (names, factors) = zip(*self.source_node_metrics)
+        counts = sorted_area.count_at_most(cell_area * np.array(factors))
+        self.metric.update(zip(names, counts))
     
         # uppermost portion of the distribution
-        self.metric['cumarea95'] = np.percentile(self.area[self.grid.core_nodes], 95)
-        self.metric['cumarea96'] = np.percentile(self.area[self.grid.core_nodes], 96)
-        self.metric['cumarea97'] = np.percentile(self.area[self.grid.core_nodes], 97)
-        self.metric['cumarea98'] = np.percentile(self.area[self.grid.core_nodes], 98)
-        self.metric['cumarea99'] = np.percentile(self.area[self.grid.core_nodes], 99)
+        (names, q) = zip(*self.area_percentile_metrics)
+        self.metric.update(zip(names, sorted_area.percentiles(q)))
         
         # hypsometric integral
-        self.metric['hypsometric_integral'] = self.calc_hyps_integral()
+        self.metric['hypsometric_integral'] = \
+            (np.mean(core_z - sorted_z.minimum)
+             / (sorted_z.maximum - sorted_z.minimum))
         
         # mean and variance of elevation 
-        self.metric['mean_elevation'] = np.mean(self.z[self.grid.core_nodes])
-        self.metric['var_elevation'] = np.var(self.z[self.grid.core_nodes])
+        self.metric['mean_elevation'] = np.mean(core_z)
+        self.metric['var_elevation'] = np.var(core_z)
         
         self.metric['mean_elevation_chi_area'] = np.mean(self.z[self.till_mask])
         self.metric['var_elevation_chi_area'] = np.var(self.z[self.till_mask])
         
         # mean and variance of slope
-        (mean_slope, var_slope) = self.calc_mean_and_var_gradient()
+        (mean_slope, var_slope,
+         mean_slope_chi, var_slope_chi) = self.calc_mean_and_var_gradients()
         self.metric['mean_gradient'] = mean_slope
         self.metric['var_gradient'] = var_slope
         
-        (mean_slope_chi, var_slope_chi) = self.calc_mean_and_var_gradient_chi_area()
         self.metric['mean_gradient_chi_area'] = mean_slope_chi
         self.metric['var_gradient_chi_area'] = var_slope_chi
         
-        # distribution of elevations,
-        # these percentiles chosen to characterize the shape of the modern distribution
-        self.metric['elev02'] = np.percentile(self.z[self.grid.core_nodes], 2)
-        self.metric['elev08'] = np.percentile(self.z[self.grid.core_nodes], 8)
-        self.metric['elev23'] = np.percentile(self.z[self.grid.core_nodes], 23)
-        self.metric['elev30'] = np.percentile(self.z[self.grid.core_nodes], 30)
-        self.metric['elev36'] = np.percentile(self.z[self.grid.core_nodes], 36)
-        self.metric['elev50'] = np.percentile(self.z[self.grid.core_nodes], 50)
-        self.metric['elev75'] = np.percentile(self.z[self.grid.core_nodes], 75)
-        self.metric['elev85'] = np.percentile(self.z[self.grid.core_nodes], 85)
-        self.metric['elev90'] = np.percentile(self.z[self.grid.core_nodes], 90)
-        self.metric['elev96'] = np.percentile(self.z[self.grid.core_nodes], 96)
-        self.metric['elev100'] = np.percentile(self.z[self.grid.core_nodes], 100)
+        # distribution of elevations
+        (names, q) = zip(*self.elevation_percentile_metrics)
+        self.metric.update(zip(names, sorted_z.percentiles(q)))
         
         # Chi-related metrics
         (chi_grad, chi_intercept) = self.calc_chi_index()
@@ -262,15 +275,7 @@ class MetricCalculator(object):
             outfile.write(m + ': ' + str(self.metric[m])  + '\n')
         outfile.close()
         
-        if (filename=='metrics.txt'):
-            chi_filename = 'metrics.chi.txt'
-        else:
-            fn_split = filename.split('.')
-            fn_split[-1] = 'chi'
-            fn_split.append('txt')
-            chi_filename = '.'.join(fn_split)
-    
-        np.savetxt(chi_filename, self.density_chi,fmt='%f')
+        np.savetxt(chi_file_name(filename), self.density_chi,fmt='%f')
 
 
 def main():
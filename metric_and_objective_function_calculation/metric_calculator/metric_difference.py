@@ -8,12 +8,20 @@ Created on Mon Mar  6 09:49:36 2017
 @author: katybarnhart
 """
 from metric_calculator import MetricCalculator
+from .modern_reference import load_modern_reference
 import numpy as np
-from yaml import load
 
 class MetricDifference(object):
     """Calculator for difference between model and observation topographic 
-    metrics used in sensitivity analysis and model evaluation."""
+    metrics used in sensitivity analysis and model evaluation.
+
+    The modern (observed) metrics are calculated, or read from
+    modern_dem_metric_file, once and stored in reference_cache_dir (see
+    modern_reference). Every later MetricDifference, in this or any other
+    process, memory-maps the stored metrics instead. To score a model that
+    is still in memory, give its grid as model_grid; its drainage area is
+    reused (see MetricCalculator) and no model output file is read.
+    """
     
     def __init__(self, 
                  model_dem_name,
@@ -22,11 +30,15 @@ class MetricDifference(object):
                  modern_dem_metric_file=None,
                  modern_dem_chi_file=None,
                  chi_mask_dem_name=None,
-                 output_file_name = 'metric_diff.txt'):
+                 output_file_name = 'metric_diff.txt',
+                 model_grid=None,
+                 reference_cache_dir=None):
         """Initialize metric difference calculator."""
         if outlet_id is None:
             assert ValueError ('You must provide an outlet ID')
         self.modern_dem = modern_dem_name
+        if model_dem_name is None:
+            model_dem_name = 'in-memory model topography'
         self.model = model_dem_name
         self.modern_metric = modern_dem_metric_file
         self.output_file_name = output_file_name
@@ -37,30 +49,31 @@ class MetricDifference(object):
                               ' was initialized with neither')
         
         
-        self.mc = MetricCalculator(model_dem_name,
-                                   outlet_id,
-                                   chi_mask_dem_name=chi_mask_dem_name)
+        if model_grid is None:
+            self.mc = MetricCalculator(model_dem_name,
+                                       outlet_id,
+                                       chi_mask_dem_name=chi_mask_dem_name)
+        else:
+            self.mc = MetricCalculator(None,
+                                       outlet_id,
+                                       chi_mask_dem_name=chi_mask_dem_name,
+                                       grid=model_grid,
+                                       route_flow=False)
         self.mc.calculate_metrics()
 
 
         
         if self.modern_dem is not None:
-            self.mc0 = MetricCalculator(modern_dem_name,
-                                        outlet_id,
-                                        chi_mask_dem_name=chi_mask_dem_name)
-            self.mc0.calculate_metrics()
+            self.mc0 = load_modern_reference(modern_dem_name, outlet_id,
+                                             chi_mask_dem_name=chi_mask_dem_name,
+                                             cache_dir=reference_cache_dir)
         
         else:
             
-            self.mc0 = MetricCalculator(modern_dem_name,
-                                        outlet_id,
-                                        chi_mask_dem_name=chi_mask_dem_name,
-                                        from_file=self.modern_metric)
+            self.mc0 = load_modern_reference(metric_file=self.modern_metric,
+                                             cache_dir=reference_cache_dir)
             
-            with open(self.modern_metric, 'r') as f:
-                metrics = load(f)
-                
-            self.modern_dem = metrics.pop('Topo file')
+            self.modern_dem = self.mc0.modern_dem_name
 
     def calc_metric_diffs(self):
         """Calculate metric value differences"""
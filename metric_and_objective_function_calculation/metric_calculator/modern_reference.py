@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+modern_reference.py: modern (observed) metrics and fields, calculated once
+and stored on disk for every later evaluation.
+
+A reference is stored as a directory of .npy files, named by a hash of the
+content of its input files (the modern DEM and chi mask with the outlet ID,
+or a modern metric file and its chi file). The first evaluation that needs
+a reference calculates and stores it; every later one, in any process,
+memory-maps the stored arrays instead. Changing an input file changes its
+hash, so a stale reference is never read.
+
+Stored references are written to a temporary directory and renamed into
+place, so evaluations running in parallel never see one half written.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import warnings
+
+import numpy as np
+
+from .metric_calculator import MetricCalculator, chi_file_name
+from .reference_cache import cached
+
+# Change this when the metric definitions change, so that references
+# calculated with the old definitions are not used.
+FORMAT_VERSION = '1'
+
+# Environment variable naming a directory for stored references, used
+# instead of the default reference_cache directory next to the inputs.
+CACHE_DIR_VARIABLE = 'MODERN_REFERENCE_CACHE_DIR'
+
+_ARRAY_NAMES = ('density_chi', 'area', 'chi', 'mask', 'till_mask')
+
+
+def file_hash(file_name, block_size=1 << 20):
+    """Return the SHA-1 hex digest of the content of file_name."""
+    sha = hashlib.sha1()
+    with open(file_name, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def reference_key(modern_dem_name=None, outlet_id=None,
+                  chi_mask_dem_name=None, metric_file=None):
+    """Return the name under which a reference is stored.
+
+    The key is a hash of the format version, the content of the input files
+    and the outlet ID, so it is the same wherever the files are.
+    """
+    if metric_file is not None:
+        parts = ['metric_file', file_hash(metric_file),
+                 file_hash(chi_file_name(metric_file))]
+    else:
+        parts = ['modern_dem', file_hash(modern_dem_name), str(outlet_id)]
+        if chi_mask_dem_name is not None:
+            parts.append(file_hash(chi_mask_dem_name))
+    parts.insert(0, FORMAT_VERSION)
+    return hashlib.sha1(':'.join(parts).encode('utf-8')).hexdigest()
+
+
+def default_cache_dir(input_file_name):
+    """Return the directory for references of inputs in the directory of
+    input_file_name."""
+    try:
+        return os.environ[CACHE_DIR_VARIABLE]
+    except KeyError:
+        return os.path.join(os.path.dirname(os.path.abspath(input_file_name)),
+                            'reference_cache')
+
+
+class ModernReference(object):
+    """Modern metrics and fields, standing in for a MetricCalculator of the
+    modern DEM.
+
+    A ModernReference has the metric dictionary, density_chi and
+    modern_dem_name of a MetricCalculator, and, if it was calculated from a
+    DEM, the drainage area, chi index and both masks at every node. Arrays
+    loaded from disk are read-only memory maps.
+    """
+
+    def __init__(self, modern_dem_name, metric, density_chi, area=None,
+                 chi=None, mask=None, till_mask=None):
+        """Initialize ModernReference."""
+        self.modern_dem_name = modern_dem_name
+        self.metric = metric
+        self.density_chi = density_chi
+        self.area = area
+        self.chi = chi
+        self.mask = mask
+        self.till_mask = till_mask
+
+    @classmethod
+    def from_metric_calculator(cls, mc, modern_dem_name):
+        """Create a reference from a MetricCalculator whose metrics have
+        been calculated."""
+        if hasattr(mc, 'grid'):
+            return cls(modern_dem_name, dict(mc.metric), mc.density_chi,
+                       area=mc.area,
+                       chi=mc.grid.at_node['channel__chi_index'],
+                       mask=mc.mask, till_mask=mc.till_mask)
+        else:
+            return cls(mc.modern_dem_name, dict(mc.metric), mc.density_chi)
+
+    def save(self, path):
+        """Write the reference into a new directory called path.
+
+        Nothing is written if path already exists.
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        temp_path = tempfile.mkdtemp(prefix='.tmp', dir=parent)
+        try:
+            names = sorted(self.metric.keys())
+            np.save(os.path.join(temp_path, 'metric_names.npy'),
+                    np.array(names, dtype=str))
+            np.save(os.path.join(temp_path, 'metric_values.npy'),
+                    np.array([self.metric[m] for m in names], dtype=float))
+            np.save(os.path.join(temp_path, 'metric_is_integer.npy'),
+                    np.array([isinstance(self.metric[m], (int, np.integer))
+                              for m in names], dtype=bool))
+            np.save(os.path.join(temp_path, 'modern_dem_name.npy'),
+                    np.array(self.modern_dem_name, dtype=str))
+            for name in _ARRAY_NAMES:
+                values = getattr(self, name)
+                if values is not None:
+                    np.save(os.path.join(temp_path, name + '.npy'),
+                            np.asarray(values))
+            os.rename(temp_path, path)
+        except OSError:
+            # Another evaluation stored the same reference first.
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+
+    @classmethod
+    def load(cls, path):
+        """Read a reference written by save, memory-mapping its arrays."""
+        def read(name, mmap_mode=None):
+            return np.load(os.path.join(path, name + '.npy'),
+                           mmap_mode=mmap_mode)
+
+        names = read('metric_names').tolist()
+        values = read('metric_values')
+        is_integer = read('metric_is_integer')
+        metric = {}
+        for (m, value, integer) in zip(names, values, is_integer):
+            metric[m] = int(value) if integer else float(value)
+
+        arrays = {}
+        for name in _ARRAY_NAMES:
+            if os.path.exists(os.path.join(path, name + '.npy')):
+                arrays[name] = read(name, mmap_mode='r')
+            else:
+                arrays[name] = None
+        return cls(str(read('modern_dem_name')), metric, **arrays)
+
+
+def store_modern_reference(mc, modern_dem_name=None, outlet_id=None,
+                           chi_mask_dem_name=None, metric_file=None,
+                           cache_dir=None):
+    """Store the metrics of MetricCalculator mc as the reference for the
+    given inputs, and return the stored ModernReference.
+
+    If the reference cannot be stored, a warning is given and a
+    ModernReference held in memory is returned instead.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(metric_file or modern_dem_name)
+    path = os.path.join(cache_dir,
+                        reference_key(modern_dem_name, outlet_id,
+                                      chi_mask_dem_name, metric_file))
+    reference = ModernReference.from_metric_calculator(mc, modern_dem_name)
+    try:
+        if not os.path.isdir(path):
+            reference.save(path)
+        return ModernReference.load(path)
+    except (OSError, IOError) as error:
+        # e.g. a read-only data directory: use the reference in memory
+        warnings.warn('Could not store the modern reference in ' + cache_dir
+                      + ' (' + str(error) + '); it will be recalculated by '
+                      'each process. Set ' + CACHE_DIR_VARIABLE + ' to a '
+                      'writable directory to store it.')
+        return reference
+
+
+def load_modern_reference(modern_dem_name=None, outlet_id=None,
+                          chi_mask_dem_name=None, metric_file=None,
+                          cache_dir=None):
+    """Return the ModernReference for the modern DEM modern_dem_name (with
+    outlet_id and chi_mask_dem_name), or for the modern metric file
+    metric_file.
+
+    The reference is loaded from cache_dir if it has been stored there,
+    and otherwise calculated and stored. Within a process it is loaded
+    once.
+    """
+    if metric_file is None and modern_dem_name is None:
+        raise ValueError('Provide either a modern DEM or a modern metric '
+                         'file.')
+    if cache_dir is None:
+        cache_dir = default_cache_dir(metric_file or modern_dem_name)
+
+    def loader():
+        key = reference_key(modern_dem_name, outlet_id, chi_mask_dem_name,
+                            metric_file)
+        path = os.path.join(cache_dir, key)
+        if os.path.isdir(path):
+            return ModernReference.load(path)
+        if metric_file is None:
+            mc0 = MetricCalculator(modern_dem_name,
+                                   outlet_id,
+                                   chi_mask_dem_name=chi_mask_dem_name)
+            mc0.calculate_metrics()
+        else:
+            mc0 = MetricCalculator(None, None, from_file=metric_file)
+        return store_modern_reference(mc0, modern_dem_name, outlet_id,
+                                      chi_mask_dem_name, metric_file,
+                                      cache_dir)
+
+    return cached(('modern_reference', modern_dem_name, outlet_id,
+                   chi_mask_dem_name, metric_file, cache_dir), loader)
@@ -13,16 +13,29 @@ import xarray as xr
 import dask
 
 class NCExtractor(object):
-    """NCExtractor class."""
+    """NCExtractor class.
+    
+    file_name_dict is either a dictionary of file names, one per output 
+    iteration, keyed by iteration number, or the name of a single file 
+    written with the model option output_single_file. In a single file, the 
+    timesteps are the values of its iteration variable.
+    """
     def __init__(self, 
                  file_name_dict, 
                  point_file):
         """Initialize NCExtractor with input values."""
         
         self.point_location_df = pd.read_csv(point_file)
-        self.timesteps = np.sort(list(file_name_dict.keys()))
-        #self.file_name_dict = file_name_dict
-        self.file_names = [file_name_dict[ts] for ts in self.timesteps]
+        if isinstance(file_name_dict, str):
+            self.file_names = file_name_dict
+            with xr.open_dataset(file_name_dict, engine='netcdf4') as ds:
+                iterations = ds['iteration'].values
+            self._time_order = np.argsort(iterations)
+            self.timesteps = iterations[self._time_order]
+        else:
+            self.timesteps = np.sort(list(file_name_dict.keys()))
+            #self.file_name_dict = file_name_dict
+            self.file_names = [file_name_dict[ts] for ts in self.timesteps]
         
         # metric_order
         self.metric_order = []
@@ -35,9 +48,14 @@ class NCExtractor(object):
         """Extracdt values from netcdf files."""
         
         # open dataset
-        ds = xr.open_mfdataset(self.file_names,
-                               concat_dim='nt',
-                               engine='netcdf4')
+        if isinstance(self.file_names, str):
+            ds = xr.open_dataset(self.file_names,
+                                 engine='netcdf4')
+            ds = ds.isel(nt=self._time_order)
+        else:
+            ds = xr.open_mfdataset(self.file_names,
+                                   concat_dim='nt',
+                                   engine='netcdf4')
         
         # extract values
         extracted_values = ds['topographic__elevation'].values[:, self.point_location_df.Row_number.values, self.point_location_df.Column_number.values]
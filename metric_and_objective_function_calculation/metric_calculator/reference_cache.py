@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+reference_cache.py: observed-side inputs (modern DEM, masks, category and
+weight files) loaded once per process.
+
+Calibration drivers score many model runs against the same observations.
+The functions here read each observation file the first time it is asked
+for and return the same objects afterwards, so only the model side is
+recalculated. Cached grids and arrays are shared and must not be modified.
+"""
+
+import numpy as np
+from landlab.io import read_esri_ascii
+from landlab.io.netcdf import read_netcdf
+
+_cache = {}
+
+
+def read_topography(topo_file_name):
+    """Read and return topography from file, as a Landlab grid and field."""
+    try:
+        (grid, z) = read_esri_ascii(topo_file_name,
+                                    name='topographic__elevation',
+                                    halo=1)
+    except:
+        grid = read_netcdf(topo_file_name)
+        z = grid.at_node['topographic__elevation']
+
+    return (grid, z)
+
+
+def cached(key, loader):
+    """Return the object cached under key, calling loader() to make it the
+    first time."""
+    try:
+        return _cache[key]
+    except KeyError:
+        _cache[key] = loader()
+        return _cache[key]
+
+
+def load_topography(topo_file_name):
+    """Return the grid and elevation read from topo_file_name."""
+    return cached(('topography', topo_file_name),
+                  lambda: read_topography(topo_file_name))
+
+
+def load_watershed_topography(topo_file_name, outlet_id):
+    """Return the grid and elevation read from topo_file_name, with
+    watershed boundary conditions set for outlet_id."""
+    def loader():
+        (grid, z) = read_topography(topo_file_name)
+        grid.set_watershed_boundary_condition_outlet_id(outlet_id, z,
+                                                        nodata_value=-9999)
+        return (grid, z)
+    return cached(('watershed_topography', topo_file_name, outlet_id), loader)
+
+
+def load_node_values(file_name):
+    """Return the array of node values in the text file file_name."""
+    return cached(('node_values', file_name), lambda: np.loadtxt(file_name))
+
+
+def clear():
+    """Forget everything that has been loaded."""
+    _cache.clear()
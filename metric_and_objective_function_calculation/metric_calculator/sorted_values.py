@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+sorted_values.py: percentiles and threshold counts of one array, from a
+single sort.
+"""
+
+import numpy as np
+
+
+class SortedValues(object):
+    """
+    SortedValues sorts an array once and then answers any number of
+    percentile and count queries from the sorted copy.
+
+    Percentiles are interpolated linearly between the two nearest ranks, as
+    np.percentile does by default, for all requested percentiles at once.
+    The number of values at or below each of a set of thresholds comes from
+    one np.searchsorted.
+
+    Parameters
+    ----------
+    values : array of float
+
+    Examples
+    --------
+    >>> from metric_calculator.sorted_values import SortedValues
+    >>> sv = SortedValues([4., 1., 3., 2., 5.])
+    >>> sv.percentiles([0, 25, 90, 100])
+    array([1. , 2. , 4.6, 5. ])
+    >>> sv.count_at_most([1., 2.5, 10.])
+    array([1, 2, 5])
+    """
+
+    def __init__(self, values):
+        """Initialize SortedValues."""
+        self.values = np.sort(values, axis=None)
+        if self.values.size == 0:
+            raise ValueError('SortedValues needs at least one value.')
+
+    @property
+    def minimum(self):
+        """Smallest value."""
+        return self.values[0]
+
+    @property
+    def maximum(self):
+        """Largest value."""
+        return self.values[-1]
+
+    def percentiles(self, q):
+        """Return the q-th percentiles (q from 0 to 100) of the values."""
+        q = np.asarray(q, dtype=float)
+        if np.any(q < 0.) or np.any(q > 100.):
+            raise ValueError('Percentiles must be between 0 and 100.')
+        position = q / 100.0 * (self.values.size - 1)
+        below = np.floor(position).astype(int)
+        above = np.minimum(below + 1, self.values.size - 1)
+        fraction = position - below
+        lower = self.values[below]
+        return lower + (self.values[above] - lower) * fraction
+
+    def count_at_most(self, thresholds):
+        """Return the number of values less than or equal to each
+        threshold."""
+        return np.searchsorted(self.values, thresholds, side='right')
@@ -52,15 +52,13 @@ def recalculate_metrics_from_topography(input_file):
         # these were made before category files
         category_file = os.path.join(os.path.abspath(os.sep), *['work', 'WVDP_EWG_STUDY3', 'study3py','auxillary_inputs', 'chi_elev_categories', loc + '.chi_elev_cat.20.txt'])
         category_weight_file = os.path.join(os.path.abspath(os.sep), *['work', 'WVDP_EWG_STUDY3', 'study3py','auxillary_inputs', 'weights', loc + '.chi_elev_weight.20.txt'])
-        category_values = np.loadtxt(category_file)
-        weight_values = np.loadtxt(category_weight_file)
         # calculate metrics
         try:
             # calculate metrics
             gd = GroupedDifferences(model_dem_name, modern_dem_name,  
                                     outlet_id=outlet_id, 
-                                    category_values=category_values,
-                                    weight_values=weight_values)
+                                    category_file=category_file,
+                                    weight_file=category_weight_file)
             gd.calculate_metrics()
             output_bundle = gd.dakota_bundle()
             # write out metrics as Dakota expects